@@ -1,10 +1,20 @@
+import os
+
 import uvicorn
 
-from app.settings import settings
+from app.settings import TEMP_DIR, settings
+from app.utils.metrics import prepare_directory
 
 
 def main() -> None:
     """Entrypoint of the application."""
+    if settings.workers_count > 1:
+        # Workers share their metrics through files of the directory.
+        directory = settings.metrics_multiprocess_dir or str(
+            TEMP_DIR / "boilerplate-metrics",
+        )
+        os.environ["APP_METRICS_MULTIPROCESS_DIR"] = directory
+        prepare_directory(directory)
     uvicorn.run(
         "app.api.application:get_app",
         workers=settings.workers_count,
@@ -1,14 +1,23 @@
 from importlib import metadata
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi import status as http_status
 from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from tortoise.contrib.fastapi import register_tortoise
 
 from app.api.lifetime import register_shutdown_event, register_startup_event
+from app.api.metrics import worker_metrics
 from app.api.routes.router import api_router
+from app.api.routes.v1.users.views import NEXT_CURSOR_HEADER
+from app.domains.backend import PoolTimeoutError
 from app.domains.database import TORTOISE_CONFIG
 from app.logging import configure_logging
+from app.middlewares.admission import AdmissionMiddleware, admission_controller
+from app.middlewares.compression import CompressionMiddleware
+from app.middlewares.deadline import DeadlineMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.sql_timing import SQLTimingMiddleware
 from app.settings import settings
 
 
@@ -50,6 +59,53 @@ def get_app() -> FastAPI:
         add_exception_handlers=True,
     )
 
+    @app.exception_handler(PoolTimeoutError)
+    async def pool_timeout_handler(  # noqa: WPS430
+        request: Request,
+        exc: PoolTimeoutError,
+    ) -> ORJSONResponse:
+        return ORJSONResponse(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Database is overloaded"},
+            headers={"Retry-After": "1"},
+        )
+
+    register_middlewares(app)
+
+    return app
+
+
+def register_middlewares(app: FastAPI) -> None:
+    """
+    Add middlewares to the application.
+
+    The middleware added last is the outermost one.
+
+    :param app: the fastAPI application.
+    """
+    app.add_middleware(SQLTimingMiddleware)
+    app.add_middleware(
+        DeadlineMiddleware,
+        default_timeout=settings.request_timeout,
+        route_timeouts={
+            f"{settings.api_prefix}{path}": route_timeout
+            for path, route_timeout in settings.request_route_timeouts.items()
+        },
+    )
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        levels=settings.compression_levels,
+    )
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission_controller,
+        priority_paths=[
+            f"{settings.api_prefix}{path}" for path in settings.admission_priority_paths
+        ],
+        retry_after=settings.admission_retry_after,
+    )
+    app.add_middleware(MetricsMiddleware, metrics=worker_metrics)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=[
@@ -58,6 +114,5 @@ def get_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing", "ETag"],
     )
-
-    return app
@@ -2,6 +2,9 @@ from typing import Awaitable, Callable
 
 from fastapi import FastAPI
 
+from app.clients.aws_s3 import s3_pool
+from app.middlewares.auth.security import password_hasher
+
 
 def register_startup_event(
     app: FastAPI,
@@ -37,6 +40,7 @@ def register_shutdown_event(
 
     @app.on_event("shutdown")
     async def _shutdown() -> None:  # noqa: WPS430
-        pass  # noqa: WPS420
+        password_hasher.shutdown()
+        s3_pool.shutdown()
 
     return _shutdown
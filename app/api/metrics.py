@@ -0,0 +1,152 @@
+from app.domains.backend import get_pools_stats
+from app.middlewares.admission import admission_controller
+from app.middlewares.auth.cache import principal_cache, token_cache
+from app.middlewares.auth.security import password_hasher
+from app.settings import settings
+from app.utils.metrics import (
+    DEFAULT_BUCKETS,
+    MetricFamily,
+    MetricKind,
+    Samples,
+    WorkerMetrics,
+)
+
+REQUEST_DURATION = "http_request_duration_seconds"
+REQUESTS_IN_FLIGHT = "http_requests_in_flight"
+
+METRIC_FAMILIES = (
+    MetricFamily(
+        REQUEST_DURATION,
+        MetricKind.HISTOGRAM,
+        "Duration of requests by route template and status, _count counts them.",
+        DEFAULT_BUCKETS,
+    ),
+    MetricFamily(
+        REQUESTS_IN_FLIGHT,
+        MetricKind.GAUGE,
+        "Requests being handled.",
+    ),
+    MetricFamily(
+        "http_requests_queued",
+        MetricKind.GAUGE,
+        "Requests waiting for admission by priority.",
+    ),
+    MetricFamily(
+        "http_requests_shed_total",
+        MetricKind.COUNTER,
+        "Requests rejected by admission control.",
+    ),
+    MetricFamily(
+        "db_pool_connections",
+        MetricKind.GAUGE,
+        "Open connections of the pool by state.",
+    ),
+    MetricFamily(
+        "db_pool_waiters",
+        MetricKind.GAUGE,
+        "Callers waiting for a connection of the pool.",
+    ),
+    MetricFamily(
+        "db_pool_acquisitions_total",
+        MetricKind.COUNTER,
+        "Connections taken from the pool.",
+    ),
+    MetricFamily(
+        "db_pool_acquire_timeouts_total",
+        MetricKind.COUNTER,
+        "Waits for a connection of the pool which timed out.",
+    ),
+    MetricFamily(
+        "db_pool_acquire_seconds_total",
+        MetricKind.COUNTER,
+        "Time spent waiting for connections of the pool.",
+    ),
+    MetricFamily(
+        "auth_cache_hits_total",
+        MetricKind.COUNTER,
+        "Lookups of the authentication caches which hit.",
+    ),
+    MetricFamily(
+        "auth_cache_misses_total",
+        MetricKind.COUNTER,
+        "Lookups of the authentication caches which missed.",
+    ),
+    MetricFamily(
+        "password_hashing_in_flight",
+        MetricKind.GAUGE,
+        "Password hashing jobs running or waiting for a process.",
+    ),
+    MetricFamily(
+        "password_hashing_queue_depth",
+        MetricKind.GAUGE,
+        "Password hashing jobs waiting for a process.",
+    ),
+    MetricFamily(
+        "password_hashing_rejected_total",
+        MetricKind.COUNTER,
+        "Password hashing jobs rejected because the queue was full.",
+    ),
+)
+
+
+def collect_samples() -> Samples:
+    """
+    Read samples of the components of the worker.
+
+    :return: samples by family.
+    """
+    admission_stats = admission_controller.get_stats()
+    samples: Samples = {
+        "http_requests_queued": {},
+        "http_requests_shed_total": {(): admission_stats["rejected"]},
+        "auth_cache_hits_total": {},
+        "auth_cache_misses_total": {},
+    }
+    for priority in ("high", "normal"):
+        samples["http_requests_queued"][(("priority", priority),)] = admission_stats[
+            f"queued_{priority}"
+        ]
+    caches_stats = {
+        "token": token_cache.get_stats(),
+        "principal": principal_cache.get_stats(),
+    }
+    for cache_name, cache_stats in caches_stats.items():
+        labels = (("cache", cache_name),)
+        samples["auth_cache_hits_total"][labels] = cache_stats["hits"]
+        samples["auth_cache_misses_total"][labels] = cache_stats["misses"]
+    hashing_stats = password_hasher.get_stats()
+    samples["password_hashing_in_flight"] = {(): hashing_stats["in_flight"]}
+    samples["password_hashing_queue_depth"] = {(): hashing_stats["queue_depth"]}
+    samples["password_hashing_rejected_total"] = {(): hashing_stats["rejected"]}
+    samples.update(_collect_pool_samples())
+    return samples
+
+
+def _collect_pool_samples() -> Samples:
+    samples: Samples = {
+        "db_pool_connections": {},
+        "db_pool_waiters": {},
+        "db_pool_acquisitions_total": {},
+        "db_pool_acquire_timeouts_total": {},
+        "db_pool_acquire_seconds_total": {},
+    }
+    for database, pool_stats in get_pools_stats().items():
+        labels = (("database", database),)
+        in_use = pool_stats["in_use"]
+        samples["db_pool_connections"][(*labels, ("state", "in_use"))] = in_use
+        samples["db_pool_connections"][(*labels, ("state", "idle"))] = (
+            pool_stats["size"] - in_use
+        )
+        samples["db_pool_waiters"][labels] = pool_stats["waiters"]
+        samples["db_pool_acquisitions_total"][labels] = pool_stats["acquisitions"]
+        samples["db_pool_acquire_timeouts_total"][labels] = pool_stats["timeouts"]
+        samples["db_pool_acquire_seconds_total"][labels] = pool_stats["acquire_seconds"]
+    return samples
+
+
+worker_metrics = WorkerMetrics(
+    METRIC_FAMILIES,
+    collect=collect_samples,
+    directory=settings.metrics_multiprocess_dir,
+    flush_interval=settings.metrics_flush_interval,
+)
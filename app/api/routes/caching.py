@@ -0,0 +1,168 @@
+import functools
+import hashlib
+import inspect
+from collections.abc import Awaitable, Callable
+from typing import Any, Iterable, List, Sequence, Tuple
+
+import orjson
+from fastapi import Request, Response
+from fastapi import status as http_status
+
+from app.api.routes.conditional import etag_matches
+from app.middlewares.auth.context import current_principal_id
+from app.utils.response_cache import response_cache
+
+# Header which tells whether the response was served from the cache.
+CACHE_STATUS_HEADER = "X-Cache"
+
+# Headers which are recomputed for every response instead of being cached.
+UNCACHED_HEADERS = frozenset(("content-length", "set-cookie"))
+
+# Name of the parameter the request is passed to the wrapped endpoint with.
+REQUEST_PARAM = "request"
+
+Endpoint = Callable[..., Awaitable[Any]]
+Headers = List[Tuple[str, str]]
+
+
+def cached(
+    ttl: float,
+    tags: Sequence[str] = (),
+    per_principal: bool = True,
+) -> Callable[[Endpoint], Endpoint]:
+    """
+    Cache successful responses of a GET endpoint.
+
+    The key consists of the path, the sorted query parameters and,
+    unless disabled, the authenticated principal. Dependencies of the route,
+    authentication included, run before the cache is looked up.
+    Only 200 responses returned as Response objects are stored.
+    Cached responses are dropped after ttl or once any of their tags
+    is invalidated, e.g. by a repository write.
+
+    :param ttl: seconds to keep the response.
+    :param tags: tags to invalidate the response by.
+    :param per_principal: whether each principal gets own copy of the response.
+    :return: decorator of the endpoint.
+    """
+
+    def decorator(endpoint: Endpoint) -> Endpoint:  # noqa: WPS430
+        signature = inspect.signature(endpoint)
+        has_request = REQUEST_PARAM in signature.parameters
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+            if has_request:
+                request = kwargs[REQUEST_PARAM]
+            else:
+                request = kwargs.pop(REQUEST_PARAM)
+            principal = current_principal_id.get() if per_principal else None
+            key = build_cache_key(request, principal)
+            cached_response = await response_cache.get(key)
+            if cached_response is not None:
+                return decode_response(cached_response, request)
+            # A write during the endpoint makes its response stale, it isn't stored.
+            generations = await response_cache.get_generations(tags)
+            response = await endpoint(*args, **kwargs)
+            await _store(key, response, ttl, tags, generations)
+            return response
+
+        if not has_request:
+            wrapper.__signature__ = _with_request_param(  # type: ignore  # noqa: WPS609
+                signature,
+            )
+        return wrapper
+
+    return decorator
+
+
+def build_cache_key(request: Request, principal: str | None) -> str:
+    """
+    Build cache key of the request.
+
+    :param request: incoming request.
+    :param principal: id of the authenticated principal, None for shared copies.
+    :return: cache key.
+    """
+    parts = [request.url.path, principal or ""]
+    for name, query_value in sorted(request.query_params.multi_items()):
+        parts.append(f"{name}={query_value}")
+    digest = hashlib.blake2b("\0".join(parts).encode(), digest_size=16)
+    return f"response:{digest.hexdigest()}"
+
+
+def encode_response(response: Response) -> bytes:
+    """
+    Encode response to store it in the cache.
+
+    :param response: response with a complete body.
+    :return: status code and headers as json line, then the body.
+    """
+    headers = _cacheable_headers(response.headers.items())
+    head = orjson.dumps([response.status_code, headers])
+    return b"\n".join((head, response.body))
+
+
+def decode_response(cached_response: bytes, request: Request) -> Response:
+    """
+    Rebuild cached response.
+
+    If the client already has the cached representation, 304 is returned.
+
+    :param cached_response: response encoded by encode_response.
+    :param request: incoming request.
+    :return: response.
+    """
+    head, _, body = cached_response.partition(b"\n")
+    status_code, headers = orjson.loads(head)
+    etag = dict(headers).get("etag")
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        response = Response(status_code=http_status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(body, status_code=status_code)
+    response.raw_headers = [*response.raw_headers, *_encode_headers(headers)]
+    response.headers[CACHE_STATUS_HEADER] = "HIT"
+    return response
+
+
+async def _store(
+    key: str,
+    response: Any,
+    ttl: float,
+    tags: Sequence[str],
+    generations: Sequence[int],
+) -> None:
+    if not isinstance(response, Response):
+        return
+    if response.status_code == http_status.HTTP_200_OK:
+        await response_cache.set(
+            key,
+            encode_response(response),
+            ttl,
+            tags,
+            generations,
+        )
+        response.headers[CACHE_STATUS_HEADER] = "MISS"
+
+
+def _with_request_param(signature: inspect.Signature) -> inspect.Signature:
+    request_param = inspect.Parameter(
+        REQUEST_PARAM,
+        inspect.Parameter.KEYWORD_ONLY,
+        annotation=Request,
+    )
+    return signature.replace(
+        parameters=[*signature.parameters.values(), request_param],
+    )
+
+
+def _cacheable_headers(headers: Iterable[Tuple[str, str]]) -> Headers:
+    return [
+        (name, header_value)
+        for name, header_value in headers
+        if name.lower() not in UNCACHED_HEADERS
+    ]
+
+
+def _encode_headers(headers: Headers) -> List[Tuple[bytes, bytes]]:
+    return [(name.encode(), header_value.encode()) for name, header_value in headers]
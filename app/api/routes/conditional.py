@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def version_etag(resource_id: uuid.UUID | str, updated_at: datetime) -> str:
+    """
+    Build strong ETag of a single resource from its id and modification date.
+
+    The tag can be parsed back, so If-Match maps to an optimistic lock.
+
+    :param resource_id: id of the resource.
+    :param updated_at: modification date of the resource.
+    :return: quoted entity tag.
+    """
+    micros = (updated_at - EPOCH) // MICROSECOND
+    return f'"{resource_id}.{micros}"'
+
+
+def parse_version_etag(etag: str) -> Tuple[str, datetime] | None:
+    """
+    Parse ETag built by version_etag.
+
+    :param etag: quoted entity tag.
+    :return: id and modification date of the resource, None if it is malformed.
+    """
+    resource_id, _, micros = etag.strip('"').rpartition(".")
+    try:
+        updated_at = EPOCH + int(micros) * MICROSECOND
+        return str(uuid.UUID(resource_id)), updated_at
+    except (ValueError, OverflowError):
+        return None
+
+
+def list_etag(fingerprint: str) -> str:
+    """
+    Build strong ETag of a collection from its fingerprint.
+
+    :param fingerprint: digest of the collection members.
+    :return: quoted entity tag.
+    """
+    return f'"{fingerprint}"'
+
+
+def parse_etags(header: str) -> List[str]:
+    """
+    Split If-Match or If-None-Match header into entity tags.
+
+    :param header: value of the header.
+    :return: entity tags, or ["*"].
+    """
+    return [etag.strip() for etag in header.split(",") if etag.strip()]
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """
+    Check If-None-Match header against the current ETag.
+
+    The weak comparison is used, as required for If-None-Match.
+
+    :param header: value of the header.
+    :param etag: current entity tag.
+    :return: whether the client already has the current representation.
+    """
+    if not header:
+        return False
+    etags = [other.removeprefix("W/") for other in parse_etags(header)]
+    return "*" in etags or etag in etags
@@ -1,7 +1,20 @@
 from datetime import datetime
-from typing import Dict
+from typing import Any, Dict
 
 from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.api.metrics import worker_metrics
+from app.clients.aws_s3 import s3_pool
+from app.clients.s3_cache import s3_json_cache
+from app.domains.backend import get_pools_stats
+from app.domains.routing import replica_router
+from app.middlewares.admission import admission_controller
+from app.middlewares.auth.cache import principal_cache, token_cache
+from app.middlewares.auth.security import password_hasher
+from app.services.user_service import user_reads
+from app.utils.metrics import CONTENT_TYPE, render_metrics
+from app.utils.response_cache import response_cache
 
 # Define the API router for user models.
 router = APIRouter()
@@ -19,3 +32,40 @@ def health_check() -> Dict[str, str]:
         "status": "OK",
         "timestamp": datetime.now().isoformat(),
     }
+
+
+@router.get("/stats")
+def stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Runtime counters of the current worker.
+
+    :returns: Counters grouped by component.
+    """
+    return {
+        "admission": admission_controller.get_stats(),
+        "password_hashing": password_hasher.get_stats(),
+        "token_cache": token_cache.get_stats(),
+        "principal_cache": principal_cache.get_stats(),
+        "replica_routing": replica_router.get_stats(),
+        "db_pool": get_pools_stats(),
+        "response_cache": response_cache.get_stats(),
+        "single_flight": user_reads.get_stats(),
+        "s3": s3_pool.get_stats(),
+        "s3_json_cache": s3_json_cache.get_stats(),
+    }
+
+
+@router.get("/metrics", response_class=Response)
+async def metrics() -> Response:
+    """
+    Metrics of all workers in the Prometheus text format.
+
+    It runs on the event loop, which is the only writer of the metrics.
+
+    :returns: Exposition of the metrics.
+    """
+    samples = worker_metrics.get_all_samples()
+    return Response(
+        render_metrics(worker_metrics.families, samples),
+        media_type=CONTENT_TYPE,
+    )
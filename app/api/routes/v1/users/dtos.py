@@ -1,7 +1,12 @@
+import enum
 import uuid
 from datetime import datetime
+from typing import Dict, Tuple, cast
 
 from pydantic import BaseModel, Field
+from pydantic.fields import FieldInfo
+
+from app.repositories.user_repository import BulkStatus
 
 
 class UserDTO(BaseModel):
@@ -23,6 +28,12 @@ class UserDTO(BaseModel):
         from_attributes = True
 
 
+# Fields of user models exposed by the API, in order.
+USER_DTO_FIELDS: Tuple[str, ...] = tuple(
+    cast(Dict[str, FieldInfo], UserDTO.model_fields).keys(),
+)
+
+
 class UserCreateInputDTO(BaseModel):
     """DTO for creating new user model."""
 
@@ -38,3 +49,46 @@ class UserUpdateInputDTO(BaseModel):
     full_name: str
     email: str
     is_superuser: bool
+
+
+class UserPatchInputDTO(BaseModel):
+    """
+    DTO for partially updating existing user model.
+
+    Only the given fields are changed. When expected_updated_at is given
+    the update applies only if the user wasn't modified since.
+    """
+
+    full_name: str | None = None
+    email: str | None = None
+    is_superuser: bool | None = None
+    expected_updated_at: datetime | None = None
+
+
+class UserBulkUpdateInputDTO(UserUpdateInputDTO):
+    """DTO for updating existing user model in bulk."""
+
+    id: uuid.UUID
+
+
+class UserBulkResultDTO(BaseModel):
+    """
+    DTO for the result of a single row of a bulk request.
+
+    User is set when the row succeeded, detail when it didn't.
+    """
+
+    index: int
+    status: BulkStatus
+    user: UserDTO | None = None
+    detail: str | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class ExportFormat(enum.StrEnum):
+    """Formats of the users export."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
@@ -1,16 +1,65 @@
-from typing import Any, List
+import uuid
+from datetime import datetime
+from typing import Annotated, Any, Awaitable, List
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Response
 from fastapi import status as http_status
 from fastapi.param_functions import Depends
+from fastapi.responses import StreamingResponse
+from tortoise.exceptions import DoesNotExist
 
-from app.api.routes.v1.users.dtos import UserCreateInputDTO, UserDTO, UserUpdateInputDTO
+from app.api.routes.caching import cached
+from app.api.routes.conditional import (
+    etag_matches,
+    list_etag,
+    parse_etags,
+    parse_version_etag,
+    version_etag,
+)
+from app.api.routes.decoding import ValidatedBodyRoute
+from app.api.routes.v1.users.dtos import (
+    USER_DTO_FIELDS,
+    ExportFormat,
+    UserBulkResultDTO,
+    UserBulkUpdateInputDTO,
+    UserCreateInputDTO,
+    UserDTO,
+    UserPatchInputDTO,
+    UserUpdateInputDTO,
+)
 from app.domains.models.user_model import UserModel
-from app.middlewares.auth.deps import CurrentUser
+from app.middlewares.auth.deps import CurrentUser, get_current_active_superuser
+from app.repositories.pagination import InvalidCursorError, ItemType, Page
+from app.repositories.user_repository import (
+    USERS_CACHE_TAG,
+    BulkResult,
+    PreconditionFailedError,
+)
+from app.services.encoders import json_rows
 from app.services.user_service import UserService
+from app.settings import settings
+
+# Header with the cursor token of the next page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Media types of the users export formats.
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+# Bodies of the bulk requests, limited in size.
+BulkCreateBody = Annotated[
+    List[UserCreateInputDTO],
+    Body(min_length=1, max_length=settings.bulk_max_items),
+]
+BulkUpdateBody = Annotated[
+    List[UserBulkUpdateInputDTO],
+    Body(min_length=1, max_length=settings.bulk_max_items),
+]
 
 # Define the API router for user models.
-router = APIRouter()
+router = APIRouter(route_class=ValidatedBodyRoute)
 
 
 @router.post("/", response_model=UserDTO, status_code=201)
@@ -33,73 +82,246 @@ async def create_user(
     )
 
 
+@router.post(
+    "/bulk",
+    response_model=List[UserBulkResultDTO],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def bulk_create_users(
+    dtos: BulkCreateBody,
+    service: UserService = Depends(),
+) -> List[BulkResult]:
+    """
+    Creates many user objects in the database with a single statement.
+
+    Users with an email which already exists are reported as conflicts
+    without aborting the rest of the batch.
+
+    :param dtos: new user model objects.
+    :param service: Service for user models.
+    :return: result of each user, in order.
+    """
+    return await service.bulk_create_users([dto.model_dump() for dto in dtos])
+
+
+@router.put(
+    "/bulk",
+    response_model=List[UserBulkResultDTO],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def bulk_update_users(
+    dtos: BulkUpdateBody,
+    service: UserService = Depends(),
+) -> List[BulkResult]:
+    """
+    Updates many user objects in the database in one transaction.
+
+    :param dtos: user model objects with ids.
+    :param service: Service for user models.
+    :return: result of each user, in order.
+    """
+    return await service.bulk_update_users([dto.model_dump() for dto in dtos])
+
+
 @router.get("/", response_model=List[UserDTO])
+@cached(
+    ttl=settings.response_cache_users_ttl,
+    tags=[USERS_CACHE_TAG],
+    per_principal=False,
+)
 async def list_users(
     current_user: CurrentUser,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
+    fields: str | None = None,
+    if_none_match: str | None = Header(None),
     service: UserService = Depends(),
-) -> List[UserModel]:
+) -> Response:
     """
     List all user objects from the database.
 
+    Users are ordered by creation date. The cursor of the next page
+    is returned in the X-Next-Cursor header when there may be more users.
+    Rows are encoded straight to json, the response model only documents them.
+    When the page didn't change since the If-None-Match tag, 304 is returned.
+    Pages are cached for all users until any user is written.
+
     :param current_user: The current user object.
     :param limit: limit of user objects, defaults to 100.
     :param offset: offset of user objects, defaults to 0.
+    :param cursor: cursor of the page, it takes precedence over offset.
+    :param fields: comma separated fields to select, defaults to all fields.
+    :param if_none_match: tags of the pages which the client has.
     :param service: Service for user models.
     :return: list of user objects from database.
     """
-    return await service.list_users(limit=limit, offset=offset)
+    columns = _parse_fields(fields) if fields else list(USER_DTO_FIELDS)
+    page_rows = await _get_page(
+        service.list_users_fields(
+            columns,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+        ),
+    )
+    etag = list_etag(str(page_rows.fingerprint))
+    if etag_matches(if_none_match, etag):
+        response = Response(status_code=http_status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(
+            json_rows(page_rows.items, columns),
+            media_type="application/json",
+        )
+    response.headers["ETag"] = etag
+    _set_next_cursor(response, page_rows)
+    return response
 
 
 @router.put("/{user_id}", response_model=UserDTO, status_code=200)
 async def update_user(
     current_user: CurrentUser,
-    user_id: str,
+    user_id: uuid.UUID,
     dto: UserUpdateInputDTO,
+    response: Response,
+    if_match: str | None = Header(None),
     service: UserService = Depends(),
 ) -> UserModel:
     """
     Update user object in the database.
 
+    With If-Match the update applies only if the user still has that ETag,
+    a user which doesn't exist never matches it, even with "*".
+    Only superusers may change other users or the is_superuser flag.
+
     :param current_user : The current user object.
     :param user_id: user id.
     :param dto: user model object.
+    :param response: response to set the ETag header on.
+    :param if_match: tag of the user version which the client has.
     :param service: Service for user models.
     :return: updated user object.
+    :raises HTTPException: If the change isn't allowed or doesn't match If-Match.
+    :raises DoesNotExist: If the user doesn't exist and If-Match is absent.
     """
-    return await service.update_user(
-        user_id=user_id,
-        email=dto.email,
-        full_name=dto.full_name,
-        is_superuser=dto.is_superuser,
+    _check_privileges(
+        current_user,
+        user_id,
+        changes_superuser=dto.is_superuser != current_user.is_superuser,
     )
 
+    try:
+        user = await service.update_user(
+            user_id=str(user_id),
+            email=dto.email,
+            full_name=dto.full_name,
+            is_superuser=dto.is_superuser,
+            expected_updated_at=_expected_version(str(user_id), if_match),
+        )
+    except PreconditionFailedError:
+        raise HTTPException(
+            status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+            detail="User was modified",
+        )
+    except DoesNotExist:
+        if not if_match:
+            raise
+        raise HTTPException(
+            status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+            detail="User doesn't exist",
+        )
+    response.headers["ETag"] = version_etag(user.id, user.updated_at)
+    return user
+
+
+@router.patch("/{user_id}", response_model=UserDTO, status_code=200)
+async def patch_user(
+    current_user: CurrentUser,
+    user_id: uuid.UUID,
+    dto: UserPatchInputDTO,
+    response: Response,
+    service: UserService = Depends(),
+) -> UserModel:
+    """
+    Partially update user object in the database.
+
+    Only superusers may change other users or the is_superuser flag.
+
+    :param current_user : The current user object.
+    :param user_id: user id.
+    :param dto: fields of user model object to change.
+    :param response: response to set the ETag header on.
+    :param service: Service for user models.
+    :return: updated user object.
+    :raises HTTPException: If the change isn't allowed or the user was modified.
+    """
+    _check_privileges(
+        current_user,
+        user_id,
+        changes_superuser=dto.is_superuser is not None,
+    )
+
+    try:
+        user = await service.patch_user(
+            user_id=str(user_id),
+            changes=dto.model_dump(
+                exclude={"expected_updated_at"},
+                exclude_none=True,
+            ),
+            expected_updated_at=dto.expected_updated_at,
+        )
+    except PreconditionFailedError:
+        raise HTTPException(
+            status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+            detail="User was modified",
+        )
+    response.headers["ETag"] = version_etag(user.id, user.updated_at)
+    return user
+
 
 @router.get("/me", response_model=UserDTO)
-async def get_me(current_user: CurrentUser) -> Any:
+async def get_me(
+    current_user: CurrentUser,
+    response: Response,
+    if_none_match: str | None = Header(None),
+) -> Any:
     """
     Retrieve user object from the current user.
 
+    When the user didn't change since the If-None-Match tag, 304 is returned.
+
     :param current_user : The current user object.
+    :param response: response to set the ETag header on.
+    :param if_none_match: tags of the user versions which the client has.
     :return: User object from current user.
     """
+    etag = version_etag(current_user.id, current_user.updated_at)
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=http_status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag},
+        )
+    response.headers["ETag"] = etag
     return await current_user
 
 
 @router.get("/email-list", response_model=List[str])
 async def list_users_emails(
     current_user: CurrentUser,
+    response: Response,
     limit: int = 100,
     offset: int = 0,
+    cursor: str | None = None,
     service: UserService = Depends(),
 ) -> List[str]:
     """
     List emails of the users from the database.
 
     :param current_user: The current user object.
+    :param response: response to set the next cursor header on.
     :param limit: limit of user objects, defaults to 100.
     :param offset: offset of user objects, defaults to 0.
+    :param cursor: cursor of the page, it takes precedence over offset.
     :param service: Service for user models.
     :return: list of users emails.
     :raises HTTPException: If the user doesn't have enough privileges.
@@ -110,7 +332,94 @@ async def list_users_emails(
             detail="Not enough privileges",
         )
 
-    return await service.list_users_emails(
-        limit=limit,
-        offset=offset,
+    page = await _get_page(
+        service.list_users_emails(limit=limit, offset=offset, cursor=cursor),
+    )
+    _set_next_cursor(response, page)
+    return page.items
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(
+    current_user: CurrentUser,
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    service: UserService = Depends(),
+) -> StreamingResponse:
+    """
+    Stream all users as NDJSON or CSV.
+
+    Rows are read through a server-side cursor, so memory stays flat
+    regardless of the table size. The stream is cancelled on client disconnect.
+
+    :param current_user: The current user object.
+    :param export_format: format of the export, defaults to ndjson.
+    :param service: Service for user models.
+    :return: stream of users.
+    :raises HTTPException: If the user doesn't have enough privileges.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=http_status.HTTP_403_FORBIDDEN,
+            detail="Not enough privileges",
+        )
+
+    return StreamingResponse(
+        service.export_users(export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="users.{export_format}"',
+        },
+    )
+
+
+def _check_privileges(
+    current_user: UserModel,
+    user_id: uuid.UUID,
+    changes_superuser: bool,
+) -> None:
+    privileged = changes_superuser or user_id != current_user.id
+    if privileged and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=http_status.HTTP_403_FORBIDDEN,
+            detail="Not enough privileges",
+        )
+
+
+def _expected_version(user_id: str, if_match: str | None) -> datetime | None:
+    etags = parse_etags(if_match) if if_match else ["*"]
+    if "*" in etags:
+        return None
+    for etag in etags:
+        version = parse_version_etag(etag)
+        if version and version[0] == user_id.lower():
+            return version[1]
+    raise HTTPException(
+        status_code=http_status.HTTP_412_PRECONDITION_FAILED,
+        detail="User was modified",
     )
+
+
+def _parse_fields(fields: str) -> List[str]:
+    selected = [field.strip() for field in fields.split(",")]
+    unknown = ", ".join(field for field in selected if field not in USER_DTO_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {unknown}",
+        )
+    return list(dict.fromkeys(selected))
+
+
+async def _get_page(page_request: Awaitable[Page[ItemType]]) -> Page[ItemType]:
+    try:
+        return await page_request
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _set_next_cursor(response: Response, page: Page[Any]) -> None:
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
@@ -1,23 +1,204 @@
-import base64
-import json
-import tempfile
-from typing import Dict
+import asyncio
+import contextvars
+import functools
+import mimetypes
+import threading
+import time
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Generic, List, TypeVar
 
 import boto3
+import orjson
+from botocore.client import BaseClient
+from botocore.config import Config
 
 from app.settings import settings
+from app.utils.base64_stream import Base64DecodingReader, Base64Source
+from app.utils.deadline import limit_timeout
+
+ResultType = TypeVar("ResultType")
+
+# Call of the pool, run once a slot of the batch is free.
+PoolCall = Callable[[], Awaitable[Any]]
+
+# S3 deletes at most this number of objects in a single request.
+DELETE_BATCH_SIZE = 1000
+
+
+class S3BatchError(Exception):
+    """Raised for a key which S3 failed to process in a batch request."""
+
+    def __init__(self, key: str, code: str, message: str) -> None:
+        """
+        Error of the key.
+
+        :param key: key of the object.
+        :param code: S3 error code.
+        :param message: S3 error message.
+        """
+        super().__init__(message)
+        self.key = key
+        self.code = code
+
+
+@dataclass
+class BatchResult(Generic[ResultType]):
+    """Results and errors of a batch by file name."""
+
+    results: Dict[str, ResultType] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+
+
+@dataclass
+class S3Stats:
+    """Counters of the S3 pool."""
+
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    in_flight: int = 0
+    call_seconds: float = 0
+
+
+class S3Pool:
+    """
+    Process-wide S3 client with a bounded pool of threads running its calls.
+
+    boto3 is synchronous, so async callers run its calls in the threads,
+    and the event loop keeps serving other requests meanwhile.
+    The client is thread-safe and keeps as many connections as there are threads.
+    """
+
+    def __init__(self, max_workers: int, endpoint_url: str = "") -> None:
+        """
+        Pool of the S3 client.
+
+        :param max_workers: threads running calls and connections of the client.
+        :param endpoint_url: URL of an S3 compatible server, empty for AWS.
+        """
+        self.max_workers = max_workers
+        self.endpoint_url = endpoint_url
+        self.stats = S3Stats()
+        self._client: BaseClient | None = None
+        self._client_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def client(self) -> BaseClient:
+        """
+        Get the client shared by the process.
+
+        :return: boto3 S3 client.
+        """
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._create_client()
+        return self._client
+
+    async def run(
+        self,
+        operation: str,
+        func: Callable[..., ResultType],
+        *args: Any,
+    ) -> ResultType:
+        """
+        Run blocking call in a thread of the pool.
+
+        The call runs in the context of the caller, and waiting for it
+        is bounded by the deadline of the current request.
+
+        :param operation: name of the operation, for the deadline log.
+        :param func: function to run.
+        :param args: arguments of the function.
+        :return: result of the function.
+        :raises TimeoutError: If the deadline passed before the call finished.
+        :raises Exception: If the call failed.
+        """
+        timeout = limit_timeout(operation)
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        call = self._get_executor().submit(context.run, func, *args)
+        self.stats.calls += 1
+        self.stats.in_flight += 1
+        # A call which timed out keeps its thread busy, so it stays in flight.
+        call.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._finish_call, started),
+        )
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(call), timeout=timeout)
+        except TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        except Exception:
+            self.stats.errors += 1
+            raise
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the pool.
+
+        :return: counters and accumulated timings.
+        """
+        return asdict(self.stats)
+
+    def shutdown(self) -> None:
+        """Stop threads of the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finish_call(self, started: float) -> None:
+        self.stats.in_flight -= 1
+        self.stats.call_seconds += time.monotonic() - started
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="s3",
+            )
+        return self._executor
+
+    def _create_client(self) -> BaseClient:
+        config = Config(
+            connect_timeout=settings.s3_connect_timeout,
+            read_timeout=settings.s3_read_timeout,
+            max_pool_connections=self.max_workers,
+            s3={"addressing_style": "path"} if self.endpoint_url else None,
+        )
+        # Sessions aren't thread-safe, the pool keeps its own one.
+        return boto3.session.Session().client(
+            "s3",
+            endpoint_url=self.endpoint_url or None,
+            config=config,
+        )
+
+
+s3_pool = S3Pool(
+    max_workers=settings.s3_max_workers,
+    endpoint_url=settings.s3_endpoint_url,
+)
 
 
 class AwsS3Client:
-    """AWS S3 Client."""
+    """
+    AWS S3 Client.
 
-    def __init__(self, bucket: str = ""):
+    Calls block the calling thread, async code uses AsyncAwsS3Client.
+    Operations aren't started once the deadline of the current request passed.
+    """
+
+    def __init__(self, bucket: str = "", pool: S3Pool | None = None):
         """
         AWS S3 Client.
 
         :param bucket: The name of the S3 bucket.
+        :param pool: The pool of the shared client, the process-wide one by default.
         """
-        self._client: boto3.session.Session.client = boto3.client("s3")
+        self._client = (pool or s3_pool).client
         self._bucket: str = bucket or settings.default_bucket
 
     def upload_json(
@@ -33,36 +214,39 @@ class AwsS3Client:
         :param file_name: The name of the file without extension to be uploaded.
         :param bucket_path: The path to the S3 bucket.
         """
+        limit_timeout("S3 put_object")
         self._client.put_object(
             Bucket=self._bucket,
             Key=f"{bucket_path}/{file_name}.json",
-            Body=json.dumps(json_content),
+            Body=orjson.dumps(json_content),
         )
 
     def upload_base64_image(
         self,
-        base64_image: str,
+        base64_image: Base64Source,
         file_name: str,
         bucket_path: str = "",
+        content_type: str = "image/png",
     ) -> None:
         """
         Uploads a base64 image to an S3 bucket.
 
-        :param base64_image: The base64 encoded image.
+        The image is decoded chunk by chunk while it is uploaded,
+        so large images don't need memory for their whole decoded content.
+
+        :param base64_image: The base64 encoded image, as text or binary stream.
         :param file_name: The name of the file without extension to be uploaded.
         :param bucket_path: The path to the S3 bucket.
+        :param content_type: The media type of the image, it picks the extension.
         """
-        image_data = base64.b64decode(base64_image)
-
-        with tempfile.NamedTemporaryFile("wb") as temp_file:
-            temp_file.write(image_data)
-
-            with open(temp_file.name, "rb") as file_reader:
-                self._client.upload_fileobj(
-                    file_reader,
-                    self._bucket,
-                    f"{bucket_path}/{file_name}.png",
-                )
+        limit_timeout("S3 upload_fileobj")
+        extension = mimetypes.guess_extension(content_type) or ""
+        self._client.upload_fileobj(
+            Base64DecodingReader(base64_image),
+            self._bucket,
+            f"{bucket_path}/{file_name}{extension}",
+            ExtraArgs={"ContentType": content_type},
+        )
 
     def get_json_content(
         self,
@@ -76,9 +260,239 @@ class AwsS3Client:
         :param bucket_path: The path to the S3 bucket.
         :return: The json content.
         """
+        limit_timeout("S3 get_object")
         response = self._client.get_object(
             Bucket=self._bucket,
             Key=f"{bucket_path}/{file_name}.json",
         )
-        json_data = response.get("Body").read().decode("utf-8")
-        return dict(json.loads(json_data))
+        return dict(orjson.loads(response.get("Body").read()))
+
+    def delete_objects(self, keys: Sequence[str]) -> Dict[str, Exception]:
+        """
+        Deletes objects from an S3 bucket in a single request.
+
+        :param keys: The keys of the objects, at most 1000.
+        :return: The errors by key of the objects which weren't deleted.
+        """
+        limit_timeout("S3 delete_objects")
+        response = self._client.delete_objects(
+            Bucket=self._bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        return {
+            error["Key"]: S3BatchError(error["Key"], error["Code"], error["Message"])
+            for error in response.get("Errors", [])
+        }
+
+
+class AsyncAwsS3Client:
+    """
+    AWS S3 Client for async code.
+
+    Calls run in the threads of the S3 pool, so they never block the event loop.
+    """
+
+    def __init__(
+        self,
+        bucket: str = "",
+        pool: S3Pool | None = None,
+        concurrency: int = settings.s3_batch_concurrency,
+    ):
+        """
+        AWS S3 Client.
+
+        :param bucket: The name of the S3 bucket.
+        :param pool: The pool running the calls, the process-wide one by default.
+        :param concurrency: The calls of a batch in flight at once.
+        """
+        self._pool = pool or s3_pool
+        self._sync_client = AwsS3Client(bucket, self._pool)
+        self.concurrency = concurrency
+
+    async def upload_json(
+        self,
+        json_content: Dict[str, object],
+        file_name: str,
+        bucket_path: str = "",
+    ) -> None:
+        """
+        Uploads a json file to an S3 bucket.
+
+        :param json_content: The json content to be uploaded.
+        :param file_name: The name of the file without extension to be uploaded.
+        :param bucket_path: The path to the S3 bucket.
+        """
+        await self._pool.run(
+            "S3 put_object",
+            self._sync_client.upload_json,
+            json_content,
+            file_name,
+            bucket_path,
+        )
+
+    async def upload_base64_image(
+        self,
+        base64_image: Base64Source,
+        file_name: str,
+        bucket_path: str = "",
+        content_type: str = "image/png",
+    ) -> None:
+        """
+        Uploads a base64 image to an S3 bucket.
+
+        :param base64_image: The base64 encoded image, as text or binary stream.
+        :param file_name: The name of the file without extension to be uploaded.
+        :param bucket_path: The path to the S3 bucket.
+        :param content_type: The media type of the image, it picks the extension.
+        """
+        await self._pool.run(
+            "S3 upload_fileobj",
+            self._sync_client.upload_base64_image,
+            base64_image,
+            file_name,
+            bucket_path,
+            content_type,
+        )
+
+    async def get_json_content(
+        self,
+        file_name: str,
+        bucket_path: str = "",
+    ) -> Dict[str, str]:
+        """
+        Retrieves the json content from an S3 bucket.
+
+        :param file_name: The name of the file without extension.
+        :param bucket_path: The path to the S3 bucket.
+        :return: The json content.
+        """
+        return await self._pool.run(
+            "S3 get_object",
+            self._sync_client.get_json_content,
+            file_name,
+            bucket_path,
+        )
+
+    async def upload_json_many(
+        self,
+        json_contents: Mapping[str, Dict[str, Any]],
+        bucket_path: str = "",
+    ) -> BatchResult[None]:
+        """
+        Uploads json files to an S3 bucket concurrently.
+
+        :param json_contents: The json content of each file name without extension.
+        :param bucket_path: The path to the S3 bucket.
+        :return: The uploaded file names and the errors of the failed ones.
+        """
+        file_names = list(json_contents)
+        calls = [
+            functools.partial(
+                self.upload_json,
+                json_contents[file_name],
+                file_name,
+                bucket_path,
+            )
+            for file_name in file_names
+        ]
+        return _batch_result(file_names, await gather_bounded(calls, self.concurrency))
+
+    async def get_json_many(
+        self,
+        file_names: Sequence[str],
+        bucket_path: str = "",
+    ) -> BatchResult[Dict[str, Any]]:
+        """
+        Retrieves json contents from an S3 bucket concurrently.
+
+        :param file_names: The names of the files without extension.
+        :param bucket_path: The path to the S3 bucket.
+        :return: The json content of each file and the errors of the failed ones.
+        """
+        calls = [
+            functools.partial(self.get_json_content, file_name, bucket_path)
+            for file_name in file_names
+        ]
+        return _batch_result(file_names, await gather_bounded(calls, self.concurrency))
+
+    async def delete_many(
+        self,
+        file_names: Sequence[str],
+        bucket_path: str = "",
+        extension: str = ".json",
+    ) -> BatchResult[None]:
+        """
+        Deletes files from an S3 bucket with multi-object delete requests.
+
+        :param file_names: The names of the files without extension.
+        :param bucket_path: The path to the S3 bucket.
+        :param extension: The extension of the files.
+        :return: The deleted file names and the errors of the failed ones.
+        """
+        names_by_key = {
+            f"{bucket_path}/{file_name}{extension}": file_name
+            for file_name in file_names
+        }
+        keys = list(names_by_key)
+        chunks = [
+            keys[start : start + DELETE_BATCH_SIZE]
+            for start in range(0, len(keys), DELETE_BATCH_SIZE)
+        ]
+        calls = [
+            functools.partial(
+                self._pool.run,
+                "S3 delete_objects",
+                self._sync_client.delete_objects,
+                chunk,
+            )
+            for chunk in chunks
+        ]
+        batch: BatchResult[None] = BatchResult()
+        outcomes = await gather_bounded(calls, self.concurrency)
+        for chunk, chunk_errors in zip(chunks, outcomes):
+            for key in chunk:
+                error = (
+                    chunk_errors
+                    if isinstance(chunk_errors, Exception)
+                    else chunk_errors.get(key)
+                )
+                if error is None:
+                    batch.results[names_by_key[key]] = None
+                else:
+                    batch.errors[names_by_key[key]] = error
+        return batch
+
+
+async def gather_bounded(calls: Sequence[PoolCall], concurrency: int) -> List[Any]:
+    """
+    Run calls with at most concurrency of them in flight.
+
+    :param calls: calls to run.
+    :param concurrency: calls in flight at once.
+    :return: result or exception of each call, in order.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def _run_one(call: PoolCall) -> Any:  # noqa: WPS430
+        async with semaphore:
+            return await call()
+
+    return list(
+        await asyncio.gather(
+            *(_run_one(call) for call in calls),
+            return_exceptions=True,
+        ),
+    )
+
+
+def _batch_result(
+    file_names: Sequence[str],
+    outcomes: Sequence[Any],
+) -> BatchResult[Any]:
+    batch: BatchResult[Any] = BatchResult()
+    for file_name, outcome in zip(file_names, outcomes):
+        if isinstance(outcome, Exception):
+            batch.errors[file_name] = outcome
+        else:
+            batch.results[file_name] = outcome
+    return batch
@@ -0,0 +1,174 @@
+import asyncio
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+from yarl import URL
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+Command = Sequence[str | bytes | int]
+
+CRLF = b"\r\n"
+
+
+class RedisError(Exception):
+    """Error reply of the server."""
+
+
+# Decoders of the replies which fit in a single line, by type byte.
+SIMPLE_REPLIES: Dict[bytes, Callable[[bytes], Any]] = {
+    b"+": bytes.decode,
+    b"-": lambda payload: RedisError(payload.decode()),
+    b":": int,
+}
+
+
+class RedisClient:
+    """
+    Minimal asyncio client of the Redis protocol.
+
+    It speaks RESP2, so it works with Redis, Valkey, KeyDB
+    or any local stand-in which implements the used commands.
+    """
+
+    def __init__(self, url: str, max_connections: int = 8, timeout: float = 1) -> None:
+        """
+        Redis client.
+
+        :param url: url of the server, e.g. redis://:password@localhost:6379/0.
+        :param max_connections: maximum number of open connections.
+        :param timeout: seconds to wait for the server.
+        """
+        self._url = URL(url)
+        self._timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._idle: List[Connection] = []
+
+    async def execute(self, *command: str | bytes | int) -> Any:
+        """
+        Run single command.
+
+        :param command: name and arguments of the command.
+        :return: reply of the server.
+        """
+        replies = await self.pipeline([command])
+        return replies[0]
+
+    async def pipeline(self, commands: Sequence[Command]) -> List[Any]:
+        """
+        Send commands in one round trip and read their replies.
+
+        :param commands: commands with arguments.
+        :return: replies of the server, in order.
+        :raises RedisError: If the server replied with an error.
+        """
+        async with self._connection() as connection:
+            replies = await asyncio.wait_for(
+                self._roundtrip(connection, commands),
+                timeout=self._timeout,
+            )
+        errors = [reply for reply in replies if isinstance(reply, RedisError)]
+        if errors:
+            raise RedisError("; ".join(str(error) for error in errors))
+        return replies
+
+    async def close(self) -> None:
+        """Close idle connections."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[Connection]:
+        """
+        Hold connection, returning it to the idle ones only if it is healthy.
+
+        A connection which failed or was cancelled mid-reply may have
+        unread replies, so it is closed instead.
+
+        :yields: open connection.
+        """
+        async with self._semaphore:
+            connection = await self._acquire()
+            healthy = False
+            try:
+                yield connection
+                healthy = True
+            finally:
+                if healthy:
+                    self._idle.append(connection)
+                else:
+                    connection[1].close()
+
+    async def _acquire(self) -> Connection:
+        if self._idle:
+            return self._idle.pop()
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self._url.host, self._url.port or 6379),
+            timeout=self._timeout,
+        )
+        setup: List[Command] = []
+        if self._url.password:
+            setup.append(["AUTH", self._url.password])
+        database = self._url.path.strip("/")
+        if database:
+            setup.append(["SELECT", database])
+        if setup:
+            await self._roundtrip(connection, setup)
+        return connection
+
+    async def _roundtrip(
+        self,
+        connection: Connection,
+        commands: Sequence[Command],
+    ) -> List[Any]:
+        reader, writer = connection
+        writer.write(b"".join(encode_command(command) for command in commands))
+        await writer.drain()
+        return [await read_reply(reader) for _ in commands]
+
+
+def encode_command(command: Command) -> bytes:
+    """
+    Encode command as RESP array of bulk strings.
+
+    :param command: name and arguments of the command.
+    :return: encoded command.
+    """
+    parts = [_encode_length(b"*", len(command))]
+    for argument in command:
+        if not isinstance(argument, bytes):
+            argument = str(argument).encode()
+        parts.extend((_encode_length(b"$", len(argument)), argument, CRLF))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Read single RESP reply.
+
+    Error replies are returned as RedisError, so the rest of a pipeline is read.
+
+    :param reader: stream of the connection.
+    :return: decoded reply.
+    :raises RedisError: If the reply type is unknown.
+    """
+    line = await reader.readuntil(CRLF)
+    kind = line[:1]
+    content = line[1 : -len(CRLF)]
+    decode_simple = SIMPLE_REPLIES.get(kind)
+    if decode_simple is not None:
+        return decode_simple(content)
+    if kind not in {b"$", b"*"}:
+        raise RedisError(f"Unknown reply type: {line!r}")
+    length = int(content)
+    if length < 0:
+        return None
+    if kind == b"$":
+        bulk = await reader.readexactly(length + len(CRLF))
+        return bulk[:length]
+    return [await read_reply(reader) for _ in range(length)]
+
+
+def _encode_length(kind: bytes, length: int) -> bytes:
+    return b"".join((kind, str(length).encode(), CRLF))
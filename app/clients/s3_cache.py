@@ -0,0 +1,223 @@
+import hashlib
+import mmap
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import orjson
+from botocore.exceptions import ClientError
+
+from app.clients.aws_s3 import S3Pool, s3_pool
+from app.settings import settings
+from app.utils.ttl_cache import TTLCache
+
+# Parsed content of an object and its ETag.
+CachedObject = Tuple[str, Any]
+
+CACHE_SUFFIX = ".cache"
+
+
+@dataclass
+class S3CacheStats:
+    """Counters of the S3 JSON cache."""
+
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    not_modified: int = 0
+    evictions: int = 0
+    disk_bytes: int = 0
+
+
+class S3JsonCache:
+    """
+    Read-through cache of JSON objects of a bucket.
+
+    Parsed objects are kept in memory until their ttl expires.
+    Then the object is revalidated with a conditional GET
+    carrying the ETag of the copy on disk, and the copy is reused when
+    S3 replies 304. Copies on disk are mmap'd on reload, they survive restarts
+    of the workers and the least recently used ones are evicted
+    once the copies of all workers take more than the disk limit.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        bucket: str = "",
+        pool: S3Pool | None = None,
+        directory: str | Path = "",
+        max_disk_bytes: int = settings.s3_cache_disk_bytes,
+        memory_size: int = settings.s3_cache_memory_size,
+        ttl: float = settings.s3_cache_ttl,
+    ) -> None:
+        """
+        Cache of the bucket.
+
+        :param bucket: The name of the S3 bucket.
+        :param pool: The pool running the calls, the process-wide one by default.
+        :param directory: directory of the copies, shared by the workers.
+        :param max_disk_bytes: size limit of the copies on disk.
+        :param memory_size: number of parsed objects kept in memory.
+        :param ttl: seconds parsed objects are served without revalidation.
+        """
+        self._pool = pool or s3_pool
+        self._bucket = bucket or settings.default_bucket
+        self.directory = Path(directory or settings.s3_cache_dir)
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = S3CacheStats()
+        self._memory: TTLCache[str, Any] = TTLCache(maxsize=memory_size, ttl=ttl)
+        self._evict_lock = threading.Lock()
+
+    async def get_json_content(
+        self,
+        file_name: str,
+        bucket_path: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Retrieves the json content from an S3 bucket through the cache.
+
+        :param file_name: The name of the file without extension.
+        :param bucket_path: The path to the S3 bucket.
+        :return: The json content, it is shared, so it must not be modified.
+        """
+        key = f"{bucket_path}/{file_name}.json"
+        json_content = self._memory.get(key)
+        if json_content is not None:
+            self.stats.hits += 1
+            return json_content
+        loaded = await self._pool.run("S3 get_object", self._load, key)
+        self._memory.set(key, loaded)
+        return loaded
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the cache.
+
+        :return: counters and size of the copies on disk.
+        """
+        memory_size = self._memory.get_stats()["size"]
+        return {**asdict(self.stats), "memory_size": memory_size}
+
+    def clear(self) -> None:
+        """Drop parsed objects from memory, copies on disk are revalidated."""
+        self._memory.clear()
+
+    def _load(self, key: str) -> Any:
+        path = self._path(key)
+        etag = _read_etag(path)
+        if etag is not None:
+            self.stats.revalidations += 1
+            try:
+                return self._download(key, path, {"IfNoneMatch": etag})
+            except ClientError as exc:
+                if exc.response["ResponseMetadata"]["HTTPStatusCode"] != 304:
+                    raise
+            # The copy is parsed only once S3 confirmed that it is still valid.
+            cached = _read_copy(path)
+            if cached is not None:
+                self.stats.not_modified += 1
+                self._touch(path)
+                return cached[1]
+        self.stats.misses += 1
+        return self._download(key, path, {})
+
+    def _download(self, key: str, path: Path, conditions: Dict[str, str]) -> Any:
+        response = self._pool.client.get_object(
+            Bucket=self._bucket,
+            Key=key,
+            **conditions,
+        )
+        body = response["Body"].read()
+        json_content = orjson.loads(body)
+        self._store(path, response["ETag"], body)
+        return json_content
+
+    def _store(self, path: Path, etag: str, body: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Workers share the directory, so the writer is told apart by process too.
+        temporary_path = path.with_suffix(
+            ".{0}.{1}.tmp".format(os.getpid(), threading.get_ident()),
+        )
+        with open(temporary_path, "wb") as copy:
+            copy.write(etag.encode())
+            copy.write(b"\n")
+            copy.write(body)
+        os.replace(temporary_path, path)
+        with self._evict_lock:
+            self._evict()
+
+    def _touch(self, path: Path) -> None:
+        # Modification time keeps the order of the LRU across workers and restarts.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+
+    def _evict(self) -> None:
+        # The directory is scanned, so copies written by other workers count too.
+        copies = sorted(_scan_copies(self.directory))
+        total = sum(size for _, size, _ in copies)
+        for _, size, copy_path in copies[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            Path(copy_path).unlink(missing_ok=True)
+            total -= size
+            self.stats.evictions += 1
+        self.stats.disk_bytes = total
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.blake2b(
+            "{0}/{1}".format(self._bucket, key).encode(),
+            digest_size=16,
+        ).hexdigest()
+        return self.directory / f"{digest}{CACHE_SUFFIX}"
+
+
+def _scan_copies(directory: Path) -> List[Tuple[int, int, str]]:
+    copies = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(CACHE_SUFFIX):
+            continue
+        try:
+            entry_stat = entry.stat()
+        except FileNotFoundError:
+            # Evicted by another worker meanwhile.
+            continue
+        copies.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry.path))
+    return copies
+
+
+def _read_etag(path: Path) -> str | None:
+    try:
+        with open(path, "rb") as copy:
+            first_line = copy.readline()
+    except FileNotFoundError:
+        return None
+    if not first_line.endswith(b"\n"):
+        # Torn copies are downloaded again.
+        return None
+    return first_line[:-1].decode(errors="replace")
+
+
+def _read_copy(path: Path) -> CachedObject | None:
+    try:
+        return _parse_copy(path)
+    except (FileNotFoundError, ValueError):
+        # Missing, evicted by another worker, or torn copies are downloaded again.
+        return None
+
+
+def _parse_copy(path: Path) -> CachedObject:
+    with open(path, "rb") as copy:
+        with mmap.mmap(copy.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            newline = mapped.find(b"\n")
+            etag = mapped[:newline].decode()
+            # orjson parses the mapped pages without copying them.
+            with memoryview(mapped) as view:
+                with view[newline + 1 :] as body:
+                    return etag, orjson.loads(body)
+
+
+s3_json_cache = S3JsonCache()
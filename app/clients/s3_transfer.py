@@ -0,0 +1,380 @@
+import asyncio
+import contextvars
+import functools
+import math
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterator, Set, Tuple
+
+from loguru import logger
+
+from app.clients.aws_s3 import S3Pool, gather_bounded, s3_pool
+from app.settings import settings
+
+# Content to upload, a path of a file or bytes in memory.
+TransferSource = str | Path | bytes | bytearray | memoryview
+
+# Reads length bytes of the content from the offset.
+PartReader = Callable[[int, int], bytes]
+
+# Writes a chunk of the content at the offset.
+ChunkWriter = Callable[[int, bytes], None]
+
+# Opens a chunk writer for a single range, in the thread downloading it.
+RangeWriter = Callable[[], ContextManager[ChunkWriter]]
+
+# S3 accepts at most this number of parts in an upload.
+MAX_PARTS = 10000
+
+# Bytes of a ranged download read from the socket at once.
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class MultipartUploadError(Exception):
+    """Raised when a part of a multipart upload failed."""
+
+    def __init__(self, upload_id: str, aborted: bool) -> None:
+        """
+        Error of the upload.
+
+        :param upload_id: id of the upload, to resume it when it wasn't aborted.
+        :param aborted: whether the uploaded parts were discarded.
+        """
+        super().__init__(f"Multipart upload {upload_id} failed")
+        self.upload_id = upload_id
+        self.aborted = aborted
+
+
+class S3Transfer:
+    """
+    Parallel transfers of large S3 objects.
+
+    Uploads are split into parts, and downloads into byte ranges,
+    which run concurrently in the threads of the S3 pool.
+    At most concurrency parts of a transfer are in memory at once.
+    Failed or cancelled uploads are aborted outside the deadline
+    of the request, which may be what failed them.
+    Each part or range of a file opens its own handle in its thread,
+    so calls which outlive a timed out or cancelled transfer
+    never touch a descriptor which was closed and reused meanwhile.
+    """
+
+    def __init__(
+        self,
+        bucket: str = "",
+        pool: S3Pool | None = None,
+        part_size: int = settings.s3_part_size,
+        concurrency: int = settings.s3_transfer_concurrency,
+    ) -> None:
+        """
+        Transfers of the bucket.
+
+        :param bucket: The name of the S3 bucket.
+        :param pool: The pool running the calls, the process-wide one by default.
+        :param part_size: bytes of each part or range, S3 needs at least 5 MiB.
+        :param concurrency: parts or ranges of a transfer in flight at once.
+        """
+        self._pool = pool or s3_pool
+        self._bucket = bucket or settings.default_bucket
+        self.part_size = part_size
+        self.concurrency = max(concurrency, 1)
+        self._aborts: Set[asyncio.Task[bool]] = set()
+
+    async def upload(
+        self,
+        source: TransferSource,
+        key: str,
+        upload_id: str | None = None,
+        abort_on_failure: bool = True,
+    ) -> None:
+        """
+        Upload content, in parallel parts when it is larger than a part.
+
+        Passing the id of a failed upload which wasn't aborted
+        resumes it, parts which were already uploaded are skipped.
+
+        :param source: path of a file or bytes to upload.
+        :param key: key of the object.
+        :param upload_id: id of the multipart upload to resume.
+        :param abort_on_failure: whether to discard uploaded parts on failure.
+        """
+        size, read_part = _open_source(source)
+        if upload_id is None and size <= self.part_size:
+            await self._pool.run(
+                "S3 put_object",
+                self._put_object,
+                key,
+                read_part,
+                size,
+            )
+            return
+        await self._upload_parts(key, size, read_part, upload_id, abort_on_failure)
+
+    async def download_buffer(self, key: str) -> bytearray:
+        """
+        Download object in parallel ranges into a preallocated buffer.
+
+        :param key: key of the object.
+        :return: content of the object.
+        """
+        size, etag = await self._pool.run("S3 head_object", self._head_object, key)
+        content = bytearray(size)
+        open_writer = functools.partial(_buffer_writer, memoryview(content))
+        await self._download_ranges(key, size, etag, open_writer)
+        return content
+
+    async def download_file(self, key: str, path: str | Path) -> int:
+        """
+        Download object in parallel ranges into a preallocated file.
+
+        :param key: key of the object.
+        :param path: path of the file, it is overwritten.
+        :return: size of the object.
+        """
+        size, etag = await self._pool.run("S3 head_object", self._head_object, key)
+        with open(path, "wb") as target:
+            os.truncate(target.fileno(), size)
+        await self._download_ranges(
+            key,
+            size,
+            etag,
+            functools.partial(_file_writer, path),
+        )
+        return size
+
+    async def _upload_parts(
+        self,
+        key: str,
+        size: int,
+        read_part: PartReader,
+        upload_id: str | None,
+        abort_on_failure: bool,
+    ) -> None:
+        upload_id, uploaded = await self._start_upload(key, upload_id)
+        part_size = max(self.part_size, math.ceil(size / MAX_PARTS))
+        calls = [
+            functools.partial(
+                self._pool.run,
+                "S3 upload_part",
+                self._upload_part,
+                key,
+                upload_id,
+                number,
+                functools.partial(read_part, offset, min(part_size, size - offset)),
+            )
+            for number, offset in enumerate(range(0, size, part_size), start=1)
+            if number not in uploaded
+        ]
+        try:
+            results = await gather_bounded(calls, self.concurrency)
+        except asyncio.CancelledError:
+            if abort_on_failure:
+                self._start_abort(key, upload_id)
+            raise
+        failures = [error for error in results if isinstance(error, BaseException)]
+        if failures:
+            aborted = abort_on_failure and await asyncio.shield(
+                self._start_abort(key, upload_id),
+            )
+            raise MultipartUploadError(upload_id, aborted) from failures[0]
+
+        for number, etag in results:
+            uploaded[number] = etag
+        await self._pool.run(
+            "S3 complete_multipart_upload",
+            self._complete_upload,
+            key,
+            upload_id,
+            uploaded,
+        )
+
+    async def _start_upload(
+        self,
+        key: str,
+        upload_id: str | None,
+    ) -> Tuple[str, Dict[int, str]]:
+        if upload_id is not None:
+            uploaded = await self._pool.run(
+                "S3 list_parts",
+                self._list_parts,
+                key,
+                upload_id,
+            )
+            return upload_id, uploaded
+        upload_id = await self._pool.run(
+            "S3 create_multipart_upload",
+            self._create_upload,
+            key,
+        )
+        return upload_id, {}
+
+    async def _download_ranges(
+        self,
+        key: str,
+        size: int,
+        etag: str,
+        open_writer: RangeWriter,
+    ) -> None:
+        calls = [
+            functools.partial(
+                self._pool.run,
+                "S3 get_object",
+                self._download_range,
+                key,
+                etag,
+                offset,
+                min(self.part_size, size - offset),
+                open_writer,
+            )
+            for offset in range(0, size, self.part_size)
+        ]
+        for download_result in await gather_bounded(calls, self.concurrency):
+            if isinstance(download_result, BaseException):
+                raise download_result
+
+    def _start_abort(self, key: str, upload_id: str) -> asyncio.Task[bool]:
+        # An empty context drops the deadline, and the task outlives a cancelled caller.
+        abort = asyncio.create_task(
+            self._abort(key, upload_id),
+            context=contextvars.Context(),
+        )
+        self._aborts.add(abort)
+        abort.add_done_callback(self._aborts.discard)
+        return abort
+
+    async def _abort(self, key: str, upload_id: str) -> bool:
+        try:
+            await self._pool.run(
+                "S3 abort_multipart_upload",
+                self._abort_upload,
+                key,
+                upload_id,
+            )
+        except Exception as exc:
+            logger.warning("Multipart upload {0} wasn't aborted: {1!r}", upload_id, exc)
+            return False
+        return True
+
+    def _put_object(self, key: str, read_part: PartReader, size: int) -> None:
+        self._pool.client.put_object(
+            Bucket=self._bucket,
+            Key=key,
+            Body=read_part(0, size),
+        )
+
+    def _create_upload(self, key: str) -> str:
+        response = self._pool.client.create_multipart_upload(
+            Bucket=self._bucket,
+            Key=key,
+        )
+        return response["UploadId"]
+
+    def _list_parts(self, key: str, upload_id: str) -> Dict[int, str]:
+        paginator = self._pool.client.get_paginator("list_parts")
+        pages = paginator.paginate(Bucket=self._bucket, Key=key, UploadId=upload_id)
+        return {
+            part["PartNumber"]: part["ETag"]
+            for page in pages
+            for part in page.get("Parts", [])
+        }
+
+    def _upload_part(
+        self,
+        key: str,
+        upload_id: str,
+        number: int,
+        read_content: Callable[[], bytes],
+    ) -> Tuple[int, str]:
+        # The part is read in the thread, so only parts in flight are in memory.
+        response = self._pool.client.upload_part(
+            Bucket=self._bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=number,
+            Body=read_content(),
+        )
+        return number, response["ETag"]
+
+    def _complete_upload(
+        self,
+        key: str,
+        upload_id: str,
+        uploaded: Dict[int, str],
+    ) -> None:
+        parts = [
+            {"PartNumber": number, "ETag": etag}
+            for number, etag in sorted(uploaded.items())
+        ]
+        self._pool.client.complete_multipart_upload(
+            Bucket=self._bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+
+    def _abort_upload(self, key: str, upload_id: str) -> None:
+        self._pool.client.abort_multipart_upload(
+            Bucket=self._bucket,
+            Key=key,
+            UploadId=upload_id,
+        )
+
+    def _head_object(self, key: str) -> Tuple[int, str]:
+        response = self._pool.client.head_object(Bucket=self._bucket, Key=key)
+        return response["ContentLength"], response["ETag"]
+
+    def _download_range(  # noqa: WPS211
+        self,
+        key: str,
+        etag: str,
+        offset: int,
+        length: int,
+        open_writer: RangeWriter,
+    ) -> None:
+        # The ETag makes sure all ranges come from the same version of the object.
+        response = self._pool.client.get_object(
+            Bucket=self._bucket,
+            Key=key,
+            Range="bytes={0}-{1}".format(offset, offset + length - 1),
+            IfMatch=etag,
+        )
+        with open_writer() as writer:
+            for chunk in response["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE):
+                writer(offset, chunk)
+                offset += len(chunk)
+
+
+def _open_source(source: TransferSource) -> Tuple[int, PartReader]:
+    if isinstance(source, (str, Path)):
+        return os.stat(source).st_size, functools.partial(_read_file, source)
+    view = memoryview(source).cast("B")
+    return len(view), functools.partial(_read_buffer, view)
+
+
+def _read_file(path: str | Path, offset: int, length: int) -> bytes:
+    with open(path, "rb") as source_file:
+        return os.pread(source_file.fileno(), length, offset)
+
+
+def _read_buffer(view: memoryview, offset: int, length: int) -> bytes:
+    return bytes(view[offset : offset + length])
+
+
+@contextmanager
+def _buffer_writer(view: memoryview) -> Iterator[ChunkWriter]:
+    yield functools.partial(_write_buffer, view)
+
+
+@contextmanager
+def _file_writer(path: str | Path) -> Iterator[ChunkWriter]:
+    with open(path, "r+b") as target:
+        yield functools.partial(_write_file, target.fileno())
+
+
+def _write_buffer(view: memoryview, offset: int, chunk: bytes) -> None:
+    view[offset : offset + len(chunk)] = chunk  # noqa: WPS362
+
+
+def _write_file(descriptor: int, offset: int, chunk: bytes) -> None:
+    os.pwrite(descriptor, chunk, offset)
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+import asyncpg
+from tortoise import connections
+from tortoise.backends.asyncpg.client import AsyncpgDBClient, TransactionWrapper
+from tortoise.backends.base.client import (
+    PoolConnectionWrapper,
+    TransactionContextPooled,
+)
+from tortoise.exceptions import DBConnectionError
+
+from app.domains.database import PRIMARY_CONNECTION, REPLICA_CONNECTIONS
+from app.domains.instrumentation import InstrumentedConnection
+from app.utils.deadline import DeadlineExceededError, limit_timeout
+
+
+class PoolTimeoutError(DBConnectionError):
+    """Raised when no connection of the pool was released in time."""
+
+
+@dataclass
+class PoolStats:
+    """Counters of a connection pool."""
+
+    acquisitions: int = 0
+    timeouts: int = 0
+    waiters: int = 0
+    acquire_seconds: float = 0
+    max_acquire_seconds: float = 0
+
+
+class InstrumentedPoolConnectionWrapper(PoolConnectionWrapper[asyncpg.Connection]):
+    """Acquires connections of the pool with a timeout."""
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        await self.ensure_connection()
+        self.connection = await self.client.acquire_from_pool()
+        return self.connection
+
+
+class InstrumentedTransactionContext(TransactionContextPooled):
+    """Starts transactions on connections acquired with a timeout."""
+
+    async def __aenter__(self) -> TransactionWrapper:  # type: ignore[override]
+        await self.ensure_connection()
+        self.token = connections.set(self.connection_name, self.connection)
+        parent = self.connection._parent  # noqa: WPS437
+        self.connection._connection = await parent.acquire_from_pool()  # noqa: WPS437
+        await self.connection.start()
+        return self.connection
+
+
+class InstrumentedAsyncpgDBClient(AsyncpgDBClient):
+    """
+    Asyncpg client which bounds and measures waiting for pool connections.
+
+    Asyncpg waits for a free connection forever,
+    so under bursty load requests queue invisibly.
+    """
+
+    connection_class = InstrumentedConnection
+
+    def __init__(self, acquire_timeout: float | None = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.acquire_timeout = acquire_timeout
+        self.pool_stats = PoolStats()
+
+    def acquire_connection(self) -> InstrumentedPoolConnectionWrapper:
+        """
+        Get context manager which holds a connection of the pool.
+
+        :return: context manager of the connection.
+        """
+        return InstrumentedPoolConnectionWrapper(self)
+
+    async def acquire_from_pool(self) -> asyncpg.Connection:
+        """
+        Take connection from the pool, waiting at most acquire timeout.
+
+        The wait is also bounded by the deadline of the current request.
+
+        :return: connection of the pool.
+        :raises DBConnectionError: If the pool is closed.
+        :raises PoolTimeoutError: If no connection was released in time.
+        :raises DeadlineExceededError: If the request ran out of time first.
+        """
+        if self._pool is None:
+            raise DBConnectionError(f"Pool of {self.connection_name} is closed")
+        timeout = limit_timeout("pool acquire", self.acquire_timeout)
+        self.pool_stats.waiters += 1
+        started = time.monotonic()
+        try:
+            connection = await self._pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            if timeout != self.acquire_timeout:
+                # The budget of the request was shorter, the pool isn't at fault.
+                raise DeadlineExceededError(
+                    "Request deadline passed while waiting for a connection",
+                )
+            self.pool_stats.timeouts += 1
+            raise PoolTimeoutError(
+                f"No connection of {self.connection_name} released in time",
+            )
+        finally:
+            self.pool_stats.waiters -= 1
+        waited = time.monotonic() - started
+        self.pool_stats.acquisitions += 1
+        self.pool_stats.acquire_seconds += waited
+        self.pool_stats.max_acquire_seconds = max(
+            self.pool_stats.max_acquire_seconds,
+            waited,
+        )
+        return connection
+
+    def get_pool_stats(self) -> Dict[str, float]:
+        """
+        Get current state and counters of the pool.
+
+        :return: size limits, open and in use connections, waiters and timings.
+        """
+        size = self._pool.get_size() if self._pool else 0
+        idle = self._pool.get_idle_size() if self._pool else 0
+        return {
+            "min_size": self.pool_minsize,
+            "max_size": self.pool_maxsize,
+            "size": size,
+            "in_use": size - idle,
+            **asdict(self.pool_stats),
+        }
+
+    def _in_transaction(self) -> InstrumentedTransactionContext:
+        return InstrumentedTransactionContext(TransactionWrapper(self))
+
+
+# Tortoise looks up the client of an engine module by this name.
+client_class = InstrumentedAsyncpgDBClient
+
+
+def get_pools_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Get stats of the pools of the primary and replica databases.
+
+    :return: stats of each pool by connection name.
+    """
+    pools = {}
+    for name in (PRIMARY_CONNECTION, *REPLICA_CONNECTIONS):
+        client = connections.get(name)
+        if isinstance(client, InstrumentedAsyncpgDBClient):
+            pools[name] = client.get_pool_stats()
+    return pools
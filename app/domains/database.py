@@ -1,4 +1,6 @@
-from typing import List
+from typing import Any, Dict, List
+
+from tortoise.backends.base.config_generator import expand_db_url
 
 from app.settings import settings
 
@@ -6,14 +8,46 @@ MODELS_MODULES: List[str] = [
     "app.domains.models.user_model",
 ]  # noqa: WPS407
 
+# Connection of the primary database, it serves all writes.
+PRIMARY_CONNECTION = "default"
+
+# Connections of the read replicas.
+REPLICA_CONNECTIONS: List[str] = [
+    f"replica_{index}" for index, _ in enumerate(settings.db_replica_urls)
+]
+
+
+def get_connection_config(db_url: str) -> Dict[str, Any]:
+    """
+    Build tortoise connection config with the pool settings.
+
+    :param db_url: url of the database.
+    :return: connection config.
+    """
+    connection_config = expand_db_url(db_url)
+    connection_config["engine"] = "app.domains.backend"
+    connection_config["credentials"].update(
+        minsize=settings.db_pool_min_size,
+        maxsize=settings.db_pool_max_size,
+        acquire_timeout=settings.db_pool_acquire_timeout,
+        max_inactive_connection_lifetime=settings.db_pool_max_inactive_lifetime,
+        server_settings={"statement_timeout": str(settings.db_statement_timeout_ms)},
+    )
+    return connection_config
+
+
 TORTOISE_CONFIG = {  # noqa: WPS407
     "connections": {
-        "default": str(settings.db_url),
+        PRIMARY_CONNECTION: get_connection_config(str(settings.db_url)),
+        **{
+            name: get_connection_config(db_url)
+            for name, db_url in zip(REPLICA_CONNECTIONS, settings.db_replica_urls)
+        },
     },
     "apps": {
         "models": {
             "models": MODELS_MODULES + ["aerich.models"],
-            "default_connection": "default",
+            "default_connection": PRIMARY_CONNECTION,
         },
     },
 }
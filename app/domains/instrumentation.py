@@ -0,0 +1,209 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Set
+
+import asyncpg
+from loguru import logger
+
+from app.settings import settings
+from app.utils.deadline import limit_timeout
+
+STRING_LITERAL = re.compile("'(?:[^']|'')*'")
+PLACEHOLDER = re.compile(r"\$\d+")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class QueryStats:
+    """Statements issued while handling a single request."""
+
+    path: str = ""
+    count: int = 0
+    seconds: float = 0
+    shapes: Counter[str] = field(default_factory=Counter)
+    repeated: Set[str] = field(default_factory=set)
+
+
+# Statements of the current request, None outside of requests.
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats",
+    default=None,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Replace literals and placeholders of the statement so equal shapes match.
+
+    :param query: text of the statement.
+    :return: normalized text of the statement.
+    """
+    query = STRING_LITERAL.sub("?", query)
+    query = PLACEHOLDER.sub("?", query)
+    query = NUMBER_LITERAL.sub("?", query)
+    query = PLACEHOLDER_LIST.sub("(?)", query)
+    return WHITESPACE.sub(" ", query).strip()
+
+
+def record_query(query: str, seconds: float) -> None:
+    """
+    Account statement to the current request and log it if it looks wrong.
+
+    :param query: text of the statement.
+    :param seconds: duration of the statement.
+    """
+    if seconds * 1000 >= settings.sql_slow_query_ms:
+        logger.warning(
+            "Slow query took {0:.1f} ms: {1}",
+            seconds * 1000,
+            normalize_sql(query),
+        )
+
+    query_stats = current_query_stats.get()
+    if query_stats is None:
+        return
+    shape = normalize_sql(query)
+    query_stats.count += 1
+    query_stats.seconds += seconds
+    query_stats.shapes[shape] += 1
+    repeated = query_stats.shapes[shape] > settings.sql_repeated_query_threshold
+    if repeated and shape not in query_stats.repeated:
+        query_stats.repeated.add(shape)
+        logger.warning(
+            "Possible N+1 queries in {0}, statement ran more than {1} times: {2}",
+            query_stats.path,
+            settings.sql_repeated_query_threshold,
+            shape,
+        )
+
+
+def add_query_stats(query_stats: QueryStats, shared: QueryStats) -> None:
+    """
+    Account statements of a read shared with other requests.
+
+    :param query_stats: statements of the request.
+    :param shared: statements of the shared read.
+    """
+    query_stats.count += shared.count
+    query_stats.seconds += shared.seconds
+    query_stats.shapes.update(shared.shapes)
+
+
+@contextmanager
+def track_queries(query_stats: QueryStats | None) -> Iterator[QueryStats | None]:
+    """
+    Account statements executed in the block to the given stats.
+
+    :param query_stats: stats of the request, None stops accounting.
+    :yields: the given stats.
+    """
+    token = current_query_stats.set(query_stats)
+    try:
+        yield query_stats
+    finally:
+        current_query_stats.reset(token)
+
+
+@contextmanager
+def timed_query(query: str) -> Iterator[None]:
+    """
+    Measure statement executed in the block.
+
+    :param query: text of the statement.
+    :yields: Nothing.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_query(query, time.perf_counter() - started)
+
+
+class InstrumentedConnection(asyncpg.Connection):  # type: ignore[misc]
+    """
+    Asyncpg connection which measures every statement it executes.
+
+    Statements are bounded by the deadline of the current request,
+    asyncpg cancels them on the server once it passes.
+    """
+
+    async def execute(self, query: str, *args: Any, **kwargs: Any) -> str:
+        """
+        Execute statement.
+
+        :param query: text of the statement.
+        :param args: arguments of the statement.
+        :param kwargs: options of asyncpg.
+        :return: status of the statement.
+        """
+        kwargs["timeout"] = limit_timeout("query", kwargs.get("timeout"))
+        with timed_query(query):
+            return await super().execute(query, *args, **kwargs)
+
+    async def executemany(self, command: str, args: Any, **kwargs: Any) -> None:
+        """
+        Execute statement for each set of arguments.
+
+        :param command: text of the statement.
+        :param args: sets of arguments.
+        :param kwargs: options of asyncpg.
+        """
+        kwargs["timeout"] = limit_timeout("query", kwargs.get("timeout"))
+        with timed_query(command):
+            await super().executemany(command, args, **kwargs)
+
+    async def fetch(self, query: str, *args: Any, **kwargs: Any) -> List[Any]:
+        """
+        Run query and fetch all rows.
+
+        :param query: text of the query.
+        :param args: arguments of the query.
+        :param kwargs: options of asyncpg.
+        :return: rows.
+        """
+        kwargs["timeout"] = limit_timeout("query", kwargs.get("timeout"))
+        with timed_query(query):
+            return await super().fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run query and fetch the first row.
+
+        :param query: text of the query.
+        :param args: arguments of the query.
+        :param kwargs: options of asyncpg.
+        :return: row or None.
+        """
+        kwargs["timeout"] = limit_timeout("query", kwargs.get("timeout"))
+        with timed_query(query):
+            return await super().fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run query and fetch a single value.
+
+        :param query: text of the query.
+        :param args: arguments of the query.
+        :param kwargs: options of asyncpg.
+        :return: value or None.
+        """
+        kwargs["timeout"] = limit_timeout("query", kwargs.get("timeout"))
+        with timed_query(query):
+            return await super().fetchval(query, *args, **kwargs)
+
+    async def reset(self, **kwargs: Any) -> None:
+        """
+        Reset connection state before it goes back to the pool.
+
+        Statements of the reset are not accounted to the request.
+
+        :param kwargs: options of asyncpg.
+        """
+        with track_queries(None):
+            await super().reset(**kwargs)
@@ -16,3 +16,4 @@ class UserModel(models.Model, BaseModel):
 
     class Meta:
         table = "users"
+        indexes = (("created_at", "id"),)
@@ -0,0 +1,101 @@
+import time
+from typing import Dict, Sequence
+
+from app.domains.database import PRIMARY_CONNECTION, REPLICA_CONNECTIONS
+from app.settings import settings
+
+
+class ReplicaRouter:
+    """
+    Chooses database connection for read-only queries.
+
+    Reads go to replicas round-robin, writes always go to the primary.
+    A replica which failed is ejected for a while, and a caller who just
+    wrote is pinned to the primary so it reads its own writes.
+    Pins are kept in the memory of the worker, so reads served
+    by other workers aren't pinned.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[str],
+        ejection_seconds: float,
+        read_your_writes_seconds: float,
+    ) -> None:
+        self.replicas = list(replicas)
+        self.ejection_seconds = ejection_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._next_replica = 0
+        self._ejected_until: Dict[str, float] = {}
+        self._pinned_until: Dict[str, float] = {}
+
+    def db_for_read(self, caller: str | None = None) -> str:
+        """
+        Choose connection for a read-only query.
+
+        :param caller: id of the caller, if known.
+        :return: name of the connection.
+        """
+        now = time.monotonic()
+        if self.is_pinned(caller):
+            return PRIMARY_CONNECTION
+        for _ in self.replicas:
+            replica = self.replicas[self._next_replica % len(self.replicas)]
+            self._next_replica += 1
+            if self._ejected_until.get(replica, 0) <= now:
+                return replica
+        return PRIMARY_CONNECTION
+
+    def is_pinned(self, caller: str | None) -> bool:
+        """
+        Check whether reads of the caller go to the primary.
+
+        :param caller: id of the caller, if known.
+        :return: whether the caller wrote recently.
+        """
+        if not caller:
+            return False
+        return self._pinned_until.get(caller, 0) > time.monotonic()
+
+    def eject(self, replica: str) -> None:
+        """
+        Stop routing reads to the replica for a while.
+
+        :param replica: name of the failed connection.
+        """
+        self._ejected_until[replica] = time.monotonic() + self.ejection_seconds
+
+    def pin(self, *callers: str) -> None:
+        """
+        Route reads of the callers to the primary for a while.
+
+        :param callers: ids of the callers whose data was written.
+        """
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        self._pinned_until = {
+            pinned: until for pinned, until in self._pinned_until.items() if until > now
+        }
+        for caller in callers:
+            self._pinned_until[caller] = now + self.read_your_writes_seconds
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the router.
+
+        :return: number of replicas, ejected replicas and pinned callers.
+        """
+        now = time.monotonic()
+        return {
+            "replicas": len(self.replicas),
+            "ejected": sum(until > now for until in self._ejected_until.values()),
+            "pinned": sum(until > now for until in self._pinned_until.values()),
+        }
+
+
+replica_router = ReplicaRouter(
+    REPLICA_CONNECTIONS,
+    ejection_seconds=settings.db_replica_ejection_seconds,
+    read_your_writes_seconds=settings.db_read_your_writes_seconds,
+)
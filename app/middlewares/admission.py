@@ -0,0 +1,221 @@
+import asyncio
+import enum
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Collection, Deque, Dict
+
+from fastapi import status as http_status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.settings import settings
+
+# Future of a queued request, resolved once a slot is handed over to it.
+Waiter = asyncio.Future[None]
+
+
+class Priority(enum.IntEnum):
+    """Priority class of a request, higher is admitted first."""
+
+    NORMAL = 0
+    HIGH = 1
+
+
+@dataclass
+class AdmissionStats:
+    """Counters of the admission controller."""
+
+    admitted: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    in_flight: int = 0
+    queue_wait_seconds: float = 0
+
+
+class AdmissionController:
+    """
+    Bounds number of requests handled by the worker at once.
+
+    Requests over the concurrency limit wait in a bounded queue
+    for at most the queue timeout, the rest is rejected right away,
+    so overload fails fast instead of timing out every request.
+    High priority requests are admitted first and may use reserved
+    slots, so they are never starved by normal ones.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        reserved_slots: int,
+    ) -> None:
+        """
+        Admission controller.
+
+        :param max_concurrency: requests handled at once, 0 disables the limit.
+        :param max_queue: requests of each priority waiting for a slot at once.
+        :param queue_timeout: seconds a request may wait for a slot.
+        :param reserved_slots: extra slots usable only by high priority requests.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.reserved_slots = reserved_slots
+        self.stats = AdmissionStats()
+        self._queues: Dict[Priority, Deque[Waiter]] = {
+            priority: deque() for priority in Priority
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether the concurrency is limited.
+
+        :return: whether the limit is set.
+        """
+        return self.max_concurrency > 0
+
+    @asynccontextmanager
+    async def admit(self, priority: Priority) -> AsyncIterator[bool]:
+        """
+        Hold slot of the worker while the block runs.
+
+        :param priority: priority class of the request.
+        :yields: whether the request was admitted.
+        """
+        admitted = await self._acquire(priority)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self._release()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the controller.
+
+        :return: counters, requests in flight and queued by priority.
+        """
+        return {
+            **asdict(self.stats),
+            **{
+                "queued_{0}".format(priority.name.lower()): len(queue)
+                for priority, queue in self._queues.items()
+            },
+        }
+
+    def _limit(self, priority: Priority) -> int:
+        if priority is Priority.HIGH:
+            return self.max_concurrency + self.reserved_slots
+        return self.max_concurrency
+
+    def _has_waiters(self, priority: Priority) -> bool:
+        return any(self._queues[other] for other in Priority if other >= priority)
+
+    async def _acquire(self, priority: Priority) -> bool:
+        can_run = self.stats.in_flight < self._limit(priority)
+        if can_run and not self._has_waiters(priority):
+            self._admit()
+            return True
+        if len(self._queues[priority]) >= self.max_queue:
+            self.stats.rejected += 1
+            return False
+        return await self._wait(priority)
+
+    async def _wait(self, priority: Priority) -> bool:
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        queued = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(priority, waiter):
+                self.stats.timeouts += 1
+                self.stats.rejected += 1
+                return False
+        except asyncio.CancelledError:
+            # The client is gone, give back the slot if it was handed over.
+            if not self._abandon(priority, waiter):
+                self._release()
+            raise
+        self.stats.queue_wait_seconds += time.monotonic() - queued
+        return True
+
+    def _abandon(self, priority: Priority, waiter: Waiter) -> bool:
+        if waiter.done():
+            return False
+        self._queues[priority].remove(waiter)
+        waiter.cancel()
+        return True
+
+    def _admit(self) -> None:
+        self.stats.admitted += 1
+        self.stats.in_flight += 1
+
+    def _release(self) -> None:
+        self.stats.in_flight -= 1
+        for priority in sorted(Priority, reverse=True):
+            queue = self._queues[priority]
+            if queue and self.stats.in_flight < self._limit(priority):
+                # The slot is handed over, so no newcomer takes it first.
+                self._admit()
+                queue.popleft().set_result(None)
+                return
+
+
+class AdmissionMiddleware:
+    """
+    Sheds load over the capacity of the worker with fast 503 responses.
+
+    Requests to the priority paths, e.g. health checks and logins,
+    are admitted before the others.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        priority_paths: Collection[str] = (),
+        retry_after: int = 1,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.priority_paths = frozenset(path.rstrip("/") for path in priority_paths)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle ASGI request.
+
+        :param scope: scope of the request.
+        :param receive: channel of incoming messages.
+        :param send: channel of outgoing messages.
+        """
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        priority = Priority.NORMAL
+        if scope["path"].rstrip("/") in self.priority_paths:
+            priority = Priority.HIGH
+        async with self.controller.admit(priority) as admitted:
+            if admitted:
+                await self.app(scope, receive, send)
+                return
+        response = ORJSONResponse(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Server is overloaded"},
+            headers={"Retry-After": str(self.retry_after)},
+        )
+        await response(scope, receive, send)
+
+
+admission_controller = AdmissionController(
+    max_concurrency=settings.admission_max_concurrency,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    reserved_slots=settings.admission_reserved_slots,
+)
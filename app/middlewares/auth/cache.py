@@ -0,0 +1,16 @@
+from app.domains.models.user_model import UserModel
+from app.middlewares.auth.security import TokenPayload
+from app.settings import settings
+from app.utils.ttl_cache import TTLCache
+
+# Verified claims of access tokens keyed by digest of the token.
+token_cache: TTLCache[bytes, TokenPayload] = TTLCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.token_cache_ttl,
+)
+
+# Authenticated users keyed by id, it is invalidated by UserRepository writes.
+principal_cache: TTLCache[str, UserModel] = TTLCache(
+    maxsize=settings.principal_cache_size if settings.principal_cache_enabled else 0,
+    ttl=settings.principal_cache_ttl,
+)
@@ -0,0 +1,7 @@
+from contextvars import ContextVar
+
+# Id of the authenticated caller of the current request, bound by get_current_user.
+current_principal_id: ContextVar[str | None] = ContextVar(
+    "current_principal_id",
+    default=None,
+)
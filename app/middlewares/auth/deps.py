@@ -1,3 +1,5 @@
+import hashlib
+import time
 from typing import Annotated
 
 from fastapi import Depends, HTTPException
@@ -6,19 +8,29 @@ from jose import JWTError, jwt
 from pydantic import ValidationError
 
 from app.domains.models.user_model import UserModel
-from app.middlewares.auth.security import TokenDep, TokenPayload, verify_password
-from app.repositories.user_repository import UserRepository
+from app.middlewares.auth.cache import principal_cache, token_cache
+from app.middlewares.auth.context import current_principal_id
+from app.middlewares.auth.security import TokenDep, TokenPayload, verify_password_async
+from app.services.user_service import UserService
 from app.settings import settings
 
 
-async def get_current_user(token: TokenDep) -> UserModel:
+def decode_token(token: str) -> TokenPayload:
     """
-    Asynchronously retrieves the current user from the provided JWT token.
+    Verifies the JWT token and returns its claims.
 
-    :param token: The JWT token containing the user's authentication information.
-    :return: User.
-    :raises HTTPException: If the user is not found or inactive.
+    Verified claims are cached by digest of the token,
+    the entry expires no later than the token itself.
+
+    :param token: The JWT token.
+    :return: claims of the token.
+    :raises HTTPException: If the token is invalid.
     """
+    token_key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(token_key)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(
             token,
@@ -32,9 +44,30 @@ async def get_current_user(token: TokenDep) -> UserModel:
             detail="Could not validate credentials",
         )
 
-    user = (
-        await UserRepository.get_user_by_id(token_data.sub) if token_data.sub else None
+    expires_at = payload.get("exp")
+    token_cache.set(
+        token_key,
+        token_data,
+        ttl=expires_at - time.time() if expires_at else None,
     )
+    return token_data
+
+
+async def get_current_user(token: TokenDep) -> UserModel:
+    """
+    Asynchronously retrieves the current user from the provided JWT token.
+
+    :param token: The JWT token containing the user's authentication information.
+    :return: User.
+    :raises HTTPException: If the user is not found or inactive.
+    """
+    token_data = decode_token(token)
+    current_principal_id.set(token_data.sub)
+
+    user = principal_cache.get(token_data.sub) if token_data.sub else None
+    if user is None and token_data.sub:
+        user = await UserService().get_user_by_id(token_data.sub)
+        principal_cache.set(token_data.sub, user)
     if not user:
         raise HTTPException(
             status_code=http_status.HTTP_404_NOT_FOUND,
@@ -75,7 +108,7 @@ async def authenticate(email: str, password: str) -> UserModel | None:
     :param password: The password of the user.
     :return: User.
     """
-    db_user = await UserRepository.get_user_by_email(email=email)
-    if not verify_password(password, db_user.hashed_password):
+    db_user = await UserService().get_user_by_email(email=email)
+    if not await verify_password_async(password, db_user.hashed_password):
         return None
     return db_user
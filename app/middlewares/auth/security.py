@@ -1,7 +1,13 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
-from typing import Annotated, Any
+from typing import Annotated, Any, Callable, Dict, List, Sequence, Tuple, TypeVar
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException
+from fastapi import status as http_status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from passlib.context import CryptContext
@@ -11,6 +17,8 @@ from app.settings import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+ResultType = TypeVar("ResultType")
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     """
@@ -50,6 +58,189 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _timed_call(func: Callable[..., Any], *args: Any) -> Tuple[float, float, Any]:
+    """
+    Run function and report when it started and finished.
+
+    It runs inside of the worker process, so the start time
+    tells how long the job was waiting in the pool queue.
+
+    :param func: function to run.
+    :param args: arguments of the function.
+    :return: start time, finish time and result of the function.
+    """
+    started = time.monotonic()
+    result_value = func(*args)
+    return started, time.monotonic(), result_value
+
+
+@dataclass
+class HashingStats:
+    """Counters of the password hasher."""
+
+    submitted: int = 0
+    completed: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    in_flight: int = 0
+    queue_wait_seconds: float = 0
+    hash_seconds: float = 0
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded process pool.
+
+    Each bcrypt round takes hundreds of milliseconds of CPU,
+    so running it in the event loop blocks every other request of the worker.
+    A job holds its slot of the queue until its process is done with it,
+    even when the caller gave up waiting.
+    """
+
+    def __init__(self, pool_size: int, max_queue: int, timeout: float) -> None:
+        self._pool_size = pool_size
+        self._max_queue = max_queue
+        self._timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self.stats = HashingStats()
+
+    async def run(self, func: Callable[..., ResultType], *args: Any) -> ResultType:
+        """
+        Run hashing function in the pool.
+
+        :param func: picklable module level function to run.
+        :param args: arguments of the function.
+        :return: result of the function.
+        :raises HTTPException: If the pool is overloaded or the job timed out.
+        """
+        if self._pool_size <= 0:
+            return func(*args)
+        if self.stats.in_flight >= self._pool_size + self._max_queue:
+            self.stats.rejected += 1
+            raise HTTPException(
+                status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing is overloaded",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        job = self._get_executor().submit(_timed_call, func, *args)
+        self.stats.submitted += 1
+        self.stats.in_flight += 1
+        # A job which timed out keeps its process busy, so it keeps its slot too.
+        job.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._release_slot),
+        )
+        try:
+            started, finished, result_value = await asyncio.wait_for(
+                asyncio.wrap_future(job),
+                timeout=self._timeout,
+            )
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise HTTPException(
+                status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing timed out",
+                headers={"Retry-After": "1"},
+            )
+
+        self.stats.completed += 1
+        self.stats.queue_wait_seconds += max(started - submitted, 0)
+        self.stats.hash_seconds += finished - started
+        return result_value
+
+    async def run_many(
+        self,
+        func: Callable[..., ResultType],
+        args_list: Sequence[Tuple[Any, ...]],
+    ) -> List[ResultType]:
+        """
+        Run hashing function for many arguments in parallel.
+
+        At most pool size jobs of the batch are in flight at once,
+        so a large batch doesn't take the queue from other requests.
+
+        :param func: picklable module level function to run.
+        :param args_list: arguments of each call.
+        :return: results of the function, in order.
+        """
+        semaphore = asyncio.Semaphore(max(self._pool_size, 1))
+
+        async def _run_one(args: Tuple[Any, ...]) -> ResultType:  # noqa: WPS430
+            async with semaphore:
+                return await self.run(func, *args)
+
+        return list(await asyncio.gather(*(_run_one(args) for args in args_list)))
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the hasher.
+
+        :return: counters, jobs waiting for a process and accumulated timings.
+        """
+        queue_depth = max(self.stats.in_flight - self._pool_size, 0)
+        return {**asdict(self.stats), "queue_depth": queue_depth}
+
+    def shutdown(self) -> None:
+        """Stop worker processes of the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release_slot(self) -> None:
+        self.stats.in_flight -= 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+
+password_hasher = PasswordHasher(
+    pool_size=settings.hashing_pool_size,
+    max_queue=settings.hashing_max_queue,
+    timeout=settings.hashing_timeout,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify password without blocking the event loop.
+
+    :param plain_password: plain_password.
+    :param hashed_password: hashed_password.
+    :return: bollean value.
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Get password hash without blocking the event loop.
+
+    :param password: password.
+    :return: hash_password.
+    """
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def hash_passwords_async(passwords: Sequence[str]) -> List[str]:
+    """
+    Get hashes of many passwords in parallel.
+
+    :param passwords: passwords.
+    :return: hash_passwords, in order.
+    """
+    return await password_hasher.run_many(
+        get_password_hash,
+        [(password,) for password in passwords],
+    )
+
+
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.api_prefix}/v1/auth/access-token",
 )
@@ -0,0 +1,306 @@
+import zlib
+from typing import Callable, Dict, List, Mapping, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # noqa: WPS433
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore[assignment]  # noqa: WPS440
+
+try:
+    import zstandard  # noqa: WPS433
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]  # noqa: WPS440
+
+# Media types worth compressing, by prefix.
+COMPRESSIBLE_MEDIA_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+# Levels of each encoding for media types without own levels.
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+
+
+class StreamEncoder(Protocol):
+    """Compressor of a response body sent in chunks."""
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Compress chunk and flush it, so the client can decode it right away.
+
+        :param chunk: part of the body.
+        """
+
+    def finish(self) -> bytes:
+        """Finish the compressed stream."""
+
+
+class GzipEncoder:
+    """Gzip stream encoder."""
+
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Compress chunk and flush it.
+
+        :param chunk: part of the body.
+        :return: compressed part of the body.
+        """
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH,
+        )
+
+    def finish(self) -> bytes:
+        """
+        Finish the compressed stream.
+
+        :return: trailer of the stream.
+        """
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    """Brotli stream encoder."""
+
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Compress chunk and flush it.
+
+        :param chunk: part of the body.
+        :return: compressed part of the body.
+        """
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        """
+        Finish the compressed stream.
+
+        :return: trailer of the stream.
+        """
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    """Zstandard stream encoder."""
+
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        """
+        Compress chunk and flush it.
+
+        :param chunk: part of the body.
+        :return: compressed part of the body.
+        """
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK,
+        )
+
+    def finish(self) -> bytes:
+        """
+        Finish the compressed stream.
+
+        :return: trailer of the stream.
+        """
+        return self._compressor.flush()
+
+
+def get_available_encoders() -> Dict[str, Callable[[int], StreamEncoder]]:
+    """
+    Get encoders of the installed libraries, in order of preference.
+
+    :return: factories of encoders by encoding name.
+    """
+    encoders: Dict[str, Callable[[int], StreamEncoder]] = {}
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> str | None:
+    """
+    Choose encoding acceptable by the client.
+
+    Among encodings with the highest quality the server preference wins.
+
+    :param accept_encoding: value of the Accept-Encoding header.
+    :param available: encodings supported by the server, in order of preference.
+    :return: chosen encoding, None for identity.
+    """
+    qualities = _parse_qualities(accept_encoding)
+    wildcard = qualities.get("*", 0)
+    best: str | None = None
+    best_quality: float = 0
+    for encoding in available:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _parse_qualities(accept_encoding: str) -> Dict[str, float]:
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0
+        qualities[name.strip().lower()] = quality
+    return qualities
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with zstd, brotli or gzip.
+
+    Bodies are compressed chunk by chunk as they are sent, so streaming
+    responses are never buffered. Strong ETags of compressed responses
+    are weakened. Complete bodies below the minimum size,
+    media types which don't compress well and already encoded responses
+    are sent as is.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Mapping[str, Mapping[str, int]] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or {}
+        self.encoders = get_available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle ASGI request.
+
+        :param scope: scope of the request.
+        :param receive: channel of incoming messages.
+        :param send: channel of outgoing messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""),
+            list(self.encoders),
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def get_level(self, media_type: str, encoding: str) -> int:
+        """
+        Get compression level for the media type.
+
+        :param media_type: media type of the response, without parameters.
+        :param encoding: chosen encoding.
+        :return: compression level.
+        """
+        levels = self.levels.get(media_type, {})
+        return levels.get(encoding, DEFAULT_LEVELS[encoding])
+
+
+class CompressionResponder:
+    """Compresses messages of a single response."""
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        encoding: str,
+        send: Send,
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start_message: Message | None = None
+        self._encoder: StreamEncoder | None = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        """
+        Send message, compressing the body if needed.
+
+        :param message: ASGI message.
+        """
+        if message["type"] == "http.response.start":
+            self._start_message = message
+            headers = Headers(raw=message["headers"])
+            self._passthrough = not self._is_compressible(headers)
+            return
+        if message["type"] == "http.response.body":
+            if self._start_message is not None:
+                await self._send_first_body(self._start_message, message)
+                return
+            if self._encoder is not None:
+                message = self._encode(self._encoder, message)
+        await self._send(message)
+
+    async def _send_first_body(self, start_message: Message, message: Message) -> None:
+        self._start_message = None
+        more_body = message.get("more_body", False)
+        too_small = len(message.get("body", b"")) < self.middleware.minimum_size
+        if self._passthrough or (too_small and not more_body):
+            await self._send(start_message)
+            await self._send(message)
+            return
+
+        headers = MutableHeaders(scope=start_message)
+        media_type = headers.get("content-type", "").partition(";")[0].strip()
+        encoder = self.middleware.encoders[self.encoding](
+            self.middleware.get_level(media_type, self.encoding),
+        )
+        self._encoder = encoder
+        message = self._encode(encoder, message)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded bytes differ from the identity ones, so a strong tag
+        # no longer holds, the weak comparison of If-None-Match still does.
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if more_body:
+            del headers["Content-Length"]  # noqa: WPS420
+        else:
+            headers["Content-Length"] = str(len(message["body"]))
+        await self._send(start_message)
+        await self._send(message)
+
+    def _encode(self, encoder: StreamEncoder, message: Message) -> Message:
+        more_body = message.get("more_body", False)
+        body = encoder.compress(message.get("body", b""))
+        if not more_body:
+            body += encoder.finish()
+        return {"type": "http.response.body", "body": body, "more_body": more_body}
+
+    def _is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_length = headers.get("content-length")
+        if content_length and int(content_length) < self.middleware.minimum_size:
+            return False
+        media_type = headers.get("content-type", "")
+        return media_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Mapping
+
+from fastapi import status as http_status
+from fastapi.responses import ORJSONResponse
+from loguru import logger
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.deadline import remaining_seconds, request_deadline
+
+# Header with the seconds the client is going to wait for the response.
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+class DeadlineResponder:
+    """Tracks whether the response was started."""
+
+    def __init__(self, send: Send) -> None:
+        self.started = False
+        self._send = send
+
+    async def send(self, message: Message) -> None:
+        """
+        Send message.
+
+        :param message: ASGI message.
+        """
+        if message["type"] == "http.response.start":
+            self.started = True
+        await self._send(message)
+
+
+class DeadlineMiddleware:
+    """
+    Bounds time the worker spends on a request.
+
+    The budget of a route is the longest matching path prefix
+    of the route timeouts, or the default timeout, zero means no budget.
+    The X-Request-Timeout header may only shorten the budget.
+    The deadline is kept in request context, so database and S3 calls
+    are bounded by the time left. Once the budget is spent,
+    the work in progress is cancelled and 504 is returned.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_timeout: float = 0,
+        route_timeouts: Mapping[str, float] | None = None,
+    ) -> None:
+        self.app = app
+        self.default_timeout = default_timeout
+        self.route_timeouts = sorted(
+            (route_timeouts or {}).items(),
+            key=lambda route: len(route[0]),
+            reverse=True,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle ASGI request.
+
+        :param scope: scope of the request.
+        :param receive: channel of incoming messages.
+        :param send: channel of outgoing messages.
+        :raises TimeoutError: If the request timed out before its deadline.
+        """
+        budget = self.get_budget(scope) if scope["type"] == "http" else None
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = DeadlineResponder(send)
+        started = time.monotonic()
+        with request_deadline(budget):
+            try:
+                async with asyncio.timeout(budget):
+                    await self.app(scope, receive, responder.send)
+            except TimeoutError:
+                remaining = remaining_seconds()
+                if remaining is not None and remaining > 0:
+                    raise
+                logger.warning(
+                    "Request {0} {1} cancelled after {2:.3f} s, budget {3:.3f} s",
+                    scope["method"],
+                    scope["path"],
+                    time.monotonic() - started,
+                    budget,
+                )
+                if not responder.started:
+                    await self._send_timeout(scope, receive, send)
+
+    def get_budget(self, scope: Scope) -> float | None:
+        """
+        Get time budget of the request.
+
+        :param scope: scope of the request.
+        :return: seconds, None for no budget.
+        """
+        budget = self.default_timeout
+        for prefix, route_timeout in self.route_timeouts:
+            if scope["path"].startswith(prefix):
+                budget = route_timeout
+                break
+        requested = _parse_timeout(Headers(scope=scope).get(REQUEST_TIMEOUT_HEADER))
+        if requested is not None and (budget <= 0 or requested < budget):
+            budget = requested
+        return budget if budget > 0 else None
+
+    async def _send_timeout(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = ORJSONResponse(
+            status_code=http_status.HTTP_504_GATEWAY_TIMEOUT,
+            content={"detail": "Request deadline exceeded"},
+        )
+        await response(scope, receive, send)
+
+
+def _parse_timeout(header_value: str | None) -> float | None:
+    if not header_value:
+        return None
+    try:
+        requested = float(header_value)
+    except ValueError:
+        return None
+    return requested if requested > 0 else None
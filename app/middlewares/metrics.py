@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import status as http_status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT
+from app.utils.metrics import WorkerMetrics
+
+# Route label of requests which matched no route.
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsResponder:
+    """Keeps status of the response, 500 until it is started."""
+
+    def __init__(self, send: Send) -> None:
+        self.status_code = http_status.HTTP_500_INTERNAL_SERVER_ERROR
+        self._send = send
+
+    async def send(self, message: Message) -> None:
+        """
+        Send message.
+
+        :param message: ASGI message.
+        """
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+        await self._send(message)
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and their duration.
+
+    Requests are labelled by method, route template and status,
+    so paths with ids don't multiply the series.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: WorkerMetrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle ASGI request.
+
+        :param scope: scope of the request.
+        :param receive: channel of incoming messages.
+        :param send: channel of outgoing messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        responder = MetricsResponder(send)
+        with self._measure(scope, responder):
+            await self.app(scope, receive, responder.send)
+
+    @contextmanager
+    def _measure(self, scope: Scope, responder: MetricsResponder) -> Iterator[None]:
+        self.metrics.add(REQUESTS_IN_FLIGHT, 1)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.metrics.add(REQUESTS_IN_FLIGHT, -1)
+            # The router stores the matched route in the scope.
+            route = getattr(scope.get("route"), "path_format", UNMATCHED_ROUTE)
+            labels = (
+                ("method", scope["method"]),
+                ("route", route),
+                ("status", str(responder.status_code)),
+            )
+            self.metrics.observe(REQUEST_DURATION, labels, duration)
+            self.metrics.flush_later()
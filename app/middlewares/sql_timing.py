@@ -0,0 +1,42 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.domains.instrumentation import QueryStats, track_queries
+
+
+class SQLTimingMiddleware:
+    """
+    Accounts SQL statements to the request which issued them.
+
+    Number and total duration of the statements are reported
+    in the Server-Timing header of the response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handle ASGI request.
+
+        :param scope: scope of the request.
+        :param receive: channel of incoming messages.
+        :param send: channel of outgoing messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_stats = QueryStats(path=scope["path"])
+
+        async def send_with_timing(message: Message) -> None:  # noqa: WPS430
+            if message["type"] == "http.response.start":
+                duration = query_stats.seconds * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={duration:.1f};desc="{query_stats.count} queries"',
+                )
+            await send(message)
+
+        with track_queries(query_stats):
+            await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,70 @@
+import base64
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, List, Tuple, TypeVar
+
+import orjson
+
+ItemType = TypeVar("ItemType")
+
+# Sort key of the keyset pagination: (created_at, id).
+CursorKey = Tuple[datetime, uuid.UUID]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when the cursor token can't be decoded."""
+
+
+@dataclass
+class Page(Generic[ItemType]):
+    """
+    Page of items with the cursor of the next page.
+
+    Fingerprint changes whenever an item of the page changes, if it is known.
+    """
+
+    items: List[ItemType]
+    next_cursor: str | None = None
+    fingerprint: str | None = None
+
+
+def encode_cursor(created_at: datetime, item_id: uuid.UUID) -> str:
+    """
+    Encode sort key of the last item into an opaque cursor token.
+
+    :param created_at: creation date of the item.
+    :param item_id: id of the item.
+    :return: cursor token.
+    """
+    raw_cursor = orjson.dumps([created_at.isoformat(), str(item_id)])
+    return base64.urlsafe_b64encode(raw_cursor).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """
+    Decode cursor token into the sort key of the last seen item.
+
+    :param cursor: cursor token.
+    :return: creation date and id of the item.
+    :raises InvalidCursorError: If the token is malformed.
+    """
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        sort_key = orjson.loads(base64.urlsafe_b64decode(cursor + padding))
+    except ValueError:
+        raise InvalidCursorError(cursor)
+    if not _is_sort_key(sort_key):
+        raise InvalidCursorError(cursor)
+    try:
+        return datetime.fromisoformat(sort_key[0]), uuid.UUID(sort_key[1])
+    except ValueError:
+        raise InvalidCursorError(cursor)
+
+
+def _is_sort_key(sort_key: Any) -> bool:
+    return (
+        isinstance(sort_key, list)
+        and len(sort_key) == 2
+        and all(isinstance(part, str) for part in sort_key)
+    )
@@ -1,7 +1,112 @@
-from typing import List
+import enum
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Mapping, Sequence, Tuple, TypeVar
 
+import asyncpg
+from loguru import logger
+from tortoise import connections, expressions
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import DBConnectionError, DoesNotExist, IntegrityError
+from tortoise.queryset import QuerySet
+from tortoise.transactions import in_transaction
+
+from app.domains.backend import PoolTimeoutError
+from app.domains.database import PRIMARY_CONNECTION
 from app.domains.models.user_model import UserModel
-from app.middlewares.auth.security import get_password_hash
+from app.domains.routing import replica_router
+from app.middlewares.auth.cache import principal_cache
+from app.middlewares.auth.context import current_principal_id
+from app.middlewares.auth.security import hash_password_async, hash_passwords_async
+from app.repositories.pagination import CursorKey
+from app.utils.response_cache import response_cache
+
+ResultType = TypeVar("ResultType")
+
+# Errors which mean that the replica is unreachable, not that the query is wrong.
+REPLICA_ERRORS = (
+    OSError,
+    DBConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+)
+
+# Tag of cached responses which depend on the users table.
+USERS_CACHE_TAG = "users"
+
+# Columns of the users table which are safe to expose.
+PUBLIC_COLUMNS = (
+    "id",
+    "email",
+    "full_name",
+    "is_active",
+    "is_superuser",
+    "created_at",
+    "updated_at",
+)
+
+BULK_INSERT_QUERY = """
+    INSERT INTO "users" (
+        "id", "email", "full_name", "hashed_password", "is_superuser",
+        "is_active", "created_at", "updated_at"
+    )
+    SELECT new_users.*, TRUE, now(), now()
+    FROM unnest($1::uuid[], $2::varchar[], $3::varchar[], $4::varchar[], $5::bool[])
+        AS new_users
+    ON CONFLICT ("email") DO NOTHING
+    RETURNING
+        "id", "email", "full_name", "is_active", "is_superuser",
+        "created_at", "updated_at"
+"""
+
+BULK_UPDATE_QUERY = """
+    UPDATE "users" SET
+        "email" = changes."email",
+        "full_name" = changes."full_name",
+        "is_superuser" = changes."is_superuser",
+        "updated_at" = now()
+    FROM unnest($1::uuid[], $2::varchar[], $3::varchar[], $4::bool[])
+        AS changes ("id", "email", "full_name", "is_superuser")
+    WHERE "users"."id" = changes."id"
+    RETURNING
+        "users"."id", "users"."email", "users"."full_name", "users"."is_active",
+        "users"."is_superuser", "users"."created_at", "users"."updated_at"
+"""
+
+# Bulk updates which raced with concurrent writes of emails are checked again.
+BULK_UPDATE_ATTEMPTS = 3
+
+# Columns which can be changed by partial updates.
+UPDATABLE_COLUMNS = ("email", "full_name", "is_superuser")
+
+UPDATED_AT_ASSIGNMENT = '"updated_at" = now()'
+
+PATCH_CONDITION = 'WHERE "id" = $1 AND ($2::timestamptz IS NULL OR "updated_at" = $2)'
+
+
+class PreconditionFailedError(Exception):
+    """Raised when the user was modified after the expected version."""
+
+
+class BulkStatus(enum.StrEnum):
+    """Outcome of a single row of a bulk operation."""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    CONFLICT = "conflict"
+    NOT_FOUND = "not_found"
+
+
+@dataclass
+class BulkResult:
+    """Result of a single row of a bulk operation."""
+
+    index: int
+    status: BulkStatus
+    user: Mapping[str, Any] | None = None
+    detail: str | None = None
 
 
 class UserRepository:
@@ -24,12 +129,14 @@ class UserRepository:
         :param is_superuser: is_superuser of a user.
         :return: user object.
         """
-        return await UserModel.create(
+        user = await UserModel.create(
             full_name=full_name,
             email=email,
-            hashed_password=get_password_hash(password),
+            hashed_password=await hash_password_async(password),
             is_superuser=is_superuser,
         )
+        await cls._written(str(user.id))
+        return user
 
     @classmethod
     async def update_user(
@@ -38,6 +145,7 @@ class UserRepository:
         full_name: str,
         email: str,
         is_superuser: bool,
+        expected_updated_at: datetime | None = None,
     ) -> UserModel:
         """
         Update single user to session.
@@ -46,14 +154,62 @@ class UserRepository:
         :param full_name: full_name of a user.
         :param email: email of a user.
         :param is_superuser: is_superuser of a user.
+        :param expected_updated_at: apply only if the user wasn't modified since.
         :return: user object.
         """
-        user = await UserModel.get(id=user_id)
-        user.full_name = full_name
-        user.email = email
-        user.is_superuser = is_superuser
-        await user.save()
-        return user
+        return await cls.patch_user(
+            user_id,
+            {"full_name": full_name, "email": email, "is_superuser": is_superuser},
+            expected_updated_at=expected_updated_at,
+        )
+
+    @classmethod
+    async def patch_user(
+        cls,
+        user_id: str,
+        changes: Mapping[str, Any],
+        expected_updated_at: datetime | None = None,
+    ) -> UserModel:
+        """
+        Update only the changed columns of a user in a single round trip.
+
+        Without changes the user is only read, so its version stays the same.
+
+        :param user_id: id of a user.
+        :param changes: new values of updatable columns.
+        :param expected_updated_at: apply only if the user wasn't modified since.
+        :return: updated user object.
+        :raises DoesNotExist: If the user doesn't exist.
+        :raises PreconditionFailedError: If the user was modified since.
+        """
+        columns = [column for column in UPDATABLE_COLUMNS if column in changes]
+        assignments = [
+            f'"{column}" = ${position}'
+            for position, column in enumerate(columns, start=3)
+        ]
+        set_clause = ", ".join([*assignments, UPDATED_AT_ASSIGNMENT])
+        query = (
+            f'UPDATE "users" SET {set_clause} {PATCH_CONDITION} RETURNING *'  # noqa: S608
+            if columns
+            else f'SELECT * FROM "users" {PATCH_CONDITION}'  # noqa: S608
+        )
+        values = [
+            user_id,
+            expected_updated_at,
+            *(changes[column] for column in columns),
+        ]
+
+        rows = await connections.get(PRIMARY_CONNECTION).execute_query_dict(
+            query,
+            values,
+        )
+        if rows:
+            if columns:
+                await cls._written(str(user_id))
+            return UserModel._init_from_db(**rows[0])  # noqa: WPS437
+        if expected_updated_at is not None and await UserModel.exists(id=user_id):
+            raise PreconditionFailedError(user_id)
+        raise DoesNotExist(f"User {user_id} does not exist")
 
     @classmethod
     async def get_user_by_id(cls, user_id: str) -> UserModel:
@@ -63,29 +219,292 @@ class UserRepository:
         :param user_id: id of users.
         :return: user object.
         """
-        return await UserModel.get(id=user_id)
+        return await cls._read(
+            lambda db: UserModel.filter(id=user_id).using_db(db).get(),
+        )
 
     @classmethod
     async def get_user_by_email(cls, email: str) -> UserModel:
         """
         Get user by email.
 
+        It is used to check credentials, so it always reads from the primary,
+        a replica may lag behind a signup or a password change.
+
         :param email: email of users.
         :return: user object.
         """
-        return await UserModel.get(email=email)
+        primary = connections.get(PRIMARY_CONNECTION)
+        return await UserModel.filter(email=email).using_db(primary).get()
 
     @classmethod
-    async def list_users(
+    async def list_users_values(
         cls,
+        fields: Sequence[str],
         limit: int = 100,
         offset: int = 0,
-    ) -> List[UserModel]:
+        after: CursorKey | None = None,
+    ) -> List[Dict[str, Any]]:
         """
-        List all user with limit/offset pagination.
+        List only given columns of users ordered by creation date.
+
+        Columns of the sort key are always selected to build the next cursor,
+        and the modification date to fingerprint the page.
+
+        :param fields: columns to select.
+        :param limit: limit of users.
+        :param offset: offset of users, ignored when after is given.
+        :param after: (created_at, id) of the last seen user.
+        :return: list of users rows.
+        """
+        columns = dict.fromkeys([*fields, "created_at", "id", "updated_at"])
+        return await cls._read(
+            lambda db: cls._page_query(limit, offset, after)
+            .using_db(db)
+            .values(*columns),
+        )
+
+    @classmethod
+    async def list_users_emails(
+        cls,
+        limit: int = 100,
+        offset: int = 0,
+        after: CursorKey | None = None,
+    ) -> List[Tuple[str, datetime, uuid.UUID]]:
+        """
+        List emails of users ordered by creation date.
 
         :param limit: limit of users.
-        :param offset: offset of users.
-        :return: list of users.
+        :param offset: offset of users, ignored when after is given.
+        :param after: (created_at, id) of the last seen user.
+        :return: list of (email, created_at, id) of users.
+        """
+        return await cls._read(
+            lambda db: cls._page_query(limit, offset, after)
+            .using_db(db)
+            .values_list("email", "created_at", "id"),
+        )
+
+    @classmethod
+    async def stream_users(cls, prefetch: int) -> AsyncIterator[Mapping[str, Any]]:
         """
-        return await UserModel.all().offset(offset).limit(limit)
+        Stream all users through a server-side cursor.
+
+        Only prefetch rows are held in memory at a time.
+        The cursor is closed when the iteration stops or is cancelled.
+
+        :param prefetch: number of rows to fetch per round trip.
+        :yields: users rows with public columns.
+        """
+        columns = ", ".join(f'"{column}"' for column in PUBLIC_COLUMNS)
+        query = (
+            f'SELECT {columns} FROM "users" ORDER BY "created_at", "id"'  # noqa: S608
+        )
+        primary = connections.get(PRIMARY_CONNECTION)
+        async with primary.acquire_connection() as connection:
+            async with connection.transaction():
+                async for row in connection.cursor(query, prefetch=prefetch):
+                    yield row
+
+    @classmethod
+    async def bulk_create_users(
+        cls,
+        users: Sequence[Mapping[str, Any]],
+    ) -> List[BulkResult]:
+        """
+        Insert many users with a single statement.
+
+        Rows with an email which already exists are reported
+        as conflicts instead of aborting the whole batch.
+
+        :param users: users with full_name, email, password and is_superuser.
+        :return: result of each row, in order.
+        """
+        hashed_passwords = await hash_passwords_async(
+            [user["password"] for user in users],
+        )
+        user_ids = [uuid.uuid4() for _ in users]
+        rows = await connections.get(PRIMARY_CONNECTION).execute_query_dict(
+            BULK_INSERT_QUERY,
+            [
+                user_ids,
+                [user["email"] for user in users],
+                [user["full_name"] for user in users],
+                hashed_passwords,
+                [user["is_superuser"] for user in users],
+            ],
+        )
+        created = {str(row["id"]): row for row in rows}
+        await cls._written(*created)
+        results: List[BulkResult] = []
+        for index, new_id in enumerate(user_ids):
+            row = created.get(str(new_id))
+            if row is None:
+                results.append(
+                    BulkResult(
+                        index,
+                        BulkStatus.CONFLICT,
+                        detail="Email already exists",
+                    ),
+                )
+            else:
+                results.append(BulkResult(index, BulkStatus.CREATED, user=row))
+        return results
+
+    @classmethod
+    async def bulk_update_users(
+        cls,
+        users: Sequence[Mapping[str, Any]],
+    ) -> List[BulkResult]:
+        """
+        Update many users in one transaction.
+
+        Rows which would duplicate an email or a user of the batch
+        are reported as conflicts, missing users as not found.
+        When a concurrent write takes an email between the check
+        and the update, the batch is checked and updated again.
+
+        :param users: users with id, full_name, email and is_superuser.
+        :return: result of each row, in order.
+        """
+        for _ in range(BULK_UPDATE_ATTEMPTS - 1):
+            try:
+                return await cls._bulk_update(users)
+            except IntegrityError as exc:
+                logger.info("Bulk update raced with a concurrent write: {0!r}", exc)
+        return await cls._bulk_update(users)
+
+    @classmethod
+    async def _bulk_update(
+        cls,
+        users: Sequence[Mapping[str, Any]],
+    ) -> List[BulkResult]:
+        results: Dict[int, BulkResult] = {}
+        async with in_transaction() as connection:
+            accepted = cls._find_update_conflicts(
+                users,
+                await cls._email_owners(connection, users),
+                results,
+            )
+            rows = await connection.execute_query_dict(
+                BULK_UPDATE_QUERY,
+                [
+                    [users[index]["id"] for index in accepted],
+                    [users[index]["email"] for index in accepted],
+                    [users[index]["full_name"] for index in accepted],
+                    [users[index]["is_superuser"] for index in accepted],
+                ],
+            )
+
+        updated = {str(row["id"]): row for row in rows}
+        await cls._written(*updated)
+        for index in accepted:
+            user_id = str(users[index]["id"])
+            results[index] = (
+                BulkResult(index, BulkStatus.UPDATED, user=updated[user_id])
+                if user_id in updated
+                else BulkResult(index, BulkStatus.NOT_FOUND, detail="User not found")
+            )
+        return [result for _, result in sorted(results.items())]
+
+    @classmethod
+    async def _email_owners(
+        cls,
+        connection: BaseDBAsyncClient,
+        users: Sequence[Mapping[str, Any]],
+    ) -> Dict[str, str]:
+        owners = await connection.execute_query_dict(
+            'SELECT "id", "email" FROM "users" WHERE "email" = ANY($1::varchar[])',
+            [[user["email"] for user in users]],
+        )
+        return {owner["email"]: str(owner["id"]) for owner in owners}
+
+    @classmethod
+    async def _read(
+        cls,
+        run_query: Callable[[BaseDBAsyncClient], Awaitable[ResultType]],
+    ) -> ResultType:
+        """
+        Run read-only query on a replica, or on the primary as a fallback.
+
+        :param run_query: function which runs the query on the given connection.
+        :return: result of the query.
+        :raises REPLICA_ERRORS: Timeouts and busy pools, they don't eject the replica.
+        """
+        db_name = replica_router.db_for_read(current_principal_id.get())
+        if db_name == PRIMARY_CONNECTION:
+            return await run_query(connections.get(db_name))
+        try:
+            return await run_query(connections.get(db_name))
+        except REPLICA_ERRORS as exc:
+            if isinstance(exc, (TimeoutError, PoolTimeoutError)):
+                # Spent budget or a busy pool don't mean that the replica is down.
+                raise
+            logger.warning("Replica {0} ejected: {1!r}", db_name, exc)
+            replica_router.eject(db_name)
+        return await run_query(connections.get(PRIMARY_CONNECTION))
+
+    @classmethod
+    async def _written(cls, *user_ids: str) -> None:
+        """
+        Forget cached copies of written users and pin the writer to the primary.
+
+        Nothing happens when no user was written.
+
+        :param user_ids: ids of written users.
+        """
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            principal_cache.pop(user_id)
+        caller = current_principal_id.get()
+        replica_router.pin(*user_ids, *([caller] if caller else []))
+        await response_cache.invalidate(USERS_CACHE_TAG)
+
+    @classmethod
+    def _find_update_conflicts(
+        cls,
+        users: Sequence[Mapping[str, Any]],
+        email_owners: Mapping[str, str],
+        results: Dict[int, BulkResult],
+    ) -> List[int]:
+        accepted: List[int] = []
+        seen_ids = set()
+        seen_emails = set()
+        for index, user in enumerate(users):
+            user_id = str(user["id"])
+            if user_id in seen_ids or user["email"] in seen_emails:
+                results[index] = BulkResult(
+                    index,
+                    BulkStatus.CONFLICT,
+                    detail="Duplicate user in batch",
+                )
+            elif email_owners.get(user["email"], user_id) == user_id:
+                accepted.append(index)
+            else:
+                results[index] = BulkResult(
+                    index,
+                    BulkStatus.CONFLICT,
+                    detail="Email already exists",
+                )
+            seen_ids.add(user_id)
+            seen_emails.add(user["email"])
+        return accepted
+
+    @classmethod
+    def _page_query(
+        cls,
+        limit: int,
+        offset: int,
+        after: CursorKey | None,
+    ) -> QuerySet[UserModel]:
+        query = UserModel.all().order_by("created_at", "id")
+        if after:
+            created_at, user_id = after
+            query = query.filter(
+                expressions.Q(created_at__gt=created_at)
+                | expressions.Q(created_at=created_at, id__gt=user_id),
+            )
+        else:
+            query = query.offset(offset)
+        return query.limit(limit)
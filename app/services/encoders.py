@@ -0,0 +1,88 @@
+import csv
+import io
+import uuid
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Mapping, Sequence
+
+import orjson
+
+
+def json_rows(rows: Iterable[Any], columns: Sequence[str]) -> bytes:
+    """
+    Encode ORM objects or values rows as json array without validation.
+
+    The output is the same as of pydantic models with these columns,
+    datetimes in UTC are written with the Z suffix.
+
+    :param rows: ORM objects or mappings of column values.
+    :param columns: columns to write, in order.
+    :return: encoded rows.
+    """
+    return orjson.dumps(
+        [
+            (
+                {column: row[column] for column in columns}
+                if isinstance(row, Mapping)
+                else {column: getattr(row, column) for column in columns}
+            )
+            for row in rows
+        ],
+        default=_encode_unknown,
+        option=orjson.OPT_UTC_Z,
+    )
+
+
+async def ndjson_chunks(
+    rows: AsyncIterable[Mapping[str, Any]],
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Encode rows as newline delimited json.
+
+    :param rows: rows to encode.
+    :param chunk_size: minimal size of yielded chunks in bytes.
+    :yields: chunks of encoded rows.
+    """
+    buffer = bytearray()
+    async for row in rows:
+        buffer.extend(orjson.dumps(dict(row), default=_encode_unknown))
+        buffer.extend(b"\n")
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def csv_chunks(
+    rows: AsyncIterable[Mapping[str, Any]],
+    columns: Sequence[str],
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Encode rows as csv with header.
+
+    :param rows: rows to encode.
+    :param columns: columns to write, in order.
+    :param chunk_size: minimal size of yielded chunks in bytes.
+    :yields: chunks of encoded rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for row in rows:
+        writer.writerow([row[column] for column in columns])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _encode_unknown(value: Any) -> str:
+    # orjson encodes only exact uuid.UUID, asyncpg returns its subclass.
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(
+        "Type is not JSON serializable: {0}".format(type(value).__name__),
+    )
@@ -1,11 +1,44 @@
-from typing import List
+import functools
+import hashlib
+from collections.abc import Awaitable, Callable, Hashable
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, List, Mapping, Sequence, Tuple, TypeVar
 
+from app.domains.instrumentation import (
+    QueryStats,
+    add_query_stats,
+    current_query_stats,
+    track_queries,
+)
 from app.domains.models.user_model import UserModel
-from app.repositories.user_repository import UserRepository
+from app.domains.routing import replica_router
+from app.middlewares.auth.context import current_principal_id
+from app.repositories.pagination import (
+    CursorKey,
+    ItemType,
+    Page,
+    decode_cursor,
+    encode_cursor,
+)
+from app.repositories.user_repository import PUBLIC_COLUMNS, BulkResult, UserRepository
+from app.services.encoders import csv_chunks, ndjson_chunks
+from app.settings import settings
+from app.utils.single_flight import SingleFlight
+
+ResultType = TypeVar("ResultType")
+
+# Concurrent identical reads of users share a single query.
+user_reads = SingleFlight(timeout=settings.single_flight_timeout)
 
 
 class UserService:
-    """Class for user operations."""
+    """
+    Class for user operations.
+
+    Concurrent identical reads are coalesced, so their callers
+    share the same result objects and must not modify them.
+    """
 
     def __init__(self) -> None:
         self.repository = UserRepository
@@ -26,11 +59,13 @@ class UserService:
         :param is_superuser: is_superuser of a user.
         :return: user object.
         """
-        return await self.repository.create_user(
-            email=email,
-            full_name=full_name,
-            password=password,
-            is_superuser=is_superuser,
+        return await self._written(
+            self.repository.create_user(
+                email=email,
+                full_name=full_name,
+                password=password,
+                is_superuser=is_superuser,
+            ),
         )
 
     async def update_user(
@@ -39,6 +74,7 @@ class UserService:
         full_name: str,
         email: str,
         is_superuser: bool,
+        expected_updated_at: datetime | None = None,
     ) -> UserModel:
         """
         Update single user to session.
@@ -47,15 +83,65 @@ class UserService:
         :param full_name: full_name of a user.
         :param email: email of a user.
         :param is_superuser: is_superuser of a user.
+        :param expected_updated_at: apply only if the user wasn't modified since.
+        :return: user object.
+        """
+        return await self._written(
+            self.repository.update_user(
+                user_id=user_id,
+                email=email,
+                full_name=full_name,
+                is_superuser=is_superuser,
+                expected_updated_at=expected_updated_at,
+            ),
+        )
+
+    async def patch_user(
+        self,
+        user_id: str,
+        changes: Mapping[str, Any],
+        expected_updated_at: datetime | None = None,
+    ) -> UserModel:
+        """
+        Update only the given fields of a user.
+
+        :param user_id: id of a user.
+        :param changes: new values of the fields.
+        :param expected_updated_at: apply only if the user wasn't modified since.
         :return: user object.
         """
-        return await self.repository.update_user(
-            user_id=user_id,
-            email=email,
-            full_name=full_name,
-            is_superuser=is_superuser,
+        return await self._written(
+            self.repository.patch_user(
+                user_id,
+                changes,
+                expected_updated_at=expected_updated_at,
+            ),
         )
 
+    async def bulk_create_users(
+        self,
+        users: Sequence[Mapping[str, Any]],
+    ) -> List[BulkResult]:
+        """
+        Add many users at once.
+
+        :param users: users with full_name, email, password and is_superuser.
+        :return: result of each user, in order.
+        """
+        return await self._written(self.repository.bulk_create_users(users))
+
+    async def bulk_update_users(
+        self,
+        users: Sequence[Mapping[str, Any]],
+    ) -> List[BulkResult]:
+        """
+        Update many users at once.
+
+        :param users: users with id, full_name, email and is_superuser.
+        :return: result of each user, in order.
+        """
+        return await self._written(self.repository.bulk_update_users(users))
+
     async def get_user_by_email(self, email: str) -> UserModel:
         """
         Get user by email.
@@ -63,7 +149,11 @@ class UserService:
         :param email: email of users.
         :return: user object.
         """
-        return await self.repository.get_user_by_email(email=email)
+        return await self._coalesced(
+            lambda: self.repository.get_user_by_email(email=email),
+            "user_by_email",
+            email,
+        )
 
     async def get_user_by_id(self, user_id: str) -> UserModel:
         """
@@ -72,33 +162,153 @@ class UserService:
         :param user_id: id of users.
         :return: user.
         """
-        return await self.repository.get_user_by_id(user_id)
+        return await self._coalesced(
+            lambda: self.repository.get_user_by_id(user_id),
+            "user_by_id",
+            user_id,
+        )
 
-    async def list_users(
+    async def list_users_fields(
         self,
+        fields: Sequence[str],
         limit: int = 100,
         offset: int = 0,
-    ) -> List[UserModel]:
+        cursor: str | None = None,
+    ) -> Page[Dict[str, Any]]:
         """
-        Get all user models with limit/offset pagination.
+        Get page of users with only the given fields.
 
+        :param fields: fields of users to select.
         :param limit: limit of users.
-        :param offset: offset of users.
-        :return: stream of users.
+        :param offset: offset of users, ignored when cursor is given.
+        :param cursor: cursor token returned with the previous page.
+        :return: page of users rows.
         """
-        return await self.repository.list_users(limit, offset)
+        after = decode_cursor(cursor) if cursor else None
+        rows = await self._coalesced(
+            lambda: self.repository.list_users_values(
+                fields,
+                limit,
+                offset,
+                after=after,
+            ),
+            "list_users_values",
+            tuple(fields),
+            limit,
+            offset,
+            cursor,
+        )
+        return Page(
+            items=[{field: row[field] for field in fields} for row in rows],
+            next_cursor=self._next_cursor(rows, limit, itemgetter("created_at", "id")),
+            fingerprint=self._fingerprint(fields, rows),
+        )
 
     async def list_users_emails(
         self,
         limit: int = 100,
         offset: int = 0,
-    ) -> List[str]:
+        cursor: str | None = None,
+    ) -> Page[str]:
         """
         List emails of the users from the database.
 
         :param limit: limit of users.
-        :param offset: offset of users.
-        :return: users emails.
+        :param offset: offset of users, ignored when cursor is given.
+        :param cursor: cursor token returned with the previous page.
+        :return: page of users emails.
         """
-        users = await self.repository.list_users(limit, offset)
-        return [user.email for user in users]
+        after = decode_cursor(cursor) if cursor else None
+        rows = await self._coalesced(
+            lambda: self.repository.list_users_emails(limit, offset, after=after),
+            "list_users_emails",
+            limit,
+            offset,
+            cursor,
+        )
+        return Page(
+            items=[email for email, _, _ in rows],
+            next_cursor=self._next_cursor(rows, limit, itemgetter(1, 2)),
+        )
+
+    def export_users(self, export_format: str) -> AsyncIterator[bytes]:
+        """
+        Export all users in fixed-size chunks.
+
+        :param export_format: "ndjson" or "csv".
+        :return: stream of encoded users.
+        """
+        rows = self.repository.stream_users(prefetch=settings.export_prefetch_rows)
+        if export_format == "csv":
+            return csv_chunks(rows, PUBLIC_COLUMNS, settings.export_chunk_size)
+        return ndjson_chunks(rows, settings.export_chunk_size)
+
+    async def _coalesced(
+        self,
+        read: Callable[[], Awaitable[ResultType]],
+        *key: Hashable,
+    ) -> ResultType:
+        """
+        Run read, sharing it with concurrent identical reads.
+
+        Callers pinned to the primary after a write read on their own,
+        shared reads run without a caller and may go to a lagging replica.
+        Statements of a shared read are accounted to each of its callers.
+
+        :param read: function which runs the read.
+        :param key: name and arguments of the read.
+        :return: result of the read.
+        """
+        if replica_router.is_pinned(current_principal_id.get()):
+            return await read()
+        own_stats = current_query_stats.get()
+        shared_read = functools.partial(
+            _track_read,
+            read,
+            own_stats.path if own_stats else "",
+        )
+        read_result, read_stats = await user_reads.run(key, shared_read)
+        if own_stats is not None:
+            add_query_stats(own_stats, read_stats)
+        return read_result
+
+    async def _written(self, write: Awaitable[ResultType]) -> ResultType:
+        """
+        Run write and stop sharing reads which started before it.
+
+        :param write: awaitable of the write.
+        :return: result of the write.
+        """
+        written = await write
+        user_reads.forget()
+        return written
+
+    def _fingerprint(
+        self,
+        fields: Sequence[str],
+        rows: Sequence[Mapping[str, Any]],
+    ) -> str:
+        digest = hashlib.blake2b(",".join(fields).encode(), digest_size=16)
+        for row in rows:
+            digest.update(row["id"].bytes)
+            digest.update(row["updated_at"].isoformat().encode())
+        return digest.hexdigest()
+
+    def _next_cursor(
+        self,
+        rows: Sequence[ItemType],
+        limit: int,
+        sort_key: Callable[[ItemType], CursorKey],
+    ) -> str | None:
+        if not rows or len(rows) < limit:
+            return None
+        return encode_cursor(*sort_key(rows[-1]))
+
+
+async def _track_read(
+    read: Callable[[], Awaitable[ResultType]],
+    path: str,
+) -> Tuple[ResultType, QueryStats]:
+    read_stats = QueryStats(path=path)
+    with track_queries(read_stats):
+        return await read(), read_stats
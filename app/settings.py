@@ -47,6 +47,55 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 8
 
+    # Variables for the password hashing process pool
+    # Pool size 0 disables the pool and hashes on the event loop.
+    hashing_pool_size: int = 2
+    hashing_max_queue: int = 64
+    hashing_timeout: float = 10.0
+
+    # Variables for the cache of verified access tokens
+    token_cache_size: int = 10000
+    token_cache_ttl: float = 300
+
+    # Variables for the cache of authenticated users
+    # Other workers see user changes once the ttl expires.
+    principal_cache_enabled: bool = True
+    principal_cache_size: int = 10000
+    principal_cache_ttl: float = 30
+
+    # Variables for the admission control of requests
+    # Concurrency 0 disables the limit, reserved slots serve only priority paths.
+    admission_max_concurrency: int = 100
+    admission_max_queue: int = 200
+    admission_queue_timeout: float = 2
+    admission_reserved_slots: int = 4
+    admission_retry_after: int = 1
+    admission_priority_paths: list[str] = ["/v1/health-check", "/v1/auth/access-token"]
+
+    # Variables for the deadlines of requests, 0 means no deadline
+    # Route timeouts are keyed by path prefix, X-Request-Timeout may only shorten them.
+    request_timeout: float = 30
+    request_route_timeouts: dict[str, float] = {"/v1/users/export": 0}
+
+    # Variables for the response compression
+    # Levels are set per media type and encoding, e.g. {"text/csv": {"gzip": 9}}.
+    compression_minimum_size: int = 1024
+    compression_levels: dict[str, dict[str, int]] = {
+        "application/x-ndjson": {"zstd": 1, "br": 1, "gzip": 1},
+    }
+
+    # Variables for the cache of GET responses
+    # Backend "memory" is per worker, "redis" is shared by all workers.
+    response_cache_backend: str = "memory"
+    response_cache_url: str = "redis://localhost:6379/0"
+    response_cache_size: int = 1000
+    response_cache_users_ttl: float = 30
+
+    # Variables for the Prometheus metrics
+    # Multiprocess directory is shared by the workers, it's set up when workers_count > 1.
+    metrics_multiprocess_dir: str = ""
+    metrics_flush_interval: float = 1
+
     api_prefix: str = "/api"
     backend_cors_origins: list[str] = ["*"]
 
@@ -60,8 +109,50 @@ class Settings(BaseSettings):
     db_base: str = "app"
     db_echo: bool = False
 
+    # Variables for the connection pool of each database
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_acquire_timeout: float = 10
+    db_pool_max_inactive_lifetime: float = 300
+    db_statement_timeout_ms: int = 30000
+
+    # Variables for the SQL instrumentation of requests
+    sql_slow_query_ms: float = 200
+    sql_repeated_query_threshold: int = 10
+
+    # Variables for the read replicas, reads go to the primary without them
+    db_replica_urls: list[str] = []
+    db_replica_ejection_seconds: float = 30
+    db_read_your_writes_seconds: float = 5
+
+    # Seconds a coalesced read of users may take, it fails for all its callers
+    single_flight_timeout: float = 30
+
+    # Maximum number of users in a single bulk request
+    bulk_max_items: int = 1000
+
+    # Variables for the streaming export of users
+    export_chunk_size: int = 64 * 1024
+    export_prefetch_rows: int = 500
+
     # Variables for AWS S3
+    # Endpoint URL points the client at an S3 compatible server, empty for AWS.
+    # Workers are threads running S3 calls, each with its own connection.
     default_bucket: str = "frwk-ai-boilerplate-fastapi"
+    s3_endpoint_url: str = ""
+    s3_max_workers: int = 16
+    # Parts of large uploads and ranges of large downloads, and how many run at once.
+    s3_part_size: int = 8 * 1024 * 1024
+    s3_transfer_concurrency: int = 8
+    # Calls of batch uploads, fetches and deletes in flight at once.
+    s3_batch_concurrency: int = 16
+    # Read-through cache of JSON objects, parsed ones are revalidated after the ttl.
+    s3_cache_dir: str = str(TEMP_DIR / "boilerplate-s3-cache")
+    s3_cache_disk_bytes: int = 256 * 1024 * 1024
+    s3_cache_memory_size: int = 256
+    s3_cache_ttl: float = 30
+    s3_connect_timeout: float = 5
+    s3_read_timeout: float = 30
 
     @property
     def db_url(self) -> URL:
@@ -1,4 +1,4 @@
-from typing import Any, AsyncGenerator, Dict
+from typing import Any, AsyncGenerator, Dict, Generator
 
 import nest_asyncio
 import pytest
@@ -9,8 +9,13 @@ from tortoise import Tortoise
 from tortoise.contrib.test import finalizer, initializer
 
 from app.api.application import get_app
+from app.clients.aws_s3 import S3Pool
 from app.domains.database import MODELS_MODULES, TORTOISE_CONFIG
+from app.middlewares.auth.cache import principal_cache
+from app.repositories.user_repository import USERS_CACHE_TAG
 from app.settings import settings
+from app.tests.s3_stand_in import S3StandInServer
+from app.utils.response_cache import response_cache
 
 nest_asyncio.apply()
 
@@ -43,6 +48,8 @@ async def initialize_db() -> AsyncGenerator[None, None]:
 
     await Tortoise.close_connections()
     finalizer()
+    principal_cache.clear()
+    await response_cache.invalidate(USERS_CACHE_TAG)
 
 
 @pytest.fixture
@@ -153,3 +160,36 @@ def user_data() -> Dict[str, Any]:
         "password": "securepassword",
         "is_superuser": False,
     }
+
+
+@pytest.fixture
+def s3_server() -> Generator[S3StandInServer, None, None]:
+    """
+    Local stand-in of an S3 server.
+
+    :yields: running server.
+    """
+    server = S3StandInServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def s3_test_pool(
+    s3_server: S3StandInServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[S3Pool, None, None]:
+    """
+    Pool of a client of the S3 stand-in.
+
+    :param s3_server: local S3 server.
+    :param monkeypatch: patcher of the environment.
+    :yields: pool of the client.
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    pool = S3Pool(max_workers=4, endpoint_url=s3_server.url)
+    yield pool
+    pool.shutdown()
@@ -0,0 +1,290 @@
+import hashlib
+import html
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Mapping, Set, cast
+from urllib.parse import parse_qs, urlsplit
+
+NOT_FOUND = b"<Error><Code>NoSuchKey</Code><Message>Not found</Message></Error>"
+NO_UPLOAD = b"<Error><Code>NoSuchUpload</Code><Message>Not found</Message></Error>"
+INVALID_PART = b"<Error><Code>InvalidPart</Code><Message>Rejected</Message></Error>"
+PART_XML = "<Part><PartNumber>{0}</PartNumber><ETag>{1}</ETag><Size>{2}</Size></Part>"
+DELETE_ERROR_XML = (
+    "<Error><Key>{0}</Key><Code>AccessDenied</Code><Message>Denied</Message></Error>"
+)
+PRECONDITION_FAILED = (
+    b"<Error><Code>PreconditionFailed</Code><Message>ETag</Message></Error>"
+)
+
+
+class S3StandInServer(ThreadingHTTPServer):
+    """In-memory server of the S3 object calls used by the clients."""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0) -> None:
+        """
+        Server listening on a free local port.
+
+        :param delay: seconds each GET request and uploaded part take.
+        """
+        super().__init__(("127.0.0.1", 0), S3StandInHandler)
+        self.delay = delay
+        self.objects: Dict[str, bytes] = {}
+        self.content_types: Dict[str, str] = {}
+        self._etags: Dict[str, str] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        # Part numbers and keys of objects the server rejects.
+        self.failing: Set[int | str] = set()
+        self.requests = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """
+        URL of the server.
+
+        :return: endpoint URL.
+        """
+        return "http://127.0.0.1:{0}".format(self.server_address[1])
+
+    def store(self, key: str, body: bytes) -> str:
+        """
+        Store object.
+
+        :param key: bucket and key of the object.
+        :param body: content of the object.
+        :return: ETag of the object.
+        """
+        self.objects[key] = body
+        self._etags[key] = _etag(body)
+        return self._etags[key]
+
+    def get_etag(self, key: str) -> str:
+        """
+        Get ETag of stored object.
+
+        :param key: bucket and key of the object.
+        :return: ETag of the object.
+        """
+        return self._etags[key]
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving requests."""
+        self.shutdown()
+        self.server_close()
+
+
+class S3StandInHandler(BaseHTTPRequestHandler):
+    """Handles requests of a single connection."""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def stand_in(self) -> S3StandInServer:
+        """
+        Server of the handler.
+
+        :return: server.
+        """
+        return cast(S3StandInServer, self.server)
+
+    @property
+    def key(self) -> str:
+        """
+        Bucket and key of the requested object.
+
+        :return: path of the request.
+        """
+        return urlsplit(self.path).path
+
+    @property
+    def query(self) -> Dict[str, str]:
+        """
+        Parameters of the request.
+
+        :return: first value of each parameter.
+        """
+        query = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+        return {name: query_values[0] for name, query_values in query.items()}
+
+    def do_PUT(self) -> None:  # noqa: N802
+        """Store object or part of a multipart upload."""
+        self.stand_in.requests += 1
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if "partNumber" not in self.query:
+            etag = self.stand_in.store(self.key, body)
+            self.stand_in.content_types[self.key] = self.headers.get(
+                "Content-Type",
+                "",
+            )
+            self.reply(200, b"", {"ETag": etag})
+            return
+        time.sleep(self.stand_in.delay)
+        part_number = int(self.query["partNumber"])
+        parts = self.stand_in.uploads.get(self.query["uploadId"])
+        if parts is None:
+            self.reply(404, NO_UPLOAD)
+        elif part_number in self.stand_in.failing:
+            self.reply(400, INVALID_PART)
+        else:
+            parts[part_number] = body
+            self.reply(200, b"", {"ETag": _etag(body)})
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Delete objects, start or complete multipart upload."""
+        self.stand_in.requests += 1
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "delete" in self.query:
+            self.reply_delete(body)
+            return
+        if "uploads" in self.query:
+            upload_id = uuid.uuid4().hex
+            self.stand_in.uploads[upload_id] = {}
+            self.reply(200, _xml("InitiateMultipartUploadResult", upload_id))
+            return
+        parts = self.stand_in.uploads.pop(self.query["uploadId"], None)
+        if parts is None:
+            self.reply(404, NO_UPLOAD)
+            return
+        numbers = re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)
+        content = b"".join(parts[int(number)] for number in numbers)
+        self.stand_in.store(self.key, content)
+        self.reply(200, _xml("CompleteMultipartUploadResult", ""))
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Return object, its range, or parts of a multipart upload."""
+        self.stand_in.requests += 1
+        upload_id = self.query.get("uploadId")
+        if upload_id is not None:
+            self.reply_parts(upload_id)
+            return
+        time.sleep(self.stand_in.delay)
+        body = self.stand_in.objects.get(self.key)
+        if body is None:
+            self.reply(404, NOT_FOUND)
+            return
+        etag = self.stand_in.get_etag(self.key)
+        if self.headers.get("If-Match", etag) != etag:
+            self.reply(412, PRECONDITION_FAILED)
+            return
+        if self.headers.get("If-None-Match") == etag:
+            self.reply(304, b"", {"ETag": etag})
+            return
+        byte_range = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if byte_range is None:
+            self.reply(200, body, {"ETag": etag})
+            return
+        start = int(byte_range[1])
+        end = min(int(byte_range[2]), len(body) - 1)
+        content_range = "bytes {0}-{1}/{2}".format(start, end, len(body))
+        headers = {"ETag": etag, "Content-Range": content_range}
+        self.reply(206, body[start : end + 1], headers)
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        """Return size and ETag of object."""
+        self.stand_in.requests += 1
+        body = self.stand_in.objects.get(self.key)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+        else:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", self.stand_in.get_etag(self.key))
+        self.end_headers()
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        """Delete object or abort multipart upload."""
+        self.stand_in.requests += 1
+        upload_id = self.query.get("uploadId")
+        if upload_id is not None:
+            self.stand_in.uploads.pop(upload_id, None)
+        else:
+            self.stand_in.objects.pop(self.key, None)
+        self.reply(204, b"")
+
+    def reply_delete(self, body: bytes) -> None:
+        """
+        Delete objects of a multi-object delete request.
+
+        :param body: XML listing keys of the objects.
+        """
+        errors = []
+        for key in re.findall("<Key>(.*?)</Key>", html.unescape(body.decode())):
+            if key in self.stand_in.failing:
+                errors.append(DELETE_ERROR_XML.format(key))
+            else:
+                self.stand_in.objects.pop("{0}/{1}".format(self.key, key), None)
+        listed = "".join(errors)
+        self.reply(200, "<DeleteResult>{0}</DeleteResult>".format(listed).encode())
+
+    def reply_parts(self, upload_id: str) -> None:
+        """
+        List uploaded parts of a multipart upload.
+
+        :param upload_id: id of the upload.
+        """
+        parts = self.stand_in.uploads.get(upload_id)
+        if parts is None:
+            self.reply(404, NO_UPLOAD)
+            return
+        listed = "".join(
+            PART_XML.format(number, _etag(part), len(part))
+            for number, part in sorted(parts.items())
+        ).encode()
+        self.reply(
+            200,
+            b"".join(
+                (
+                    b"<ListPartsResult><IsTruncated>false</IsTruncated>",
+                    listed,
+                    b"</ListPartsResult>",
+                ),
+            ),
+        )
+
+    def reply(
+        self,
+        status_code: int,
+        body: bytes,
+        headers: Mapping[str, str] | None = None,
+    ) -> None:
+        """
+        Send response.
+
+        :param status_code: status of the response.
+        :param body: body of the response.
+        :param headers: extra headers.
+        """
+        self.send_response(status_code)
+        for name, header_value in (headers or {}).items():
+            self.send_header(name, header_value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        """
+        Keep the test output clean.
+
+        :param args: format and arguments of the message.
+        """
+
+
+def _etag(body: bytes) -> str:
+    return '"{0}"'.format(hashlib.md5(body).hexdigest())  # noqa: S324
+
+
+def _xml(tag: str, upload_id: str) -> bytes:
+    return "<{0}><UploadId>{1}</UploadId><ETag>etag</ETag></{0}>".format(
+        tag,
+        upload_id,
+    ).encode()
@@ -0,0 +1,155 @@
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+from fastapi import FastAPI
+from fastapi import status as http_status
+from httpx import AsyncClient
+
+from app.middlewares.admission import AdmissionController, AdmissionMiddleware, Priority
+
+
+def _controller(max_queue: int = 1, queue_timeout: float = 1) -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=1,
+        max_queue=max_queue,
+        queue_timeout=queue_timeout,
+        reserved_slots=1,
+    )
+
+
+async def _hold(
+    controller: AdmissionController,
+    priority: Priority,
+    release: asyncio.Event,
+) -> bool:
+    async with controller.admit(priority) as admitted:
+        if admitted:
+            await release.wait()
+        return admitted
+
+
+@pytest.mark.anyio
+async def test_admission_queue_bound() -> None:
+    """Checks that requests over the limit wait and over the queue are rejected."""
+    controller = _controller()
+    release = asyncio.Event()
+    holders = [
+        asyncio.create_task(_hold(controller, Priority.NORMAL, release))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+
+    assert controller.get_stats()["queued_normal"] == 1
+    release.set()
+    assert await asyncio.gather(*holders) == [True, True, False]
+    assert controller.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.anyio
+async def test_admission_queue_timeout() -> None:
+    """Checks that requests waiting over the queue budget are rejected."""
+    controller = _controller(queue_timeout=0.01)
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(controller, Priority.NORMAL, release))
+    await asyncio.sleep(0)
+
+    assert not await _hold(controller, Priority.NORMAL, release)
+    release.set()
+    await holder
+    assert controller.get_stats()["timeouts"] == 1
+
+
+@pytest.mark.anyio
+async def test_admission_priority() -> None:
+    """Checks that high priority requests use reserved slots and go first."""
+    controller = _controller(max_queue=2)
+    release = asyncio.Event()
+    admitted_order = []
+
+    async def hold(priority: Priority) -> None:  # noqa: WPS430
+        async with controller.admit(priority):
+            admitted_order.append(priority)
+            await release.wait()
+
+    tasks = [asyncio.create_task(hold(Priority.NORMAL)) for _ in range(2)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(hold(Priority.HIGH)))
+    tasks.append(asyncio.create_task(hold(Priority.HIGH)))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert admitted_order == [
+        Priority.NORMAL,
+        Priority.HIGH,
+        Priority.HIGH,
+        Priority.NORMAL,
+    ]
+
+
+@pytest.mark.anyio
+async def test_admission_cancelled_waiter() -> None:
+    """Checks that a cancelled waiter leaves the queue without taking a slot."""
+    controller = _controller()
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(controller, Priority.NORMAL, release))
+    waiter = asyncio.create_task(_hold(controller, Priority.NORMAL, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    await holder
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert controller.get_stats()["in_flight"] == 0
+    assert controller.get_stats()["queued_normal"] == 0
+
+
+@pytest.fixture
+async def overloaded_client() -> AsyncGenerator[AsyncClient, None]:
+    """
+    Client of an app which handles one request at a time.
+
+    :yields: client for the app.
+    """
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow() -> None:  # noqa: WPS430
+        await release.wait()
+
+    @app.get("/health-check")
+    async def health_check() -> None:  # noqa: WPS430
+        """Reply right away."""
+
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=_controller(max_queue=0),
+        priority_paths=["/health-check"],
+        retry_after=3,
+    )
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        slow_request = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.05)
+        yield client
+        release.set()
+        await slow_request
+
+
+@pytest.mark.anyio
+async def test_admission_middleware_sheds_load(overloaded_client: AsyncClient) -> None:
+    """Checks that requests over the capacity get a fast 503."""
+    response = await overloaded_client.get("/slow")
+
+    assert response.status_code == http_status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "3"
+
+
+@pytest.mark.anyio
+async def test_admission_middleware_priority(overloaded_client: AsyncClient) -> None:
+    """Checks that priority paths are served while the worker is full."""
+    response = await overloaded_client.get("/health-check")
+
+    assert response.status_code == http_status.HTTP_200_OK
@@ -1,10 +1,15 @@
+import asyncio
+import time
 from typing import Any
 
 import pytest
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi import status as http_status
 from httpx import AsyncClient
 
+from app.middlewares.auth.cache import token_cache
+from app.middlewares.auth.security import PasswordHasher, get_password_hash
+
 
 @pytest.mark.anyio
 async def test_authentication_with_incorrect_username(
@@ -48,3 +53,88 @@ async def test_authentication_with_incorrect_password(
     response = await client.post(url=url, data=data)
 
     assert response.status_code == http_status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_password_hasher_rejects_when_overloaded() -> None:
+    """Test password hasher rejecting jobs over the queue limit."""
+    hasher = PasswordHasher(pool_size=1, max_queue=0, timeout=1)
+    hasher.stats.in_flight = 1
+
+    with pytest.raises(HTTPException, match="503"):
+        await hasher.run(get_password_hash, "password")
+
+    assert hasher.stats.rejected == 1
+
+
+@pytest.mark.anyio
+async def test_password_hasher_timeout() -> None:
+    """Test password hasher giving up on slow jobs."""
+    hasher = PasswordHasher(pool_size=1, max_queue=0, timeout=0)
+
+    with pytest.raises(HTTPException, match="503"):
+        await hasher.run(get_password_hash, "password")
+
+    async with asyncio.timeout(10):
+        while hasher.stats.in_flight:
+            await asyncio.sleep(0.01)
+    hasher.shutdown()
+    assert hasher.stats.timeouts == 1
+
+
+@pytest.mark.anyio
+async def test_password_hasher_keeps_busy_slot() -> None:
+    """Test that a job still running after its timeout counts against the queue."""
+    hasher = PasswordHasher(pool_size=1, max_queue=0, timeout=10)
+    await hasher.run(time.sleep, 0)
+    hasher._timeout = 0.05  # noqa: WPS437
+
+    with pytest.raises(HTTPException, match="timed out"):
+        await hasher.run(time.sleep, 0.5)
+    with pytest.raises(HTTPException, match="overloaded"):
+        await hasher.run(time.sleep, 0)
+
+    async with asyncio.timeout(5):
+        while hasher.stats.in_flight:
+            await asyncio.sleep(0.01)
+    await hasher.run(time.sleep, 0)
+    hasher.shutdown()
+
+
+@pytest.mark.anyio
+async def test_password_hasher_without_pool() -> None:
+    """Test password hasher running inline when the pool is disabled."""
+    hasher = PasswordHasher(pool_size=0, max_queue=0, timeout=1)
+
+    hashed_password = await hasher.run(get_password_hash, "password")
+
+    assert hashed_password.startswith("$2b$")
+    assert hasher.stats.submitted == 0
+
+
+@pytest.mark.anyio
+async def test_verified_token_is_cached(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test reusing the verified claims of the same token."""
+    url = fastapi_app.url_path_for("get_me")
+    await authenticated_client.get(url=url)
+    hits = token_cache.hits
+
+    response = await authenticated_client.get(url=url)
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert token_cache.hits == hits + 1
+
+
+@pytest.mark.anyio
+async def test_invalid_token_is_rejected(
+    client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test rejecting a token with invalid signature."""
+    url = fastapi_app.url_path_for("get_me")
+    response = await client.get(url=url, headers={"Authorization": "Bearer invalid"})
+
+    assert response.status_code == http_status.HTTP_403_FORBIDDEN
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import io
+import os
+
+import pytest
+
+from app.utils.base64_stream import Base64DecodingReader
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 1000, 4099])
+def test_decoding_reader(size: int) -> None:
+    """
+    Checks that content is decoded the same whatever the chunks.
+
+    :param size: decoded size of the content.
+    """
+    content = os.urandom(size)
+    encoded = base64.encodebytes(content)
+
+    reader = Base64DecodingReader(io.BytesIO(encoded), chunk_size=10)
+    pieces = iter(lambda: reader.read(7) or b"", b"")
+
+    assert b"".join(pieces) == content
+    assert Base64DecodingReader(encoded.decode(), chunk_size=64).read() == content
+
+
+def test_decoding_reader_fills_buffer() -> None:
+    """Checks that reads return the requested size until the end."""
+    reader = Base64DecodingReader(base64.b64encode(bytes(100)), chunk_size=8)
+    buffer = bytearray(64)
+
+    assert reader.readinto(buffer) == 64
+    assert reader.readinto(buffer) == 36
+    assert not reader.readinto(buffer)
+
+
+def test_decoding_reader_invalid() -> None:
+    """Checks that truncated or invalid content is rejected."""
+    with pytest.raises(binascii.Error):
+        Base64DecodingReader("YWJjZA=").read()
+    with pytest.raises(binascii.Error):
+        Base64DecodingReader("YW*jZA==").read()
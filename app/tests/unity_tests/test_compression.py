@@ -0,0 +1,144 @@
+import zlib
+from typing import Any, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi import status as http_status
+from fastapi.responses import PlainTextResponse
+from httpx import AsyncClient
+from starlette.types import Message, Receive, Scope, Send
+
+from app.middlewares.compression import CompressionMiddleware, negotiate_encoding
+
+LARGE_BODY = "user@example.com\n" * 1000
+
+
+@pytest.fixture
+async def compressed_client(anyio_backend: Any) -> AsyncClient:
+    """
+    Client for an application with the compression middleware.
+
+    :param anyio_backend: backend for anyio pytest plugin.
+    :return: client for the app.
+    """
+    app = FastAPI()
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=100,
+        levels={"text/plain": {"gzip": 1}},
+    )
+    app.get("/large")(
+        lambda: PlainTextResponse(LARGE_BODY, headers={"ETag": '"large"'}),
+    )
+    app.get("/small")(lambda: PlainTextResponse("small"))
+    return AsyncClient(app=app, base_url="http://test")
+
+
+async def _stream_app(scope: Scope, receive: Receive, send: Send) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": http_status.HTTP_200_OK,
+            "headers": [(b"content-type", b"application/x-ndjson")],
+        },
+    )
+    for _ in range(3):
+        await send(
+            {
+                "type": "http.response.body",
+                "body": LARGE_BODY.encode(),
+                "more_body": True,
+            },
+        )
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_negotiate_encoding() -> None:
+    """Test choosing encoding from the Accept-Encoding header."""
+    available = ["zstd", "br", "gzip"]
+
+    assert negotiate_encoding("gzip, br", available) == "br"
+    assert negotiate_encoding("gzip;q=1, br;q=0.5", available) == "gzip"
+    assert negotiate_encoding("*;q=0.1, zstd;q=0", available) == "br"
+    assert negotiate_encoding("identity", available) is None
+
+
+@pytest.mark.anyio
+async def test_compress_large_body(compressed_client: AsyncClient) -> None:
+    """Test that large bodies are compressed and small ones are not."""
+    headers = {"Accept-Encoding": "gzip"}
+    response = await compressed_client.get("/large", headers=headers)
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.text == LARGE_BODY
+
+    response = await compressed_client.get("/small", headers=headers)
+    assert "Content-Encoding" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_compress_weakens_etag(compressed_client: AsyncClient) -> None:
+    """Test that strong tags of compressed bodies become weak."""
+    response = await compressed_client.get(
+        "/large",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["ETag"] == 'W/"large"'
+
+    response = await compressed_client.get(
+        "/large",
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert response.headers["ETag"] == '"large"'
+
+
+@pytest.mark.anyio
+async def test_compress_stream() -> None:
+    """Test that streaming bodies are compressed chunk by chunk."""
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        messages.append(message)
+
+    middleware = CompressionMiddleware(_stream_app, minimum_size=100)
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    await middleware(scope, lambda: None, send)  # type: ignore[arg-type, return-value]
+
+    start, *bodies = messages
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    assert len(bodies) == 4
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    assert decompressor.decompress(bodies[0]["body"]).decode() == LARGE_BODY
+    rest = b"".join(body["body"] for body in bodies[1:])
+    assert decompressor.decompress(rest).decode() == LARGE_BODY * 2
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("encoding", ["br", "zstd"])
+async def test_compress_optional_encodings(encoding: str) -> None:
+    """Test encodings provided by optional libraries."""
+    pytest.importorskip({"br": "brotli", "zstd": "zstandard"}[encoding])
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:  # noqa: WPS430
+        messages.append(message)
+
+    middleware = CompressionMiddleware(_stream_app, minimum_size=100)
+    scope = {"type": "http", "headers": [(b"accept-encoding", encoding.encode())]}
+    await middleware(scope, lambda: None, send)  # type: ignore[arg-type, return-value]
+
+    assert (b"content-encoding", encoding.encode()) in messages[0]["headers"]
+    body = b"".join(message["body"] for message in messages[1:])
+    assert _decompress(encoding, body) == (LARGE_BODY * 3).encode()
+
+
+def _decompress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        import brotli  # noqa: WPS433
+
+        return brotli.decompress(body)
+    import zstandard  # noqa: WPS433
+
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
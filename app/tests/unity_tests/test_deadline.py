@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi import status as http_status
+from httpx import AsyncClient
+from tortoise import connections
+
+from app.clients.aws_s3 import AwsS3Client
+from app.domains.database import PRIMARY_CONNECTION
+from app.middlewares.deadline import DeadlineMiddleware
+from app.utils.deadline import (
+    DeadlineExceededError,
+    limit_timeout,
+    remaining_seconds,
+    request_deadline,
+)
+
+
+def test_limit_timeout() -> None:
+    """Checks that timeouts are shortened to the remaining budget."""
+    assert limit_timeout("query", 5) == 5
+    with request_deadline(10):
+        assert limit_timeout("query", 20) <= 10  # type: ignore[operator]
+        assert limit_timeout("query", 5) == 5
+        with request_deadline(60):
+            assert remaining_seconds() <= 10  # type: ignore[operator]
+    with request_deadline(-1):
+        with pytest.raises(DeadlineExceededError):
+            limit_timeout("query")
+
+
+def test_budget_of_route() -> None:
+    """Checks that the header may only shorten the budget of the route."""
+    middleware = DeadlineMiddleware(
+        FastAPI(),
+        default_timeout=10,
+        route_timeouts={"/export": 0, "/slow": 60},
+    )
+
+    def budget(path: str, header: bytes) -> float | None:  # noqa: WPS430
+        headers = [(b"x-request-timeout", header)]
+        return middleware.get_budget({"path": path, "headers": headers})
+
+    assert budget("/users", b"") == 10
+    assert budget("/users", b"2") == 2
+    assert budget("/users", b"20") == 10
+    assert budget("/slow/report", b"abc") == 60
+    assert budget("/export", b"") is None
+
+
+@pytest.mark.anyio
+async def test_deadline_middleware_cancels_request() -> None:
+    """Checks that a request over its budget is cancelled with 504."""
+    app = FastAPI()
+    cancelled = asyncio.Event()
+
+    @app.get("/slow")
+    async def slow() -> None:  # noqa: WPS430
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    app.add_middleware(DeadlineMiddleware, default_timeout=10)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/slow", headers={"X-Request-Timeout": "0.05"})
+
+    assert response.status_code == http_status.HTTP_504_GATEWAY_TIMEOUT
+    assert cancelled.is_set()
+
+
+@pytest.mark.anyio
+async def test_deadline_bounds_queries() -> None:
+    """Checks that a query over the budget of the request is cancelled."""
+    primary = connections.get(PRIMARY_CONNECTION)
+    with request_deadline(0.05):
+        with pytest.raises(TimeoutError):
+            await primary.execute_query("SELECT pg_sleep(5)")
+
+    assert await primary.execute_query_dict("SELECT 1 AS one") == [{"one": 1}]
+
+
+def test_deadline_skips_s3_calls() -> None:
+    """Checks that S3 operations don't start once the deadline passed."""
+    client = AwsS3Client(bucket="bucket")
+    with request_deadline(-1):
+        with pytest.raises(DeadlineExceededError):
+            client.upload_json({"key": "value"}, "file")
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import APIRouter, FastAPI, Request
+from fastapi import status as http_status
+from httpx import AsyncClient
+
+from app.api.routes.decoding import ValidatedBodyRoute
+from app.api.routes.v1.users.dtos import UserCreateInputDTO
+
+router = APIRouter(route_class=ValidatedBodyRoute)
+
+
+@router.post("/users")
+async def create_users(
+    request: Request,
+    dtos: List[UserCreateInputDTO],
+) -> Dict[str, Any]:
+    """
+    Echo emails of the users and tell how the body was decoded.
+
+    :param request: current request.
+    :param dtos: users from the body.
+    :return: emails of the users and whether the decoded body was validated.
+    """
+    decoded = await request.json()
+    return {
+        "emails": [dto.email for dto in dtos],
+        "validated": all(isinstance(dto, UserCreateInputDTO) for dto in decoded),
+    }
+
+
+@pytest.fixture
+async def decoding_client(anyio_backend: Any) -> AsyncClient:
+    """
+    Client for an application with the validated body route.
+
+    :param anyio_backend: backend for anyio pytest plugin.
+    :return: client for the app.
+    """
+    app = FastAPI()
+    app.include_router(router)
+    return AsyncClient(app=app, base_url="http://test")
+
+
+@pytest.mark.anyio
+async def test_validated_body(
+    decoding_client: AsyncClient,
+    user_data: dict[str, Any],
+) -> None:
+    """Test that body is validated while it is decoded."""
+    users = [{**user_data, "email": f"{index}@example.com"} for index in range(3)]
+    response = await decoding_client.post("/users", json=users)
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.json() == {
+        "emails": [user["email"] for user in users],
+        "validated": True,
+    }
+
+
+@pytest.mark.anyio
+async def test_invalid_body(
+    decoding_client: AsyncClient,
+    user_data: dict[str, Any],
+) -> None:
+    """Test that invalid body is reported as by default route."""
+    user_data.pop("email")
+    response = await decoding_client.post("/users", json=[user_data])
+
+    assert response.status_code == http_status.HTTP_422_UNPROCESSABLE_ENTITY
+    error = response.json()["detail"][0]
+    assert error["loc"] == ["body", 0, "email"]
+
+    response = await decoding_client.post(
+        "/users",
+        content=b"[{",
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == http_status.HTTP_422_UNPROCESSABLE_ENTITY
+    error = response.json()["detail"][0]
+    assert error["type"] == "json_invalid"
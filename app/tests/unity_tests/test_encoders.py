@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List
+
+import orjson
+import pytest
+
+from app.api.routes.v1.users.dtos import USER_DTO_FIELDS, UserDTO
+from app.services.encoders import csv_chunks, json_rows, ndjson_chunks
+
+ROWS: List[Dict[str, Any]] = [
+    {"id": uuid.UUID(int=1), "email": "first@example.com"},
+    {"id": uuid.UUID(int=2), "email": "second@example.com"},
+]
+
+
+async def _rows() -> AsyncIterator[Dict[str, Any]]:
+    for row in ROWS:
+        yield row
+
+
+@pytest.mark.anyio
+async def test_ndjson_chunks() -> None:
+    """Test encoding rows as ndjson in chunks."""
+    chunks = [chunk async for chunk in ndjson_chunks(_rows(), chunk_size=1)]
+
+    assert len(chunks) == 2
+    assert chunks[0] == (
+        b'{"id":"00000000-0000-0000-0000-000000000001","email":"first@example.com"}\n'
+    )
+
+
+@pytest.mark.anyio
+async def test_csv_chunks() -> None:
+    """Test encoding rows as csv in chunks."""
+    chunks = [chunk async for chunk in csv_chunks(_rows(), ["email"], chunk_size=1)]
+
+    assert chunks == [b"email\r\nfirst@example.com\r\n", b"second@example.com\r\n"]
+
+
+def test_json_rows_matches_dto() -> None:
+    """Test that rows are encoded the same way as through the DTO."""
+    user: Dict[str, Any] = {
+        "id": uuid.UUID(int=1),
+        "email": "first@example.com",
+        "full_name": "First",
+        "is_active": True,
+        "is_superuser": False,
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, 120000, tzinfo=timezone.utc),
+        "updated_at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    }
+    expected = orjson.dumps([UserDTO(**user).model_dump(mode="json")])
+    columns = list(USER_DTO_FIELDS)
+
+    assert json_rows([user], columns) == expected
+    assert json_rows([SimpleNamespace(**user)], columns) == expected
+
+
+class _UUIDSubclass(uuid.UUID):
+    """UUID of a driver, orjson doesn't encode it natively."""
+
+
+def test_json_rows_rejects_unknown_types() -> None:
+    """Test that only known types are encoded by the fallback."""
+    row = {"id": _UUIDSubclass(int=1)}
+    expected = b'[{"id":"00000000-0000-0000-0000-000000000001"}]'
+
+    assert json_rows([row], ["id"]) == expected
+    with pytest.raises(orjson.JSONEncodeError):
+        json_rows([{"id": object()}], ["id"])
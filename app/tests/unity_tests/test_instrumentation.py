@@ -0,0 +1,62 @@
+from typing import List
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from loguru import logger
+from starlette import status
+
+from app.domains.instrumentation import (
+    QueryStats,
+    normalize_sql,
+    record_query,
+    track_queries,
+)
+from app.settings import settings
+
+
+def test_normalize_sql() -> None:
+    """Checks that statements differing only in values have the same shape."""
+    first = normalize_sql(
+        "SELECT *  FROM \"users\" WHERE id=$1 AND name='a''b' LIMIT 10",
+    )
+    second = normalize_sql(
+        "SELECT * FROM \"users\"\n WHERE id=$2 AND name='c' LIMIT 20",
+    )
+    assert first == second == 'SELECT * FROM "users" WHERE id=? AND name=? LIMIT ?'
+    assert normalize_sql("SELECT 1 WHERE id IN ($1, $2, $3)") == (
+        "SELECT ? WHERE id IN (?)"
+    )
+
+
+def test_repeated_queries_warning() -> None:
+    """Checks that a repeated statement is reported once per request."""
+    messages: List[str] = []
+    sink_id = logger.add(messages.append, level="WARNING")
+    query_stats = QueryStats(path="/users")
+    with track_queries(query_stats):
+        for user_id in range(settings.sql_repeated_query_threshold + 2):
+            record_query(f"SELECT * FROM users WHERE id = {user_id}", 0)  # noqa: S608
+    logger.remove(sink_id)
+
+    assert query_stats.count == settings.sql_repeated_query_threshold + 2
+    assert len(messages) == 1
+    assert "N+1" in messages[0]
+
+
+@pytest.mark.anyio
+async def test_server_timing_header(
+    fastapi_app: FastAPI,
+    authenticated_client: AsyncClient,
+) -> None:
+    """
+    Checks that statements of the request are reported in Server-Timing.
+
+    :param fastapi_app: current FastAPI application.
+    :param authenticated_client: client for the app.
+    """
+    url = fastapi_app.url_path_for("list_users")
+    response = await authenticated_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert "2 queries" in response.headers["Server-Timing"]
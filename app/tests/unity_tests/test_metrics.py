@@ -0,0 +1,108 @@
+import os
+from pathlib import Path
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+from app.utils.metrics import (
+    CONTENT_TYPE,
+    MetricFamily,
+    MetricKind,
+    Samples,
+    WorkerMetrics,
+    prepare_directory,
+    render_metrics,
+)
+
+FAMILIES = (
+    MetricFamily("requests_seconds", MetricKind.HISTOGRAM, "Requests.", (0.1, 1)),
+    MetricFamily("in_flight", MetricKind.GAUGE, "In flight."),
+    MetricFamily("hits_total", MetricKind.COUNTER, "Hits."),
+)
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(client: AsyncClient, fastapi_app: FastAPI) -> None:
+    """
+    Checks that requests are counted by route template.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    health_url = fastapi_app.url_path_for("health_check")
+    await client.get(health_url)
+    await client.patch(fastapi_app.url_path_for("patch_user", user_id="unknown"))
+
+    response = await client.get(fastapi_app.url_path_for("metrics"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == CONTENT_TYPE
+    request_labels = 'method="GET",route="{0}",status="200"'.format(health_url)
+    assert (
+        "http_request_duration_seconds_count{{{0}}}".format(
+            request_labels,
+        )
+        in response.text
+    )
+    assert 'method="PATCH",route="/api/v1/users/{user_id}"' in response.text
+    assert 'db_pool_connections{database="default",state="in_use"}' in response.text
+
+
+def test_render_metrics() -> None:
+    """Checks the exposition format."""
+    samples: Samples = {
+        "requests_seconds": {(("route", "/"),): [1.0, 2.0, 1.0, 5.5]},
+        "hits_total": {(("cache", 'a "b"\n'),): 3},
+    }
+
+    rendered = render_metrics(FAMILIES, samples).splitlines()
+
+    assert rendered == [
+        "# HELP requests_seconds Requests.",
+        "# TYPE requests_seconds histogram",
+        'requests_seconds_bucket{route="/",le="0.1"} 1',
+        'requests_seconds_bucket{route="/",le="1"} 3',
+        'requests_seconds_bucket{route="/",le="+Inf"} 4',
+        'requests_seconds_sum{route="/"} 5.5',
+        'requests_seconds_count{route="/"} 4',
+        "# HELP hits_total Hits.",
+        "# TYPE hits_total counter",
+        r'hits_total{cache="a \"b\"\n"} 3',
+    ]
+
+
+def test_multiprocess_aggregation(tmp_path: Path) -> None:
+    """
+    Checks that samples of all workers are summed, but gauges of exited ones.
+
+    :param tmp_path: temporary directory.
+    """
+    prepare_directory(str(tmp_path))
+    metrics = WorkerMetrics(
+        FAMILIES,
+        collect=lambda: {"hits_total": {(): 2}},
+        directory=str(tmp_path),
+    )
+    metrics.observe("requests_seconds", (), 0.5)
+    metrics.add("in_flight", 1)
+    exited_worker = {
+        "pid": 2**22 + 1,
+        "samples": [
+            ["requests_seconds", [], [1, 0, 0, 0.05]],
+            ["in_flight", [], 7],
+            ["hits_total", [], 3],
+        ],
+    }
+    (tmp_path / "worker_1.json").write_bytes(orjson.dumps(exited_worker))
+
+    samples = metrics.get_all_samples()
+
+    histogram_counts = samples["requests_seconds"][()]
+    assert isinstance(histogram_counts, list)
+    assert histogram_counts[:3] == [1, 1, 0]
+    assert samples["in_flight"] == {(): 1}
+    assert samples["hits_total"] == {(): 5}
+    assert (tmp_path / "worker_{0}.json".format(os.getpid())).exists()
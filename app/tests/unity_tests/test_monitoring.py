@@ -1,7 +1,14 @@
+from typing import cast
+
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient
 from starlette import status
+from tortoise import connections
+
+from app.domains.backend import InstrumentedAsyncpgDBClient, PoolTimeoutError
+from app.domains.models.user_model import UserModel
+from app.utils.deadline import DeadlineExceededError, request_deadline
 
 
 @pytest.mark.anyio
@@ -15,3 +22,65 @@ async def test_health_check(client: AsyncClient, fastapi_app: FastAPI) -> None:
     url = fastapi_app.url_path_for("health_check")
     response = await client.get(url)
     assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.anyio
+async def test_stats(client: AsyncClient, fastapi_app: FastAPI) -> None:
+    """
+    Checks the stats endpoint.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    url = fastapi_app.url_path_for("stats")
+    response = await client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert "completed" in response.json()["password_hashing"]
+
+
+@pytest.mark.anyio
+async def test_db_pool_stats(client: AsyncClient, fastapi_app: FastAPI) -> None:
+    """
+    Checks that stats of the database pool are reported.
+
+    :param client: client for the app.
+    :param fastapi_app: current FastAPI application.
+    """
+    await UserModel.all().count()
+    url = fastapi_app.url_path_for("stats")
+    response = await client.get(url)
+    pool_stats = response.json()["db_pool"]["default"]
+    assert pool_stats["acquisitions"] >= 1
+    assert pool_stats["in_use"] == 0
+    assert pool_stats["waiters"] == 0
+
+
+@pytest.mark.anyio
+async def test_db_pool_acquire_timeout() -> None:
+    """Checks that waiting for a busy pool is bounded."""
+    db_client = cast(InstrumentedAsyncpgDBClient, connections.get("default"))
+    db_client.acquire_timeout = 0.01
+    await db_client.close()
+    db_client.pool_maxsize = 1
+
+    async with db_client.acquire_connection():
+        with pytest.raises(PoolTimeoutError):
+            await db_client.acquire_from_pool()
+
+    assert db_client.get_pool_stats()["timeouts"] == 1
+
+
+@pytest.mark.anyio
+async def test_db_pool_acquire_deadline() -> None:
+    """Checks that waiting cut short by the request deadline isn't a pool timeout."""
+    db_client = cast(InstrumentedAsyncpgDBClient, connections.get("default"))
+    db_client.acquire_timeout = 5
+    await db_client.close()
+    db_client.pool_maxsize = 1
+
+    async with db_client.acquire_connection():
+        with request_deadline(0.01):
+            with pytest.raises(DeadlineExceededError):
+                await db_client.acquire_from_pool()
+
+    assert db_client.get_pool_stats()["timeouts"] == 0
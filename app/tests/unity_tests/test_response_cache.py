@@ -0,0 +1,304 @@
+import asyncio
+import uuid
+from typing import Any, AsyncGenerator, Dict, List, Set
+
+import pytest
+from fastapi import FastAPI
+from fastapi import status as http_status
+from httpx import AsyncClient
+
+from app.clients.redis_client import RedisClient, encode_command, read_reply
+from app.repositories.user_repository import USERS_CACHE_TAG
+from app.services.user_service import UserService
+from app.utils.response_cache import (
+    MemoryResponseCacheBackend,
+    RedisResponseCacheBackend,
+    response_cache,
+)
+
+
+class RedisStandIn:
+    """In-memory server of the Redis commands used by the response cache."""
+
+    def __init__(self) -> None:
+        self.values: Dict[bytes, bytes] = {}
+        self.sets: Dict[bytes, Set[bytes]] = {}
+
+    async def handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """
+        Serve commands of a single connection.
+
+        :param reader: stream of the connection.
+        :param writer: stream of the connection.
+        """
+        while not reader.at_eof():
+            try:
+                command = await read_reply(reader)
+            except asyncio.IncompleteReadError:
+                break
+            writer.write(self.reply(command))
+            await writer.drain()
+        writer.close()
+
+    def reply(self, command: List[bytes]) -> bytes:  # noqa: C901, WPS212
+        """
+        Run command and encode its reply.
+
+        :param command: name and arguments of the command.
+        :return: encoded reply.
+        """
+        name, *args = command
+        if name == b"GET":
+            return _bulk(self.values.get(args[0]))
+        if name == b"SET":
+            self.values[args[0]] = args[1]
+            return b"+OK\r\n"
+        if name == b"SADD":
+            members = self.sets.setdefault(args[0], set())
+            members.update(args[1:])
+            return b":1\r\n"
+        if name == b"SMEMBERS":
+            members = self.sets.get(args[0], set())
+            encoded_members = [_bulk(member) for member in members]
+            return b"".join([_length(b"*", len(members)), *encoded_members])
+        if name == b"DEL":
+            for key in args:
+                self.drop(key)
+            return b":1\r\n"
+        if name == b"PEXPIRE":
+            return b":1\r\n"
+        if name == b"INCR":
+            counter = int(self.values.get(args[0], b"0")) + 1
+            self.values[args[0]] = str(counter).encode()
+            return _length(b":", counter)
+        if name == b"MGET":
+            encoded_values = [_bulk(self.values.get(value_key)) for value_key in args]
+            return b"".join([_length(b"*", len(args)), *encoded_values])
+        return b"-ERR unknown command\r\n"
+
+    def drop(self, key: bytes) -> None:
+        """
+        Delete key of any type.
+
+        :param key: key to delete.
+        """
+        self.values.pop(key, None)
+        self.sets.pop(key, None)
+
+
+def _bulk(reply_value: bytes | None) -> bytes:
+    if reply_value is None:
+        return b"$-1\r\n"
+    return b"".join((_length(b"$", len(reply_value)), reply_value, b"\r\n"))
+
+
+def _length(kind: bytes, length: int) -> bytes:
+    return b"".join((kind, str(length).encode(), b"\r\n"))
+
+
+@pytest.fixture
+async def redis_url() -> AsyncGenerator[str, None]:
+    """
+    Local stand-in of a Redis server.
+
+    :yields: url of the server.
+    """
+    server = await asyncio.start_server(RedisStandIn().handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    yield f"redis://127.0.0.1:{port}/0"
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.anyio
+async def test_memory_backend_invalidates_by_tag() -> None:  # noqa: WPS217
+    """Checks that the in-memory backend evicts old entries and drops tags."""
+    backend = MemoryResponseCacheBackend(maxsize=2)
+    await backend.set("first", b"1", ttl=10, tags=["users"])
+    await backend.set("second", b"2", ttl=10, tags=["other"])
+    await backend.set("third", b"3", ttl=10, tags=["users"])
+
+    assert await backend.get("first") is None
+    await backend.invalidate("users")
+
+    assert await backend.get("third") is None
+    assert await backend.get("second") == b"2"
+    assert backend.get_stats() == {
+        "hits": 1,
+        "misses": 2,
+        "invalidations": 1,
+        "size": 1,
+    }
+
+
+@pytest.mark.anyio
+async def test_memory_backend_forgets_evicted_tags() -> None:
+    """Checks that evicted entries leave the tag index."""
+    backend = MemoryResponseCacheBackend(maxsize=2)
+    page_tags = ["users", "pages"]
+    for offset in range(10):
+        page_key = f"page-{offset}"
+        await backend.set(page_key, b"[]", ttl=10, tags=page_tags)
+    await backend.set("other", b"1", ttl=10, tags=["other"])
+
+    assert backend._tags == {  # noqa: WPS437
+        "users": {"page-9"},
+        "pages": {"page-9"},
+        "other": {"other"},
+    }
+    await backend.invalidate("users")
+    assert backend._tags == {"other": {"other"}}  # noqa: WPS437
+
+
+@pytest.mark.anyio
+async def test_redis_backend(redis_url: str) -> None:  # noqa: WPS217
+    """Checks that the Redis backend stores and invalidates responses."""
+    client = RedisClient(redis_url)
+    backend = RedisResponseCacheBackend(client)
+    await backend.set("first", b"1", ttl=10, tags=["users"])
+    await backend.set("second", b"2", ttl=10, tags=["other"])
+
+    assert await backend.get("first") == b"1"
+    await backend.invalidate("users")
+
+    assert await backend.get("first") is None
+    assert await backend.get("second") == b"2"
+    assert backend.get_stats()["errors"] == 0
+    await client.close()
+
+
+@pytest.mark.anyio
+async def test_memory_backend_skips_stale_response() -> None:
+    """Checks that a response read before an invalidation isn't stored."""
+    backend = MemoryResponseCacheBackend(maxsize=2)
+    generations = await backend.get_generations(["users"])
+    await backend.invalidate("users")
+    await backend.set("first", b"1", ttl=10, tags=["users"], generations=generations)
+
+    assert await backend.get("first") is None
+
+
+@pytest.mark.anyio
+async def test_redis_backend_skips_stale_response(  # noqa: WPS217
+    redis_url: str,
+) -> None:
+    """Checks that the Redis backend doesn't store responses read before a write."""
+    client = RedisClient(redis_url)
+    backend = RedisResponseCacheBackend(client)
+    generations = await backend.get_generations(["users"])
+    await backend.invalidate("users")
+    await backend.set("first", b"1", ttl=10, tags=["users"], generations=generations)
+    generations = await backend.get_generations(["users"])
+    await backend.set("second", b"2", ttl=10, tags=["users"], generations=generations)
+
+    assert await backend.get("first") is None
+    assert await backend.get("second") == b"2"
+    await client.close()
+
+
+@pytest.mark.anyio
+async def test_redis_backend_unavailable() -> None:
+    """Checks that an unreachable server is treated as a cache miss."""
+    backend = RedisResponseCacheBackend(RedisClient("redis://127.0.0.1:1/0"))
+    await backend.set("first", b"1", ttl=10, tags=["users"])
+
+    assert await backend.get("first") is None
+    assert backend.get_stats()["errors"] == 2
+
+
+def test_encode_command() -> None:
+    """Checks encoding of commands."""
+    assert encode_command(["SET", "key", b"\r\n", 5]) == (
+        b"*4\r\n$3\r\nSET\r\n$3\r\nkey\r\n$2\r\n\r\n\r\n$1\r\n5\r\n"
+    )
+
+
+@pytest.mark.anyio
+async def test_list_users_cached(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Checks that pages of users are cached until a user is written."""
+    url = fastapi_app.url_path_for("list_users")
+    first = await authenticated_client.get(url)
+    second = await authenticated_client.get(url)
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    await authenticated_client.post(
+        fastapi_app.url_path_for("create_user"),
+        json={**user_data, "email": "other@example.com"},
+    )
+    third = await authenticated_client.get(url)
+
+    assert len(third.json()) == 2
+
+
+@pytest.mark.anyio
+async def test_list_users_cached_not_modified(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Checks that cached pages honour If-None-Match."""
+    url = fastapi_app.url_path_for("list_users")
+    first = await authenticated_client.get(url, params={"fields": "email"})
+    response = await authenticated_client.get(
+        url,
+        params={"fields": "email"},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+
+    assert response.status_code == http_status.HTTP_304_NOT_MODIFIED
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.headers["ETag"] == first.headers["ETag"]
+    assert not response.content
+
+
+@pytest.mark.anyio
+async def test_list_users_written_during_read(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Checks that a page read before a concurrent write isn't cached."""
+    list_users_fields = UserService.list_users_fields
+
+    async def read_then_write(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+        page_rows = await list_users_fields(*args, **kwargs)
+        await response_cache.invalidate(USERS_CACHE_TAG)
+        return page_rows
+
+    monkeypatch.setattr(UserService, "list_users_fields", read_then_write)
+    url = fastapi_app.url_path_for("list_users")
+    await authenticated_client.get(url)
+    monkeypatch.undo()
+    response = await authenticated_client.get(url)
+
+    assert response.headers["X-Cache"] == "MISS"
+
+
+@pytest.mark.anyio
+async def test_missed_update_keeps_cached_pages(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Checks that updates which matched no user don't drop cached pages."""
+    url = fastapi_app.url_path_for("list_users")
+    await superuser_client.get(url)
+    patch_url = fastapi_app.url_path_for("patch_user", user_id=str(uuid.uuid4()))
+    invalidations = response_cache.get_stats()["invalidations"]
+
+    response = await superuser_client.patch(patch_url, json={"full_name": "User"})
+
+    assert response.status_code == http_status.HTTP_404_NOT_FOUND
+    assert response_cache.get_stats()["invalidations"] == invalidations
+    response = await superuser_client.get(url)
+    assert response.headers["X-Cache"] == "HIT"
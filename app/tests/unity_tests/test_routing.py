@@ -0,0 +1,129 @@
+from typing import Any
+
+import pytest
+from tortoise import connections
+from tortoise.backends.asyncpg import AsyncpgDBClient
+
+from app.domains.database import PRIMARY_CONNECTION
+from app.domains.routing import ReplicaRouter
+from app.repositories import user_repository
+from app.settings import settings
+from app.utils.deadline import DeadlineExceededError, request_deadline
+
+
+def test_router_round_robin() -> None:
+    """Checks that reads are spread over healthy replicas."""
+    router = ReplicaRouter(["replica_0", "replica_1"], 30, 5)
+
+    assert [router.db_for_read() for _ in range(3)] == [
+        "replica_0",
+        "replica_1",
+        "replica_0",
+    ]
+
+    router.eject("replica_1")
+    assert [router.db_for_read() for _ in range(2)] == ["replica_0", "replica_0"]
+
+    router.eject("replica_0")
+    assert router.db_for_read() == PRIMARY_CONNECTION
+    assert router.get_stats()["ejected"] == 2
+
+
+def test_router_read_your_writes() -> None:
+    """Checks that the writer reads from the primary."""
+    router = ReplicaRouter(["replica_0"], 30, 5)
+    router.pin("writer")
+
+    assert router.db_for_read("writer") == PRIMARY_CONNECTION
+    assert router.db_for_read("reader") == "replica_0"
+    assert router.db_for_read() == "replica_0"
+
+
+def test_router_without_replicas() -> None:
+    """Checks that all reads go to the primary without replicas."""
+    router = ReplicaRouter([], 30, 5)
+    router.pin("writer")
+
+    assert router.db_for_read() == PRIMARY_CONNECTION
+    assert router.get_stats()["pinned"] == 0
+
+
+@pytest.mark.anyio
+async def test_unreachable_replica_is_ejected(
+    monkeypatch: pytest.MonkeyPatch,
+    user_data: dict[str, Any],
+) -> None:
+    """
+    Checks that reads fall back to the primary when the replica is down.
+
+    :param monkeypatch: pytest monkeypatch fixture.
+    :param user_data: data of the test user.
+    """
+    created = await user_repository.UserRepository.create_user(**user_data)
+    router = _unreachable_replica_router(monkeypatch)
+
+    user = await user_repository.UserRepository.get_user_by_id(str(created.id))
+
+    assert user.email == user_data["email"]
+    assert router.get_stats()["ejected"] == 1
+    assert router.db_for_read() == PRIMARY_CONNECTION
+
+
+@pytest.mark.anyio
+async def test_credentials_read_from_primary(
+    monkeypatch: pytest.MonkeyPatch,
+    user_data: dict[str, Any],
+) -> None:
+    """
+    Checks that login lookups don't go to a replica, which may lag.
+
+    :param monkeypatch: pytest monkeypatch fixture.
+    :param user_data: data of the test user.
+    """
+    await user_repository.UserRepository.create_user(**user_data)
+    router = _unreachable_replica_router(monkeypatch)
+
+    user = await user_repository.UserRepository.get_user_by_email(user_data["email"])
+
+    assert user.email == user_data["email"]
+    assert router.get_stats()["ejected"] == 0
+
+
+@pytest.mark.anyio
+async def test_spent_deadline_keeps_replica(
+    monkeypatch: pytest.MonkeyPatch,
+    user_data: dict[str, Any],
+) -> None:
+    """
+    Checks that a read over the request deadline doesn't eject the replica.
+
+    :param monkeypatch: pytest monkeypatch fixture.
+    :param user_data: data of the test user.
+    """
+    user = await user_repository.UserRepository.create_user(**user_data)
+    connections.set("replica_0", connections.get(PRIMARY_CONNECTION))
+    router = ReplicaRouter(["replica_0"], 30, 5)
+    monkeypatch.setattr(user_repository, "replica_router", router)
+
+    with request_deadline(-1):
+        with pytest.raises(DeadlineExceededError):
+            await user_repository.UserRepository.get_user_by_id(str(user.id))
+
+    assert router.get_stats()["ejected"] == 0
+
+
+def _unreachable_replica_router(monkeypatch: pytest.MonkeyPatch) -> ReplicaRouter:
+    connections.set(
+        "replica_0",
+        AsyncpgDBClient(
+            connection_name="replica_0",
+            host=settings.db_host,
+            port=1,
+            user=settings.db_user,
+            password=settings.db_pass,
+            database=settings.db_base,
+        ),
+    )
+    router = ReplicaRouter(["replica_0"], 30, 5)
+    monkeypatch.setattr(user_repository, "replica_router", router)
+    return router
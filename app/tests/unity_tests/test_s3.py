@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import io
+import os
+import time
+
+import pytest
+
+from app.clients.aws_s3 import AsyncAwsS3Client, S3Pool
+from app.tests.s3_stand_in import S3StandInServer
+from app.utils.deadline import DeadlineExceededError, request_deadline
+
+
+@pytest.mark.anyio
+async def test_async_client_roundtrip(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks uploads and downloads of the async client.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    client = AsyncAwsS3Client(bucket="bucket", pool=s3_test_pool)
+    image = b"\x89PNG image"
+
+    await client.upload_json({"name": "value"}, "file", "path")
+    await client.upload_base64_image(base64.b64encode(image).decode(), "image", "path")
+
+    assert await client.get_json_content("file", "path") == {"name": "value"}
+    assert s3_server.objects["/bucket/path/image.png"] == image
+    assert s3_test_pool.get_stats()["calls"] == 3
+
+
+@pytest.mark.anyio
+async def test_upload_base64_stream(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that a base64 stream is uploaded with its content type.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    client = AsyncAwsS3Client(bucket="bucket", pool=s3_test_pool)
+    image = os.urandom(300 * 1024)
+
+    await client.upload_base64_image(
+        io.BytesIO(base64.encodebytes(image)),
+        "photo",
+        content_type="image/jpeg",
+    )
+
+    assert s3_server.objects["/bucket//photo.jpg"] == image
+    assert s3_server.content_types["/bucket//photo.jpg"] == "image/jpeg"
+
+
+@pytest.mark.anyio
+async def test_async_client_doesnt_block_loop(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that slow calls run in parallel while the event loop keeps running.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    client = AsyncAwsS3Client(bucket="bucket", pool=s3_test_pool)
+    await client.upload_json({"name": "value"}, "file")
+    s3_server.delay = 0.2
+    ticks = []
+
+    async def tick() -> None:  # noqa: WPS430
+        for tick_number in range(100):
+            await asyncio.sleep(0.01)
+            ticks.append(tick_number)
+
+    ticker = asyncio.create_task(tick())
+    started = time.monotonic()
+    calls = [client.get_json_content("file") for _ in range(4)]
+    await asyncio.gather(*calls)
+    elapsed = time.monotonic() - started
+    ticker.cancel()
+
+    assert elapsed < s3_server.delay * 3
+    assert len(ticks) >= 10
+
+
+@pytest.mark.anyio
+async def test_async_client_deadline(s3_test_pool: S3Pool) -> None:
+    """
+    Checks that waiting for a call is bounded by the request deadline.
+
+    :param s3_test_pool: pool of a client of the server.
+    """
+    client = AsyncAwsS3Client(bucket="bucket", pool=s3_test_pool)
+    with request_deadline(-1):
+        with pytest.raises(DeadlineExceededError):
+            await client.upload_json({"name": "value"}, "file")
+
+
+@pytest.mark.anyio
+async def test_timed_out_call_stays_in_flight(s3_test_pool: S3Pool) -> None:
+    """
+    Checks that a call which timed out counts until its thread is done.
+
+    :param s3_test_pool: pool of a client of the server.
+    """
+    with request_deadline(0.01):
+        with pytest.raises(TimeoutError):
+            await s3_test_pool.run("sleep", time.sleep, 0.2)
+
+    assert s3_test_pool.get_stats()["in_flight"] == 1
+    async with asyncio.timeout(5):
+        while s3_test_pool.get_stats()["in_flight"]:
+            await asyncio.sleep(0.01)
+    assert s3_test_pool.get_stats()["timeouts"] == 1
+
+
+@pytest.mark.anyio
+async def test_batch_operations(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that batches report results and errors by file name.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    client = AsyncAwsS3Client(bucket="bucket", pool=s3_test_pool, concurrency=4)
+    documents = {"doc{0}".format(index): {"index": index} for index in range(10)}
+    s3_server.failing = {"docs/doc1.json"}
+
+    uploaded = await client.upload_json_many(documents, "docs")
+    fetched = await client.get_json_many(["doc2", "missing"], "docs")
+    deleted = await client.delete_many(list(documents), "docs")
+
+    assert not uploaded.errors
+    assert fetched.results == {"doc2": {"index": 2}}
+    assert list(fetched.errors) == ["missing"]
+    assert list(deleted.errors) == ["doc1"]
+    assert list(s3_server.objects) == ["/bucket/docs/doc1.json"]
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import orjson
+import pytest
+
+from app.clients.aws_s3 import S3Pool
+from app.clients.s3_cache import S3JsonCache
+from app.tests.s3_stand_in import S3StandInServer
+
+
+@pytest.mark.anyio
+async def test_cache_serves_parsed_objects(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+    tmp_path: Path,
+) -> None:
+    """
+    Checks that parsed objects are served from memory until their ttl expires.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    :param tmp_path: directory of the cache.
+    """
+    s3_server.store("/bucket/config/app.json", b'{"feature": true}')
+    cache = S3JsonCache("bucket", s3_test_pool, tmp_path)
+
+    assert await cache.get_json_content("app", "config") == {"feature": True}
+    assert await cache.get_json_content("app", "config") == {"feature": True}
+
+    assert s3_server.requests == 1
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+@pytest.mark.anyio
+async def test_cache_revalidates_disk_copies(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+    tmp_path: Path,
+) -> None:
+    """
+    Checks that copies on disk are reused by a new worker while they are valid.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    :param tmp_path: directory of the cache.
+    """
+    s3_server.store("/bucket//app.json", b'{"version": 1}')
+    await S3JsonCache("bucket", s3_test_pool, tmp_path).get_json_content("app")
+    restarted = S3JsonCache("bucket", s3_test_pool, tmp_path, ttl=0)
+
+    assert await restarted.get_json_content("app") == {"version": 1}
+    s3_server.store("/bucket//app.json", b'{"version": 2}')
+    assert await restarted.get_json_content("app") == {"version": 2}
+
+    stats = restarted.get_stats()
+    assert stats["revalidations"] == 2
+    assert stats["not_modified"] == 1
+
+
+@pytest.mark.anyio
+async def test_cache_evicts_least_recently_used(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+    tmp_path: Path,
+) -> None:
+    """
+    Checks that copies on disk are bounded by size.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    :param tmp_path: directory of the cache.
+    """
+    cache = S3JsonCache("bucket", s3_test_pool, tmp_path, max_disk_bytes=200)
+    for name in ("first", "second", "third"):
+        json_content = {"name": name, "padding": "x" * 30}
+        s3_server.store("/bucket//{0}.json".format(name), orjson.dumps(json_content))
+        await cache.get_json_content(name)
+
+    assert len(list(tmp_path.glob("*.cache"))) == 2
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.anyio
+async def test_cache_disk_limit_is_shared(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+    tmp_path: Path,
+) -> None:
+    """
+    Checks that the disk limit bounds copies written by all workers.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    :param tmp_path: directory of the cache.
+    """
+    workers = [
+        S3JsonCache("bucket", s3_test_pool, tmp_path, max_disk_bytes=200)
+        for _ in range(2)
+    ]
+    for name, worker in zip(("first", "second", "third"), workers * 2):
+        json_content = {"name": name, "padding": "x" * 30}
+        s3_server.store("/bucket//{0}.json".format(name), orjson.dumps(json_content))
+        await worker.get_json_content(name)
+
+    assert len(list(tmp_path.glob("*.cache"))) == 2
+    assert workers[0].get_stats()["evictions"] == 1
@@ -0,0 +1,175 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from app.clients.aws_s3 import S3Pool
+from app.clients.s3_transfer import MultipartUploadError, S3Transfer
+from app.tests.s3_stand_in import S3StandInServer
+from app.utils.deadline import request_deadline
+
+PART_SIZE = 1024
+
+
+@pytest.mark.anyio
+async def test_multipart_roundtrip(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+    tmp_path: Path,
+) -> None:
+    """
+    Checks parallel parts and ranges of a large file.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    :param tmp_path: temporary directory.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE, concurrency=3)
+    content = os.urandom(PART_SIZE * 10 + 7)
+    source = tmp_path / "source"
+    source.write_bytes(content)
+
+    await transfer.upload(source, "large")
+
+    assert s3_server.objects["/bucket/large"] == content
+    assert not s3_server.uploads
+    assert await transfer.download_file("large", tmp_path / "target") == len(content)
+    assert (tmp_path / "target").read_bytes() == content
+
+
+@pytest.mark.anyio
+async def test_small_object_roundtrip(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+    tmp_path: Path,
+) -> None:
+    """
+    Checks that content smaller than a part is put in a single call.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    :param tmp_path: temporary directory.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE)
+
+    await transfer.upload(b"small", "small")
+
+    assert s3_server.objects["/bucket/small"] == b"small"
+    assert await transfer.download_file("small", tmp_path / "target") == 5
+    assert (tmp_path / "target").read_bytes() == b"small"
+
+
+@pytest.mark.anyio
+async def test_download_buffer(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks parallel ranges downloaded into memory.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE, concurrency=3)
+    content = os.urandom(PART_SIZE * 3 + 7)
+    s3_server.store("/bucket/large", content)
+
+    assert await transfer.download_buffer("large") == content
+
+
+@pytest.mark.anyio
+async def test_multipart_abort_on_failure(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that parts of a failed upload are discarded.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE)
+    s3_server.failing = {2}
+
+    with pytest.raises(MultipartUploadError, match="failed"):
+        await transfer.upload(bytes(PART_SIZE * 3), "large")
+
+    assert not s3_server.uploads
+    assert "/bucket/large" not in s3_server.objects
+
+
+@pytest.mark.anyio
+async def test_multipart_abort_after_deadline(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that parts failed by the request deadline are still discarded.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE)
+    s3_server.delay = 0.3
+    # The client is created up front, so only the parts are over the deadline.
+    assert s3_test_pool.client
+
+    with request_deadline(0.1):
+        with pytest.raises(MultipartUploadError, match="failed"):
+            await transfer.upload(bytes(PART_SIZE * 3), "large")
+
+    assert not s3_server.uploads
+
+
+@pytest.mark.anyio
+async def test_multipart_abort_on_cancel(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that parts of a cancelled upload are discarded.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE)
+    s3_server.delay = 0.2
+    upload = asyncio.create_task(transfer.upload(bytes(PART_SIZE * 3), "large"))
+    # Parts are being sent once the server saw more than the creation.
+    while s3_server.requests < 2:
+        await asyncio.sleep(0.01)
+
+    upload.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await upload
+    async with asyncio.timeout(5):
+        while s3_server.uploads:
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_multipart_resume(
+    s3_server: S3StandInServer,
+    s3_test_pool: S3Pool,
+) -> None:
+    """
+    Checks that a resumed upload sends only the missing parts.
+
+    :param s3_server: local S3 server.
+    :param s3_test_pool: pool of a client of the server.
+    """
+    transfer = S3Transfer("bucket", s3_test_pool, part_size=PART_SIZE)
+    content = os.urandom(PART_SIZE * 4)
+    s3_server.failing = {3}
+    with pytest.raises(MultipartUploadError, match="failed"):
+        await transfer.upload(content, "large", abort_on_failure=False)
+    s3_server.failing = set()
+    upload_id = next(iter(s3_server.uploads))
+    requests_before = s3_server.requests
+
+    await transfer.upload(content, "large", upload_id=upload_id)
+
+    assert s3_server.objects["/bucket/large"] == content
+    # Listing of the parts, the missing part and the completion.
+    assert s3_server.requests - requests_before == 3
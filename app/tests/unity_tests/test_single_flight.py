@@ -0,0 +1,152 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.services.user_service import UserService, user_reads
+from app.utils.deadline import limit_timeout, request_deadline
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_single_flight_coalesces_calls() -> None:
+    """Checks that concurrent calls of the same key share a single call."""
+    group = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def read() -> str:  # noqa: WPS430
+        calls.append(1)
+        await release.wait()
+        return "result"
+
+    waiters = [group.run("key", read) for _ in range(5)]
+    waiters.append(group.run("other", read))
+    results = asyncio.gather(*waiters)
+    await asyncio.sleep(0)
+    release.set()
+
+    assert set(await results) == {"result"}
+    assert len(calls) == 2
+    assert group.get_stats() == {
+        "calls": 6,
+        "flights": 2,
+        "coalesced": 4,
+        "errors": 0,
+        "timeouts": 0,
+        "in_flight": 0,
+    }
+
+
+@pytest.mark.anyio
+async def test_single_flight_propagates_errors() -> None:
+    """Checks that an error of the flight is raised to every caller."""
+    group = SingleFlight()
+
+    async def read() -> None:  # noqa: WPS430
+        await asyncio.sleep(0)
+        raise ValueError("broken")
+
+    results = await asyncio.gather(
+        group.run("key", read),
+        group.run("key", read),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert group.get_stats()["errors"] == 1
+
+
+@pytest.mark.anyio
+async def test_single_flight_timeout() -> None:
+    """Checks that a flight over its timeout fails for all callers."""
+    group = SingleFlight(timeout=10)
+
+    results = await asyncio.gather(
+        group.run("key", lambda: asyncio.sleep(1), timeout=0.01),
+        group.run("key", lambda: asyncio.sleep(1)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+    assert group.get_stats()["timeouts"] == 1
+
+
+@pytest.mark.anyio
+async def test_single_flight_own_deadlines() -> None:
+    """Checks that the deadline of the caller who started the flight isn't shared."""
+    group = SingleFlight()
+
+    async def read() -> str:  # noqa: WPS430
+        await asyncio.sleep(0.05)
+        limit_timeout("read")
+        return "result"
+
+    async def read_within(budget: float | None) -> str:  # noqa: WPS430
+        with request_deadline(budget):
+            return await group.run("key", read)
+
+    results = await asyncio.gather(read_within(0.01), read_within(None))
+
+    assert list(results) == ["result", "result"]
+    assert group.get_stats()["coalesced"] == 1
+
+
+@pytest.mark.anyio
+async def test_single_flight_survives_cancelled_caller() -> None:
+    """Checks that a cancelled caller doesn't cancel the flight of others."""
+    group = SingleFlight()
+    release = asyncio.Event()
+
+    async def read() -> str:  # noqa: WPS430
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(group.run("key", read))
+    second = asyncio.create_task(group.run("key", read))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "result"
+    assert first.cancelled()
+
+
+@pytest.mark.anyio
+async def test_single_flight_forget() -> None:
+    """Checks that calls after forget don't join flights in progress."""
+    group = SingleFlight()
+    release = asyncio.Event()
+
+    async def read() -> None:  # noqa: WPS430
+        await release.wait()
+
+    first = asyncio.create_task(group.run("key", read))
+    await asyncio.sleep(0)
+    group.forget()
+    second = asyncio.create_task(group.run("key", read))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, second)
+
+    assert group.get_stats()["flights"] == 2
+
+
+@pytest.mark.anyio
+async def test_get_user_by_id_coalesced(
+    authenticated_client: Any,
+    user_data: dict[str, Any],
+) -> None:
+    """Checks that concurrent reads of a user share a single query."""
+    service = UserService()
+    user = await service.get_user_by_email(user_data["email"])
+    stats_before = user_reads.get_stats()
+
+    users = await asyncio.gather(
+        *(service.get_user_by_id(str(user.id)) for _ in range(10)),
+    )
+
+    stats = user_reads.get_stats()
+    assert all(found is users[0] for found in users)
+    assert stats["flights"] - stats_before["flights"] == 1
+    assert stats["coalesced"] - stats_before["coalesced"] == 9
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from app.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    """Test evicting the least recently used entry."""
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+    assert cache.get_stats() == {"hits": 3, "misses": 1, "size": 2}
+
+
+def test_ttl_cache_expires_entries() -> None:
+    """Test entries never outlive their ttl."""
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("expired", 1, ttl=-1)
+    cache.set("valid", 2, ttl=120)
+
+    assert cache.get("expired") is None
+    assert cache.get("valid") == 2
+
+
+def test_ttl_cache_pop_and_clear() -> None:
+    """Test removing entries from the cache."""
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("first", 1)
+    cache.set("second", 2)
+
+    cache.pop("first")
+    assert cache.get("first") is None
+
+    cache.clear()
+    assert cache.get("second") is None
+
+
+def test_disabled_ttl_cache() -> None:
+    """Test cache with zero size never stores entries."""
+    cache: TTLCache[str, int] = TTLCache(maxsize=0, ttl=60)
+    cache.set("first", 1)
+
+    assert cache.get("first") is None
+
+
+def test_ttl_cache_reports_evicted_entries(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test on_evict sees evicted and expired entries, not popped ones."""
+    evicted: list[tuple[str, int]] = []
+    cache: TTLCache[str, int] = TTLCache(
+        maxsize=2,
+        ttl=60,
+        on_evict=lambda key, value: evicted.append((key, value)),
+    )
+    cache.set("first", 1)
+    cache.set("second", 2, ttl=1)
+    cache.set("third", 3)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 2)
+
+    assert cache.get("second") is None
+    assert cache.pop("third") == 3
+    assert evicted == [("first", 1), ("second", 2)]
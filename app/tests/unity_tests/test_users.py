@@ -1,11 +1,20 @@
+import base64
+import csv
+import uuid
 from typing import Any
 
+import orjson
 import pytest
 from fastapi import FastAPI
 from fastapi import status as http_status
 from httpx import AsyncClient
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
 
 from app.api.routes.v1.users.dtos import UserDTO
+from app.domains.database import PRIMARY_CONNECTION
+from app.repositories.user_repository import UserRepository
+from app.settings import settings
 
 
 @pytest.mark.anyio
@@ -52,6 +61,20 @@ async def test_list_users(
         assert validated_user.is_superuser == user_data.get("is_superuser")
 
 
+@pytest.mark.anyio
+async def test_list_users_schema(
+    client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test that list users is still documented with the user DTO."""
+    response = await client.get(url=f"{settings.api_prefix}/openapi.json")
+    operation = response.json()["paths"][fastapi_app.url_path_for("list_users")]
+    content = operation["get"]["responses"]["200"]["content"]
+    schema = content["application/json"]["schema"]
+
+    assert schema["items"] == {"$ref": "#/components/schemas/UserDTO"}
+
+
 @pytest.mark.anyio
 async def test_get_me(
     authenticated_client: AsyncClient,
@@ -137,3 +160,544 @@ async def test_list_users_emails_without_superuser(
     response = await authenticated_client.get(url=url)
 
     assert response.status_code == http_status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.anyio
+async def test_update_user_invalidates_current_user(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test current user reflecting the update of the user."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    user_id = get_me_response.json().get("id")
+
+    updated_data = user_data.copy()
+    updated_data["full_name"] = "Updated User"
+    url = fastapi_app.url_path_for("update_user", user_id=user_id)
+    await authenticated_client.put(url=url, json=updated_data)
+
+    get_me_response = await authenticated_client.get(url=get_me_url)
+
+    assert get_me_response.json().get("full_name") == "Updated User"
+
+
+@pytest.mark.anyio
+async def test_list_users_with_cursor(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test walking through the users with cursor pagination."""
+    url = fastapi_app.url_path_for("create_user")
+    for index in range(2):
+        other_user = user_data.copy()
+        other_user["email"] = f"other{index}@example.com"
+        response = await authenticated_client.post(url=url, json=other_user)
+        assert response.status_code == http_status.HTTP_201_CREATED
+
+    url = fastapi_app.url_path_for("list_users")
+    response = await authenticated_client.get(url=url, params={"limit": 2})
+    emails = [user["email"] for user in response.json()]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await authenticated_client.get(
+        url=url,
+        params={"limit": 2, "cursor": cursor},
+    )
+    emails += [user["email"] for user in response.json()]
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert "X-Next-Cursor" not in response.headers
+    assert emails == [
+        user_data.get("email"),
+        "other0@example.com",
+        "other1@example.com",
+    ]
+
+
+@pytest.mark.anyio
+async def test_list_users_emails_with_cursor(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test cursor pagination of the users emails."""
+    url = fastapi_app.url_path_for("list_users_emails")
+    response = await superuser_client.get(url=url, params={"limit": 1})
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await superuser_client.get(url=url, params={"cursor": cursor})
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert not response.json()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "invalid",
+        base64.urlsafe_b64encode(b'["2020-01-01", 1]').decode(),
+        base64.urlsafe_b64encode(b'{"created_at": "2020-01-01"}').decode(),
+        base64.urlsafe_b64encode(b'["2020-01-01"]').decode(),
+    ],
+)
+async def test_list_users_with_invalid_cursor(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    cursor: str,
+) -> None:
+    """Test list users with malformed cursor."""
+    url = fastapi_app.url_path_for("list_users")
+    response = await authenticated_client.get(url=url, params={"cursor": cursor})
+
+    assert response.status_code == http_status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_export_users_as_ndjson(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test streaming export of the users as ndjson."""
+    url = fastapi_app.url_path_for("export_users")
+    response = await superuser_client.get(url=url)
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    validated_user = UserDTO(**rows[0])
+
+    assert len(rows) == 1
+    assert validated_user.email == user_data.get("email")
+    assert "hashed_password" not in rows[0]
+
+
+@pytest.mark.anyio
+async def test_export_users_as_csv(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test streaming export of the users as csv."""
+    url = fastapi_app.url_path_for("export_users")
+    response = await superuser_client.get(url=url, params={"format": "csv"})
+
+    assert response.status_code == http_status.HTTP_200_OK
+
+    rows = list(csv.DictReader(response.text.splitlines()))
+
+    assert len(rows) == 1
+    assert rows[0]["email"] == user_data.get("email")
+
+
+@pytest.mark.anyio
+async def test_export_users_without_superuser(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test export of the users without superuser."""
+    url = fastapi_app.url_path_for("export_users")
+    response = await authenticated_client.get(url=url)
+
+    assert response.status_code == http_status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.anyio
+async def test_bulk_create_users(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test bulk create reporting conflicts per row."""
+    new_user = user_data.copy()
+    new_user["email"] = "new@example.com"
+
+    url = fastapi_app.url_path_for("bulk_create_users")
+    response = await superuser_client.post(
+        url=url,
+        json=[new_user, user_data, new_user],
+    )
+
+    assert response.status_code == http_status.HTTP_200_OK
+
+    results = response.json()
+
+    assert [result["status"] for result in results] == [
+        "created",
+        "conflict",
+        "conflict",
+    ]
+    assert UserDTO(**results[0]["user"]).email == "new@example.com"
+    assert results[1]["detail"] == "Email already exists"
+
+
+@pytest.mark.anyio
+async def test_bulk_update_users(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test bulk update reporting conflicts and missing users per row."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await superuser_client.get(url=get_me_url)
+    user_id = get_me_response.json().get("id")
+
+    other_user = user_data.copy()
+    other_user["email"] = "other@example.com"
+    url = fastapi_app.url_path_for("create_user")
+    response = await superuser_client.post(url=url, json=other_user)
+    other_user["id"] = response.json().get("id")
+    other_user["email"] = user_data.get("email")
+
+    updated_user = user_data.copy()
+    updated_user["id"] = user_id
+    updated_user["full_name"] = "Updated User"
+    missing_user = updated_user.copy()
+    missing_user["id"] = str(uuid.uuid4())
+    missing_user["email"] = "missing@example.com"
+
+    url = fastapi_app.url_path_for("bulk_update_users")
+    response = await superuser_client.put(
+        url=url,
+        json=[updated_user, other_user, missing_user, updated_user],
+    )
+
+    assert response.status_code == http_status.HTTP_200_OK
+
+    results = response.json()
+
+    assert [result["status"] for result in results] == [
+        "updated",
+        "conflict",
+        "not_found",
+        "conflict",
+    ]
+    assert results[0]["user"]["full_name"] == "Updated User"
+
+    get_me_response = await superuser_client.get(url=get_me_url)
+    assert get_me_response.json().get("full_name") == "Updated User"
+
+
+@pytest.mark.anyio
+async def test_bulk_update_users_racing_insert(
+    monkeypatch: pytest.MonkeyPatch,
+    user_data: dict[str, Any],
+) -> None:
+    """Test bulk update when an email is taken after the conflicts check."""
+    other_data = {**user_data, "email": "other@example.com"}
+    user = await UserRepository.create_user(**user_data)
+    other_user = await UserRepository.create_user(**other_data)
+    primary = connections.get(PRIMARY_CONNECTION)
+    email_owners = UserRepository._email_owners  # noqa: WPS437
+
+    async def racing_email_owners(  # noqa: WPS430
+        connection: BaseDBAsyncClient,
+        users: list[dict[str, Any]],
+    ) -> dict[str, str]:
+        owners = await email_owners(connection, users)
+        # The insert is committed on another connection of the pool.
+        await primary.execute_query(
+            'INSERT INTO "users" ("id", "email", "full_name", "hashed_password", '
+            '"is_superuser", "is_active", "created_at", "updated_at") '
+            "VALUES ($1, 'taken@example.com', 'Racer', '', FALSE, TRUE, now(), now()) "
+            'ON CONFLICT ("email") DO NOTHING',
+            [uuid.uuid4()],
+        )
+        return owners
+
+    monkeypatch.setattr(UserRepository, "_email_owners", racing_email_owners)
+    results = await UserRepository.bulk_update_users(
+        [
+            {**user_data, "id": user.id, "email": "taken@example.com"},
+            {**other_data, "id": other_user.id, "full_name": "Updated User"},
+        ],
+    )
+
+    assert [result.status for result in results] == ["conflict", "updated"]
+    assert results[1].user["full_name"] == "Updated User"  # type: ignore[index]
+
+
+@pytest.mark.anyio
+async def test_bulk_create_users_without_superuser(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test bulk create without superuser."""
+    url = fastapi_app.url_path_for("bulk_create_users")
+    response = await authenticated_client.post(url=url, json=[user_data])
+
+    assert response.status_code == http_status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_list_users_with_fields(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test list users selecting only some fields."""
+    url = fastapi_app.url_path_for("list_users")
+    response = await authenticated_client.get(
+        url=url,
+        params={"fields": "email, full_name", "limit": 1},
+    )
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.json() == [
+        {"email": user_data.get("email"), "full_name": user_data.get("full_name")},
+    ]
+    assert "X-Next-Cursor" in response.headers
+
+
+@pytest.mark.anyio
+async def test_list_users_with_unknown_fields(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test list users selecting fields which are not exposed."""
+    url = fastapi_app.url_path_for("list_users")
+    response = await authenticated_client.get(
+        url=url,
+        params={"fields": "email,hashed_password"},
+    )
+
+    assert response.status_code == http_status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_patch_user(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test partial update of the user."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    current_user = get_me_response.json()
+
+    url = fastapi_app.url_path_for("patch_user", user_id=current_user.get("id"))
+    response = await authenticated_client.patch(
+        url=url,
+        json={
+            "full_name": "Patched User",
+            "expected_updated_at": current_user.get("updated_at"),
+        },
+    )
+
+    assert response.status_code == http_status.HTTP_200_OK
+
+    validated_user = UserDTO(**response.json())
+
+    assert validated_user.full_name == "Patched User"
+    assert validated_user.email == user_data.get("email")
+    assert validated_user.updated_at > UserDTO(**current_user).updated_at
+
+
+@pytest.mark.anyio
+async def test_patch_user_without_changes(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test that partial update without changes keeps the version of the user."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    current_user = get_me_response.json()
+
+    url = fastapi_app.url_path_for("patch_user", user_id=current_user.get("id"))
+    response = await authenticated_client.patch(
+        url=url,
+        json={"expected_updated_at": current_user.get("updated_at")},
+    )
+    stale_response = await authenticated_client.patch(
+        url=url,
+        json={"expected_updated_at": "2000-01-01T00:00:00+00:00"},
+    )
+
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.headers["ETag"] == get_me_response.headers["ETag"]
+    assert response.json().get("updated_at") == current_user.get("updated_at")
+    assert stale_response.status_code == http_status.HTTP_412_PRECONDITION_FAILED
+
+
+@pytest.mark.anyio
+async def test_patch_user_with_stale_version(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test partial update of the user modified since the expected version."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    current_user = get_me_response.json()
+
+    url = fastapi_app.url_path_for("patch_user", user_id=current_user.get("id"))
+    response = await authenticated_client.patch(
+        url=url,
+        json={
+            "full_name": "Patched User",
+            "expected_updated_at": "2000-01-01T00:00:00+00:00",
+        },
+    )
+
+    assert response.status_code == http_status.HTTP_412_PRECONDITION_FAILED
+
+
+@pytest.mark.anyio
+async def test_patch_missing_user(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test partial update of the user which doesn't exist."""
+    url = fastapi_app.url_path_for("patch_user", user_id=str(uuid.uuid4()))
+    response = await superuser_client.patch(url=url, json={"full_name": "User"})
+
+    assert response.status_code == http_status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_patch_user_without_privileges(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test that a regular user can't promote themselves or change others."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    own_url = fastapi_app.url_path_for(
+        "patch_user",
+        user_id=get_me_response.json().get("id"),
+    )
+    other_url = fastapi_app.url_path_for("patch_user", user_id=str(uuid.uuid4()))
+
+    promote_response = await authenticated_client.patch(
+        url=own_url,
+        json={"is_superuser": True},
+    )
+    other_response = await authenticated_client.patch(
+        url=other_url,
+        json={"full_name": "User"},
+    )
+
+    assert promote_response.status_code == http_status.HTTP_403_FORBIDDEN
+    assert other_response.status_code == http_status.HTTP_403_FORBIDDEN
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    assert get_me_response.json().get("is_superuser") is False
+
+
+@pytest.mark.anyio
+async def test_update_user_without_privileges(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test that a regular user can't promote themselves or replace others."""
+    get_me_url = fastapi_app.url_path_for("get_me")
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    own_url = fastapi_app.url_path_for(
+        "update_user",
+        user_id=get_me_response.json().get("id"),
+    )
+    other_url = fastapi_app.url_path_for("update_user", user_id=str(uuid.uuid4()))
+
+    promote_response = await authenticated_client.put(
+        url=own_url,
+        json={**user_data, "is_superuser": True},
+    )
+    other_response = await authenticated_client.put(url=other_url, json=user_data)
+
+    assert promote_response.status_code == http_status.HTTP_403_FORBIDDEN
+    assert other_response.status_code == http_status.HTTP_403_FORBIDDEN
+    get_me_response = await authenticated_client.get(url=get_me_url)
+    assert get_me_response.json().get("is_superuser") is False
+
+
+@pytest.mark.anyio
+async def test_get_me_not_modified(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+) -> None:
+    """Test conditional get of the current user."""
+    url = fastapi_app.url_path_for("get_me")
+    response = await authenticated_client.get(url=url)
+    etag = response.headers["ETag"]
+
+    response = await authenticated_client.get(url=url, headers={"If-None-Match": etag})
+
+    assert response.status_code == http_status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+
+@pytest.mark.anyio
+async def test_list_users_not_modified(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test conditional get of the users page."""
+    url = fastapi_app.url_path_for("list_users")
+    response = await authenticated_client.get(url=url)
+    etag = response.headers["ETag"]
+
+    response = await authenticated_client.get(url=url, headers={"If-None-Match": etag})
+    assert response.status_code == http_status.HTTP_304_NOT_MODIFIED
+
+    await UserRepository.create_user(**{**user_data, "email": "new@example.com"})
+    response = await authenticated_client.get(url=url, headers={"If-None-Match": etag})
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "if_match",
+    ["*", f'"{uuid.UUID(int=1)}.1"'],
+)
+async def test_update_missing_user_if_match(
+    superuser_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+    if_match: str,
+) -> None:
+    """Test that If-Match never matches a user which doesn't exist."""
+    url = fastapi_app.url_path_for("update_user", user_id=str(uuid.UUID(int=1)))
+    response = await superuser_client.put(
+        url=url,
+        json=user_data,
+        headers={"If-Match": if_match},
+    )
+    assert response.status_code == http_status.HTTP_412_PRECONDITION_FAILED
+
+    response = await superuser_client.put(url=url, json=user_data)
+    assert response.status_code == http_status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_update_user_if_match(
+    authenticated_client: AsyncClient,
+    fastapi_app: FastAPI,
+    user_data: dict[str, Any],
+) -> None:
+    """Test that update with a stale If-Match tag is rejected."""
+    response = await authenticated_client.get(url=fastapi_app.url_path_for("get_me"))
+    etag = response.headers["ETag"]
+    url = fastapi_app.url_path_for("update_user", user_id=response.json()["id"])
+
+    response = await authenticated_client.put(
+        url=url,
+        json=user_data,
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == http_status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+    response = await authenticated_client.put(
+        url=url,
+        json=user_data,
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == http_status.HTTP_412_PRECONDITION_FAILED
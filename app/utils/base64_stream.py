@@ -0,0 +1,93 @@
+import binascii
+import io
+from typing import BinaryIO
+
+# Encoded content, whole in memory or a binary stream of it.
+Base64Source = str | bytes | BinaryIO
+
+# Encoded bytes decoded at once, a multiple of 4.
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+WHITESPACE = b" \t\r\n"
+
+
+class Base64DecodingReader(io.RawIOBase):
+    """
+    Readable stream of decoded base64 content.
+
+    The content is decoded chunk by chunk as it is read,
+    so memory stays bounded by the chunk size whatever the size of the content.
+    Whitespace, like line breaks of MIME encoding, is skipped.
+    """
+
+    def __init__(self, source: Base64Source, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Stream of the decoded content.
+
+        :param source: encoded content.
+        :param chunk_size: encoded bytes decoded at once.
+        """
+        super().__init__()
+        self._source = source
+        self._chunk_size = max(chunk_size // 4 * 4, 4)
+        self._offset = 0
+        self._pending = b""
+        self._decoded = memoryview(b"")
+        self._decoded_offset = 0
+        self._exhausted = False
+
+    def readable(self) -> bool:
+        """
+        Tell that the stream can be read.
+
+        :return: True.
+        """
+        return True
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:  # type: ignore[override]
+        """
+        Decode content into buffer.
+
+        The buffer is filled up unless the content ends.
+
+        :param buffer: buffer to fill.
+        :return: number of bytes written, 0 at the end of the content.
+        """
+        target = memoryview(buffer).cast("B")
+        written = 0
+        while written < len(target):
+            available = len(self._decoded) - self._decoded_offset
+            if not available:
+                if self._exhausted:
+                    break
+                self._decode_next()
+                continue
+            size = min(available, len(target) - written)
+            start = self._decoded_offset
+            self._decoded_offset += size
+            piece = self._decoded[start : self._decoded_offset]
+            target[written : written + size] = piece  # noqa: WPS362
+            written += size
+        return written
+
+    def _decode_next(self) -> None:
+        chunk = self._read_encoded()
+        if chunk:
+            encoded = self._pending + chunk.translate(None, WHITESPACE)
+            aligned = len(encoded) // 4 * 4
+            self._pending = encoded[aligned:]
+            decoded = binascii.a2b_base64(encoded[:aligned], strict_mode=True)
+            self._decoded = memoryview(decoded)
+        else:
+            self._exhausted = True
+            if self._pending:
+                raise binascii.Error("Incomplete base64 content")
+            self._decoded = memoryview(b"")
+        self._decoded_offset = 0
+
+    def _read_encoded(self) -> bytes:
+        if isinstance(self._source, (str, bytes)):
+            chunk = self._source[self._offset : self._offset + self._chunk_size]
+            self._offset += len(chunk)
+            return chunk.encode("ascii") if isinstance(chunk, str) else chunk
+        return self._source.read(self._chunk_size)
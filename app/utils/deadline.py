@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from loguru import logger
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the time budget of the request is spent."""
+
+
+# Monotonic time by which the current request must finish, None without a budget.
+current_deadline: ContextVar[float | None] = ContextVar(
+    "current_deadline",
+    default=None,
+)
+
+
+def remaining_seconds() -> float | None:
+    """
+    Get time left until the deadline of the current request.
+
+    :return: seconds left, negative once the deadline passed, None without a budget.
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def limit_timeout(operation: str, timeout: float | None = None) -> float | None:
+    """
+    Shorten timeout of an operation to the remaining budget of the request.
+
+    :param operation: name of the operation, for the log.
+    :param timeout: own timeout of the operation, None for no limit.
+    :return: timeout to apply, None for no limit.
+    :raises DeadlineExceededError: If the budget is already spent.
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        logger.warning(
+            "Request deadline passed {0:.3f} s ago, skipping {1}",
+            -remaining,
+            operation,
+        )
+        raise DeadlineExceededError(f"Request deadline passed before {operation}")
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
+
+
+@contextmanager
+def request_deadline(seconds: float | None) -> Iterator[float | None]:
+    """
+    Set time budget of the code running in the block.
+
+    A nested budget can only shorten the outer one.
+
+    :param seconds: time budget, None for no budget.
+    :yields: monotonic time of the deadline.
+    """
+    deadline = current_deadline.get()
+    if seconds is not None:
+        own_deadline = time.monotonic() + seconds
+        deadline = own_deadline if deadline is None else min(deadline, own_deadline)
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
@@ -0,0 +1,337 @@
+import asyncio
+import bisect
+import enum
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple, cast
+
+import orjson
+from loguru import logger
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Value of a sample, histograms keep counts of each bucket, then the sum.
+SampleValue = float | List[float]
+
+# Samples of each metric family, by labels.
+Samples = Dict[str, Dict[Labels, SampleValue]]
+
+# Content type of the Prometheus text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the latency buckets, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SNAPSHOT_PREFIX = "worker_"
+
+
+class MetricKind(enum.StrEnum):
+    """Type of a metric family."""
+
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+
+
+@dataclass(frozen=True)
+class MetricFamily:
+    """Metric with its samples of all label values."""
+
+    name: str
+    kind: MetricKind
+    description: str
+    buckets: Tuple[float, ...] = ()
+
+
+class Histogram:
+    """Distribution of observed values by labels."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.values: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, amount: float) -> None:
+        """
+        Count value into its bucket.
+
+        :param labels: labels of the sample.
+        :param amount: observed value.
+        """
+        counts: List[float] | None = self.values.get(labels)
+        if counts is None:
+            counts = [0 for _ in range(len(self.buckets) + 2)]
+            self.values[labels] = counts
+        counts[bisect.bisect_left(self.buckets, amount)] += 1
+        counts[-1] += amount
+
+
+class WorkerMetrics:
+    """
+    Metrics of the current worker process.
+
+    With a multiprocess directory, each worker periodically dumps its samples
+    into its own file there, and a scrape of any worker aggregates all files.
+    Counters and histograms of exited workers are kept, gauges are dropped.
+    """
+
+    def __init__(
+        self,
+        families: Sequence[MetricFamily],
+        collect: Callable[[], Samples],
+        directory: str = "",
+        flush_interval: float = 1,
+    ) -> None:
+        """
+        Metrics of the worker.
+
+        :param families: metric families, in order of exposition.
+        :param collect: function which reads samples of the other components.
+        :param directory: directory shared by the workers, empty for a single one.
+        :param flush_interval: seconds between dumps of the samples.
+        """
+        self.families = list(families)
+        self.collect = collect
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.histograms: Dict[str, Histogram] = {
+            family.name: Histogram(family.buckets)
+            for family in families
+            if family.kind is MetricKind.HISTOGRAM
+        }
+        self.gauges: Dict[str, float] = {}
+        self._flushed_at: float = 0
+        self._flush_scheduled = False
+
+    def observe(self, name: str, labels: Labels, amount: float) -> None:
+        """
+        Count value into histogram.
+
+        :param name: name of the histogram family.
+        :param labels: labels of the sample.
+        :param amount: observed value.
+        """
+        self.histograms[name].observe(labels, amount)
+
+    def add(self, name: str, amount: float) -> None:
+        """
+        Change gauge of the worker.
+
+        :param name: name of the gauge family.
+        :param amount: change of the value.
+        """
+        self.gauges[name] = self.gauges.get(name, 0) + amount
+
+    def get_samples(self) -> Samples:
+        """
+        Get current samples of the worker.
+
+        :return: samples by family.
+        """
+        samples = self.collect()
+        for gauge_name, gauge_value in self.gauges.items():
+            samples[gauge_name] = {(): gauge_value}
+        for histogram_name, histogram in self.histograms.items():
+            samples[histogram_name] = {
+                labels: list(counts) for labels, counts in histogram.values.items()
+            }
+        return samples
+
+    def get_all_samples(self) -> Samples:
+        """
+        Get samples aggregated over all workers.
+
+        :return: samples by family.
+        """
+        if self.directory is None:
+            return self.get_samples()
+        self.flush()
+        snapshots = [
+            (pid, samples)
+            for pid, samples in self._read_snapshots()
+            if pid != os.getpid()
+        ]
+        snapshots.append((os.getpid(), self.get_samples()))
+        return aggregate_samples(self.families, snapshots)
+
+    def flush_later(self) -> None:
+        """Dump samples once the flush interval since the last dump passes."""
+        if self.directory is None or self._flush_scheduled:
+            return
+        delay = self._flushed_at + self.flush_interval - time.monotonic()
+        if delay <= 0:
+            self.flush()
+            return
+        self._flush_scheduled = True
+        asyncio.get_running_loop().call_later(delay, self.flush)
+
+    def flush(self) -> None:
+        """Dump samples of the worker into its file."""
+        self._flush_scheduled = False
+        if self.directory is None:
+            return
+        self._flushed_at = time.monotonic()
+        records = [
+            [name, labels, sample_value]
+            for name, samples in self.get_samples().items()
+            for labels, sample_value in samples.items()
+        ]
+        path = self.directory / f"{SNAPSHOT_PREFIX}{os.getpid()}.json"
+        # Each writer has its own temporary file, so dumps never interleave.
+        temporary_path = path.with_suffix(".{0}.tmp".format(threading.get_ident()))
+        try:
+            temporary_path.write_bytes(
+                orjson.dumps({"pid": os.getpid(), "samples": records}),
+            )
+            os.replace(temporary_path, path)
+        except OSError as exc:
+            logger.warning("Metrics of the worker weren't saved: {0!r}", exc)
+
+    def _read_snapshots(self) -> Iterable[Tuple[int, Samples]]:
+        if self.directory is None:
+            return
+        for path in self.directory.glob(f"{SNAPSHOT_PREFIX}*.json"):
+            try:
+                snapshot = orjson.loads(path.read_bytes())
+            except (OSError, orjson.JSONDecodeError):
+                continue
+            samples: Samples = {}
+            for name, labels, sample_value in snapshot["samples"]:
+                labels_key = tuple((key, label) for key, label in labels)
+                samples.setdefault(name, {})[labels_key] = sample_value
+            yield snapshot["pid"], samples
+
+
+def aggregate_samples(
+    families: Sequence[MetricFamily],
+    snapshots: Sequence[Tuple[int, Samples]],
+) -> Samples:
+    """
+    Sum samples of several workers.
+
+    Gauges of workers which exited are skipped.
+
+    :param families: metric families.
+    :param snapshots: pid and samples of each worker.
+    :return: aggregated samples.
+    """
+    kinds = {family.name: family.kind for family in families}
+    aggregated: Samples = {}
+    for pid, samples in snapshots:
+        alive = is_alive(pid)
+        for name, family_samples in samples.items():
+            if kinds.get(name) is MetricKind.GAUGE and not alive:
+                continue
+            _sum_into(aggregated.setdefault(name, {}), family_samples)
+    return aggregated
+
+
+def is_alive(pid: int) -> bool:
+    """
+    Check whether the process is running.
+
+    :param pid: id of the process.
+    :return: whether the process exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def prepare_directory(directory: str) -> None:
+    """
+    Create multiprocess directory and drop samples of the previous run.
+
+    It must be called before the workers start.
+
+    :param directory: directory shared by the workers.
+    """
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for snapshot in path.glob(f"{SNAPSHOT_PREFIX}*"):
+        snapshot.unlink(missing_ok=True)
+
+
+def render_metrics(families: Sequence[MetricFamily], samples: Samples) -> str:
+    """
+    Render samples in the Prometheus text exposition format.
+
+    :param families: metric families, in order of exposition.
+    :param samples: samples by family.
+    :return: text of the exposition.
+    """
+    lines: List[str] = []
+    for family in families:
+        family_samples = samples.get(family.name)
+        if not family_samples:
+            continue
+        lines.append(f"# HELP {family.name} {family.description}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for labels, sample_value in sorted(family_samples.items()):
+            if isinstance(sample_value, list):
+                lines.extend(_render_histogram(family, labels, sample_value))
+            else:
+                lines.append(_render_sample(family.name, labels, sample_value))
+    return "\n".join([*lines, ""])
+
+
+def _render_histogram(
+    family: MetricFamily,
+    labels: Labels,
+    counts: List[float],
+) -> List[str]:
+    lines = []
+    cumulative: float = 0
+    bounds = [*map(_format_value, family.buckets), "+Inf"]
+    for bound, bucket_count in zip(bounds, counts):
+        cumulative += bucket_count
+        bucket_labels = (*labels, ("le", bound))
+        lines.append(_render_sample(f"{family.name}_bucket", bucket_labels, cumulative))
+    total = counts[-1]
+    lines.append(_render_sample(f"{family.name}_sum", labels, total))
+    lines.append(_render_sample(f"{family.name}_count", labels, cumulative))
+    return lines
+
+
+def _render_sample(name: str, labels: Labels, sample_value: float) -> str:
+    rendered_value = _format_value(sample_value)
+    if not labels:
+        return "{0} {1}".format(name, rendered_value)
+    rendered_labels = ",".join(
+        '{0}="{1}"'.format(key, _escape(label)) for key, label in labels
+    )
+    return "{0}{{{1}}} {2}".format(name, rendered_labels, rendered_value)
+
+
+def _format_value(sample_value: float) -> str:
+    if float(sample_value).is_integer():
+        return str(int(sample_value))
+    return repr(float(sample_value))
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _sum_into(
+    totals: Dict[Labels, SampleValue],
+    family_samples: Dict[Labels, SampleValue],
+) -> None:
+    for labels, sample_value in family_samples.items():
+        totals[labels] = _add(totals.get(labels), sample_value)
+
+
+def _add(total: SampleValue | None, sample_value: SampleValue) -> SampleValue:
+    if total is None:
+        return list(sample_value) if isinstance(sample_value, list) else sample_value
+    if isinstance(total, list):
+        counts = cast(List[float], sample_value)
+        return [left + right for left, right in zip(total, counts)]
+    return total + cast(float, sample_value)
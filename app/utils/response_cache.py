@@ -0,0 +1,324 @@
+import abc
+from typing import Dict, List, Sequence, Set, Tuple
+
+from loguru import logger
+
+from app.clients.redis_client import Command, RedisClient, RedisError
+from app.settings import settings
+from app.utils.ttl_cache import TTLCache
+
+# Errors which mean that the server is unreachable or misbehaves.
+# Timeouts are OSError, closed connections EOFError.
+CACHE_ERRORS = (OSError, EOFError, RedisError)
+
+# Prefix of the keys of tag sets in the shared backend.
+TAG_PREFIX = "response-cache:tag:"
+
+# Prefix of the keys of invalidation counters of tags in the shared backend.
+GENERATION_PREFIX = "response-cache:generation:"
+
+# Encoded response kept in memory with its tags.
+CachedResponse = Tuple[bytes, Tuple[str, ...]]
+
+
+class ResponseCacheBackend(abc.ABC):
+    """Storage of cached responses with tag-based invalidation."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """
+        Get cached response.
+
+        :param key: key of the response.
+        """
+
+    @abc.abstractmethod
+    async def get_generations(self, tags: Sequence[str]) -> List[int]:
+        """
+        Get number of invalidations of each tag.
+
+        :param tags: tags of a response.
+        """
+
+    @abc.abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        tags: Sequence[str],
+        generations: Sequence[int] | None = None,
+    ) -> None:
+        """
+        Store response.
+
+        :param key: key of the response.
+        :param value: encoded response.
+        :param ttl: seconds to keep the response.
+        :param tags: tags to invalidate the response by.
+        :param generations: generations of the tags before the response was built,
+            it isn't stored if any of the tags was invalidated since.
+        """
+
+    @abc.abstractmethod
+    async def invalidate(self, *tags: str) -> None:
+        """
+        Drop responses with any of the tags.
+
+        :param tags: tags of the responses.
+        """
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the cache.
+
+        :return: hits, misses and invalidations.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    async def _is_stale(
+        self,
+        tags: Sequence[str],
+        generations: Sequence[int] | None,
+    ) -> bool:
+        if generations is None:
+            return False
+        return await self.get_generations(tags) != list(generations)
+
+    def _count(self, value: bytes | None) -> bytes | None:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+
+class MemoryResponseCacheBackend(ResponseCacheBackend):
+    """
+    In-process LRU storage of responses.
+
+    Invalidation only reaches the current worker.
+    Entries keep their tags, so evicted and expired entries
+    leave the tag index too, and it never outgrows the entries.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__()
+        self._entries: TTLCache[str, CachedResponse] = TTLCache(
+            maxsize=maxsize,
+            ttl=float("inf"),
+            on_evict=self._forget,
+        )
+        self._tags: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Get cached response.
+
+        :param key: key of the response.
+        :return: encoded response or None.
+        """
+        entry = self._entries.get(key)
+        return self._count(None if entry is None else entry[0])
+
+    async def get_generations(self, tags: Sequence[str]) -> List[int]:
+        """
+        Get number of invalidations of each tag.
+
+        :param tags: tags of a response.
+        :return: generation of each tag, in order.
+        """
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        tags: Sequence[str],
+        generations: Sequence[int] | None = None,
+    ) -> None:
+        """
+        Store response.
+
+        :param key: key of the response.
+        :param value: encoded response.
+        :param ttl: seconds to keep the response.
+        :param tags: tags to invalidate the response by.
+        :param generations: generations of the tags before the response was built,
+            it isn't stored if any of the tags was invalidated since.
+        """
+        if await self._is_stale(tags, generations):
+            return
+        self._entries.set(key, (value, tuple(tags)), ttl=ttl)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate(self, *tags: str) -> None:
+        """
+        Drop responses with any of the tags.
+
+        :param tags: tags of the responses.
+        """
+        self.invalidations += 1
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in self._tags.pop(tag, set()):
+                entry = self._entries.pop(key)
+                if entry is not None:
+                    self._forget(key, entry)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the cache.
+
+        :return: hits, misses, invalidations and current size.
+        """
+        return {**super().get_stats(), "size": self._entries.get_stats()["size"]}
+
+    def _forget(self, key: str, entry: CachedResponse) -> None:
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]  # noqa: WPS420
+
+
+class RedisResponseCacheBackend(ResponseCacheBackend):
+    """
+    Storage of responses shared by all workers over the Redis protocol.
+
+    Errors of the server are logged and treated as cache misses,
+    so the cache never fails a request.
+    """
+
+    def __init__(self, client: RedisClient) -> None:
+        super().__init__()
+        self.errors = 0
+        self._client = client
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Get cached response.
+
+        :param key: key of the response.
+        :return: encoded response or None.
+        """
+        try:
+            return self._count(await self._client.execute("GET", key))
+        except CACHE_ERRORS as exc:
+            self._log_error(exc)
+            return self._count(None)
+
+    async def get_generations(self, tags: Sequence[str]) -> List[int]:
+        """
+        Get number of invalidations of each tag.
+
+        :param tags: tags of a response.
+        :return: generation of each tag, in order, empty if the server failed.
+        """
+        if not tags:
+            return []
+        try:
+            counters = await self._client.execute(
+                "MGET",
+                *(f"{GENERATION_PREFIX}{tag}" for tag in tags),
+            )
+        except CACHE_ERRORS as exc:
+            self._log_error(exc)
+            return []
+        return [int(counter or 0) for counter in counters]
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: float,
+        tags: Sequence[str],
+        generations: Sequence[int] | None = None,
+    ) -> None:
+        """
+        Store response.
+
+        The generations are checked right before the response is stored,
+        an invalidation in between the two round trips isn't noticed.
+
+        :param key: key of the response.
+        :param value: encoded response.
+        :param ttl: seconds to keep the response.
+        :param tags: tags to invalidate the response by.
+        :param generations: generations of the tags before the response was built,
+            it isn't stored if any of the tags was invalidated since.
+        """
+        if await self._is_stale(tags, generations):
+            return
+        ttl_ms = max(int(ttl * 1000), 1)
+        commands: List[Command] = [["SET", key, value, "PX", ttl_ms]]
+        for tag in tags:
+            commands.append(["SADD", f"{TAG_PREFIX}{tag}", key])
+            commands.append(["PEXPIRE", f"{TAG_PREFIX}{tag}", ttl_ms])
+        try:
+            await self._client.pipeline(commands)
+        except CACHE_ERRORS as exc:
+            self._log_error(exc)
+
+    async def invalidate(self, *tags: str) -> None:
+        """
+        Drop responses with any of the tags.
+
+        :param tags: tags of the responses.
+        """
+        self.invalidations += 1
+        tag_keys = [f"{TAG_PREFIX}{tag}" for tag in tags]
+        generation_commands: List[Command] = [
+            ["INCR", f"{GENERATION_PREFIX}{tag}"] for tag in tags
+        ]
+        try:
+            replies = await self._client.pipeline(
+                [
+                    *generation_commands,
+                    *(["SMEMBERS", tag_key] for tag_key in tag_keys),
+                ],
+            )
+            members = replies[len(generation_commands) :]
+            keys = {key for tag_members in members for key in tag_members}
+            await self._client.execute("DEL", *tag_keys, *keys)
+        except CACHE_ERRORS as exc:
+            self._log_error(exc)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the cache.
+
+        :return: hits, misses, invalidations and errors.
+        """
+        return {**super().get_stats(), "errors": self.errors}
+
+    def _log_error(self, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning("Response cache is unavailable: {0!r}", exc)
+
+
+def create_response_cache() -> ResponseCacheBackend:
+    """
+    Create backend chosen in settings.
+
+    :return: response cache backend.
+    """
+    if settings.response_cache_backend == "redis":
+        return RedisResponseCacheBackend(RedisClient(settings.response_cache_url))
+    return MemoryResponseCacheBackend(maxsize=settings.response_cache_size)
+
+
+response_cache = create_response_cache()
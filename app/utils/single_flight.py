@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Hashable, TypeVar
+
+ResultType = TypeVar("ResultType")
+
+
+@dataclass
+class SingleFlightStats:
+    """Counters of coalesced calls."""
+
+    calls: int = 0
+    flights: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    timeouts: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into a single one.
+
+    The first call of a key starts a flight, calls of the same key made
+    while it is in progress wait for its result instead of running again.
+    Errors of the flight, timeouts included, are raised to all its callers.
+    A caller which is cancelled doesn't cancel the flight for the others.
+    Flights run in an empty context, so the deadline and other values
+    of the request of the first caller don't apply to the others.
+    """
+
+    def __init__(self, timeout: float | None = None) -> None:
+        """
+        Single-flight group.
+
+        :param timeout: default seconds a flight may take, None for no limit.
+        """
+        self.timeout = timeout
+        self.stats = SingleFlightStats()
+        self._flights: Dict[Hashable, asyncio.Task[Any]] = {}
+
+    async def run(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[ResultType]],
+        timeout: float | None = None,
+    ) -> ResultType:
+        """
+        Run call, or join the flight of the same key in progress.
+
+        :param key: key of identical calls.
+        :param call: function which makes the call.
+        :param timeout: seconds the flight may take, defaults to the group timeout.
+        :return: result of the flight.
+        """
+        self.stats.calls += 1
+        flight = self._flights.get(key)
+        if timeout is None:
+            timeout = self.timeout
+        if flight is None:
+            flight = self._start(key, call, timeout)
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(flight)
+
+    def forget(self) -> None:
+        """
+        Make following calls start new flights.
+
+        It is called after writes, so callers never join a flight
+        which started before their write and may miss it.
+        """
+        self._flights.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get counters of the group.
+
+        :return: calls, flights, coalesced calls, errors, timeouts and flights in progress.
+        """
+        return {**asdict(self.stats), "in_flight": len(self._flights)}
+
+    def _start(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[ResultType]],
+        timeout: float | None,
+    ) -> asyncio.Task[ResultType]:
+        self.stats.flights += 1
+        flight = asyncio.create_task(
+            self._fly(call, timeout),
+            context=contextvars.Context(),
+        )
+        self._flights[key] = flight
+        flight.add_done_callback(lambda _: self._land(key, flight))
+        return flight
+
+    async def _fly(
+        self,
+        call: Callable[[], Awaitable[ResultType]],
+        timeout: float | None,
+    ) -> ResultType:
+        try:
+            return await asyncio.wait_for(call(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        except Exception:
+            self.stats.errors += 1
+            raise
+
+    def _land(self, key: Hashable, flight: asyncio.Task[Any]) -> None:
+        if self._flights.get(key) is flight:
+            self._flights.pop(key)
+        if not flight.cancelled():
+            # Retrieve the error, so it isn't reported when every caller is gone.
+            flight.exception()
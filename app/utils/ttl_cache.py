@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    """
+    In-process LRU cache with expiring entries.
+
+    The least recently used entry is evicted when the cache is full.
+    Cache with zero size never stores anything.
+    on_evict is called with entries dropped by eviction or expiry,
+    not with the ones removed by pop or clear.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Callable[[KeyType, ValueType], None] | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[KeyType, Tuple[float, ValueType]] = OrderedDict()
+
+    def get(self, key: KeyType) -> ValueType | None:
+        """
+        Get value from the cache.
+
+        :param key: key of the entry.
+        :return: cached value or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: KeyType, value: ValueType, ttl: float | None = None) -> None:
+        """
+        Put value into the cache.
+
+        :param key: key of the entry.
+        :param value: value to store.
+        :param ttl: seconds to keep the entry, it can only shorten the default ttl.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._evict(next(iter(self._entries)))
+
+    def pop(self, key: KeyType) -> ValueType | None:
+        """
+        Remove entry from the cache.
+
+        :param key: key of the entry.
+        :return: removed value, even if expired, or None if it is missing.
+        """
+        entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Get counters of the cache.
+
+        :return: hits, misses and current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+        }
+
+    def _evict(self, key: KeyType) -> None:
+        _, value = self._entries.pop(key)
+        if self.on_evict is not None:
+            self.on_evict(key, value)
@@ -0,0 +1,58 @@
+"""
+Compare throughput of serial and parallel S3 transfers against a local stand-in.
+
+Each part or range of the stand-in takes a fixed latency, like a round trip
+to S3 does, so parallel transfers show how much of it they hide.
+
+Run with ``python -m benchmarks.s3_transfer``.
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable
+
+from app.clients.aws_s3 import S3Pool
+from app.clients.s3_transfer import S3Transfer
+from app.tests.s3_stand_in import S3StandInServer
+
+SIZE = 64 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+LATENCY = 0.05
+CONCURRENCIES = (1, 2, 4, 8)
+
+
+async def _throughput(transfer: Awaitable[object]) -> str:
+    started = time.perf_counter()
+    await transfer
+    megabytes_per_second = SIZE / (time.perf_counter() - started) / 1024 / 1024
+    return f"{megabytes_per_second:.0f}MB/s"
+
+
+async def _run(server: S3StandInServer) -> None:
+    pool = S3Pool(max_workers=max(CONCURRENCIES), endpoint_url=server.url)
+    content = os.urandom(SIZE)
+    print("concurrency  upload  download")  # noqa: WPS421
+    for concurrency in CONCURRENCIES:
+        transfer = S3Transfer("bucket", pool, PART_SIZE, concurrency)
+        upload_speed = await _throughput(transfer.upload(content, "large"))
+        download_speed = await _throughput(transfer.download_buffer("large"))
+        print(  # noqa: WPS421
+            "{0:<11} {1:>7} {2:>9}".format(concurrency, upload_speed, download_speed),
+        )
+    pool.shutdown()
+
+
+def main() -> None:
+    """Print megabytes per second of uploads and downloads by concurrency."""
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    server = S3StandInServer(delay=LATENCY)
+    server.start()
+    asyncio.run(_run(server))
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare serialization of the users list through the DTO and the orjson fast path.
+
+Run with ``python -m benchmarks.serialization``.
+"""
+
+import functools
+import timeit
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from tortoise import Tortoise
+
+from app.api.routes.v1.users.dtos import USER_DTO_FIELDS, UserDTO
+from app.domains.database import MODELS_MODULES
+from app.services.encoders import json_rows
+
+SIZES = (100, 1000, 10000)
+COLUMNS = list(USER_DTO_FIELDS)
+
+
+def _make_rows(size: int) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "email": f"user{index}@example.com",
+            "full_name": f"User {index}",
+            "is_active": True,
+            "is_superuser": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(size)
+    ]
+
+
+def _measure(encode: Callable[..., Any], *args: Any) -> str:
+    timer = timeit.Timer(functools.partial(encode, *args))
+    runs, seconds = timer.autorange()
+    milliseconds = seconds / runs * 1000
+    return f"{milliseconds:.2f}ms"
+
+
+def _dto_path(adapter: TypeAdapter[List[UserDTO]], models: List[Any]) -> bytes:
+    users = adapter.validate_python(models, from_attributes=True)
+    return ORJSONResponse(jsonable_encoder(users)).body
+
+
+def main() -> None:
+    """Print milliseconds per page for each path and page size."""
+    Tortoise.init_models(MODELS_MODULES, "models")
+    from app.domains.models.user_model import UserModel  # noqa: WPS433
+
+    adapter = TypeAdapter(List[UserDTO])
+    print("rows    dto (orm)  fast (orm)  fast (values)")  # noqa: WPS421
+    for size in SIZES:
+        rows = _make_rows(size)
+        models = [UserModel(**row) for row in rows]
+        timings = (
+            _measure(_dto_path, adapter, models),
+            _measure(json_rows, models, COLUMNS),
+            _measure(json_rows, rows, COLUMNS),
+        )
+        print(  # noqa: WPS421
+            "{0:<7} {1:>10} {2:>11} {3:>14}".format(size, *timings),
+        )
+
+
+if __name__ == "__main__":
+    main()